@@ -29,6 +29,9 @@ class AgentApiClientException(Exception):
 
 class _AgentAPIClient:
     PID_FILE_NAME = "agent-server.pid"
+    # API URL found through the PID file, reused while the PID file is unchanged.
+    # Kept next to the PID file, in the user's own folder.
+    DISCOVERY_CACHE_FILE_NAME = "agent-connector-discovery.json"
 
     def __init__(self, api_key: str | None = None, api_url: str | None = None):
         """Initialize the AgentServerClient."""
@@ -107,6 +110,12 @@ class _AgentAPIClient:
         try:
             if not os.path.exists(pid_file_path):
                 return None
+            pid_file_mtime = os.path.getmtime(pid_file_path)
+
+            # The server of a previous discovery only needs to be checked to still respond
+            cached_url = self._read_discovery_cache(pid_file_path, pid_file_mtime)
+            if cached_url and self._test_api_endpoints(cached_url):
+                return cached_url
 
             with open(pid_file_path, "r") as f:
                 server_info = json.loads(f.read())
@@ -114,13 +123,59 @@ class _AgentAPIClient:
                 if base_url:
                     for version in ["v1", "v2"]:
                         endpoint_url = f"{base_url}/api/public/{version}"
-                        return self._test_api_endpoints(endpoint_url)
-                else:
-                    return None
+                        if self._test_api_endpoints(endpoint_url):
+                            self._write_discovery_cache(
+                                pid_file_path, pid_file_mtime, endpoint_url
+                            )
+                            return endpoint_url
+                return None
         except Exception as e:
             print(f"Failed to read PID file: {e}")
             return None
 
+    def _get_discovery_cache_path(self, pid_file_path: str) -> str:
+        return os.path.join(
+            os.path.dirname(pid_file_path), self.DISCOVERY_CACHE_FILE_NAME
+        )
+
+    def _read_discovery_cache(
+        self, pid_file_path: str, pid_file_mtime: float
+    ) -> str | None:
+        cache_path = self._get_discovery_cache_path(pid_file_path)
+        try:
+            with open(cache_path, "r") as f:
+                # The cached URL receives the Authorization header, only trust our own file
+                if hasattr(os, "getuid") and os.fstat(f.fileno()).st_uid != os.getuid():
+                    print(f"Ignoring discovery cache not owned by the current user: {cache_path}")
+                    return None
+                cached = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        if (
+            cached.get("pid_file") != pid_file_path
+            or cached.get("pid_file_mtime") != pid_file_mtime
+        ):
+            return None
+        return cached.get("api_url")
+
+    def _write_discovery_cache(
+        self, pid_file_path: str, pid_file_mtime: float, api_url: str
+    ) -> None:
+        cached = {
+            "pid_file": pid_file_path,
+            "pid_file_mtime": pid_file_mtime,
+            "api_url": api_url,
+        }
+        cache_path = self._get_discovery_cache_path(pid_file_path)
+        # Written aside and moved in place, so concurrent actions never read a partial file
+        temp_path = f"{cache_path}.{os.getpid()}"
+        try:
+            with open(temp_path, "w") as f:
+                f.write(json.dumps(cached))
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            print(f"Failed to write discovery cache: {e}")
+
     def _test_api_endpoints(self, base_url: str) -> str | None:
         """Test different API endpoint versions to find a working one.
 
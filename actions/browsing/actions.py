@@ -19,9 +19,11 @@ from support import (
     _clean_text,
     _configure_browser,
     _ensure_https,
+    _extract_page_elements,
+    _get_element_locator,
     _get_filename_from_cd,
-    _get_form_elements,
-    _get_page_links,
+    _get_page_elements,
+    _goto_page,
     _locator_action,
 )
 
@@ -34,7 +36,13 @@ MAX_WAIT_FOR_NETWORK_IDLE = 5000
 
 
 @action
-def get_website_content(url: str, user_agent: UserAgent = {}) -> Response[WebPage]:
+def get_website_content(
+    url: str,
+    user_agent: UserAgent = {},
+    wait_until: str = "dom_quiet",
+    ready_selector: str = "",
+    block_resources: bool = True,
+) -> Response[WebPage]:
     """
     Gets the text content, form elements, links and other elements of a website.
     If content-type is not "text/html" then just URL content is returned.
@@ -42,6 +50,11 @@ def get_website_content(url: str, user_agent: UserAgent = {}) -> Response[WebPag
     Args:
         url: the URL of the website
         user_agent: the user agent to use for browsing
+        wait_until: when the page is ready to be read, one of "domcontentloaded",
+            "dom_quiet" (the page content has stopped changing) or "networkidle"
+        ready_selector: CSS selector of an element that shows the page is ready,
+            overrides wait_until when given
+        block_resources: whether to skip loading images, fonts and media
 
     Returns:
         Text content, form elements and elements of the website.
@@ -49,20 +62,18 @@ def get_website_content(url: str, user_agent: UserAgent = {}) -> Response[WebPag
     url = _ensure_https(url)
     _configure_browser(browser, HEADLESS_BROWSER, user_agent)
     page = browser.page()
-    response = page.goto(url)
-    page.wait_for_load_state("domcontentloaded")
-    try:
-        # Wait for network to be idle for 5 seconds, but continue even if not idle
-        page.wait_for_load_state("networkidle", timeout=MAX_WAIT_FOR_NETWORK_IDLE)
-    except TimeoutError as _:
-        pass
+    response = _goto_page(
+        page,
+        url,
+        wait_until,
+        ready_selector,
+        MAX_WAIT_FOR_NETWORK_IDLE,
+        block_resources,
+    )
     content_type = response.headers.get("content-type", "").lower()
     print(f"content type: {content_type}")
     if "text/html" in content_type:
-        text_contents = page.locator("//body").inner_text()
-        text_contents = _clean_text(text_contents)
-        form = _get_form_elements(page, url)
-        links = _get_page_links(page, url)
+        text_contents, form, links = _get_page_elements(page, url)
         wb = WebPage(url=url, text_content=text_contents, form=form, links=links)
     else:
         content = response.body()
@@ -171,6 +182,7 @@ def fill_elements(
     browser.configure(browser_engine="chromium", headless=HEADLESS_BROWSER)
     page = browser.goto(web_page.url)
     page.wait_for_load_state("domcontentloaded")
+    page_elements = _extract_page_elements(page)
     locator = None
     submit_locator = None
     for element in web_page.form.elements:
@@ -178,23 +190,9 @@ def fill_elements(
             submit_locator = page.locator(f"xpath=//{element.type}[@type='submit']")
         if element.value_to_fill == "":
             continue
-        if element.id:
-            locator = page.locator(f"css=#{element.id}")
-            print(f"selected element with id: {element.id}")
-            _locator_action(locator, element)
-        elif element.class_:
-            locator = page.locator(f"css=.{element.class_}")
-            print(f"selected element with class: {element.class_}")
-            _locator_action(locator, element)
-        elif element.placeholder:
-            locator = page.get_by_placeholder(element.placeholder)
-            print(f"selected element with placeholder: {element.placeholder}")
-            _locator_action(locator, element)
-        elif element.aria_label:
-            locator = page.locator(
-                f"//{element.type}[@aria-label='{element.aria_label}']"
-            )
-            print(f"selected element with aria_label: {element.aria_label}")
+        element_locator = _get_element_locator(page, element, page_elements)
+        if element_locator:
+            locator = element_locator
             _locator_action(locator, element)
 
     if locator:
@@ -1,6 +1,9 @@
 import re
 from urllib.parse import unquote, urlparse
 
+from playwright.sync_api import Error as PlaywrightError
+from sema4ai.actions import ActionError
+
 from models import (
     Form,
     FormElement,
@@ -22,56 +25,112 @@ def _clean_text(text):
     return text
 
 
-def _get_form_elements(page, url) -> Form:
+FORM_ELEMENT_TYPES = ["input", "button", "select", "textarea", "table"]
+
+# Collects the text, links and form elements of the page in a single round-trip to the browser,
+# instead of one call per attribute of every element.
+# Link visibility follows Playwright's `is_visible`: a non-empty box and not `visibility: hidden`.
+_PAGE_ELEMENTS_SCRIPT = """
+(elementTypes) => {
+    const isVisible = (element) => {
+        if (window.getComputedStyle(element).visibility === "hidden") {
+            return false;
+        }
+        const rect = element.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0;
+    };
+    const attribute = (element, name) => element.getAttribute(name) || "";
+
+    const links = [];
+    for (const link of document.querySelectorAll("a")) {
+        if (isVisible(link)) {
+            links.push({href: link.getAttribute("href"), text: link.textContent || ""});
+        }
+    }
+
+    const elements = {};
+    for (const elementType of elementTypes) {
+        elements[elementType] = Array.from(document.querySelectorAll(elementType), (element) => ({
+            text: element.textContent || "",
+            placeholder: attribute(element, "placeholder"),
+            aria_label: attribute(element, "aria-label"),
+            value_type: attribute(element, "type"),
+            class_: attribute(element, "class"),
+            id: attribute(element, "id"),
+            name: attribute(element, "name"),
+            options: elementType === "select"
+                ? Array.from(element.querySelectorAll("option"), (option) => ({
+                    value: option.getAttribute("value") || "",
+                    text: option.textContent || "",
+                }))
+                : [],
+        }));
+    }
+
+    return {
+        text: document.body ? document.body.innerText : "",
+        links: links,
+        elements: elements,
+    };
+}
+"""
+
+
+def _extract_page_elements(page) -> dict:
+    """
+    Return the body text, visible links and form elements of the page as structured JSON:
+    `{"text": str, "links": [{"href", "text"}], "elements": {element_type: [attributes]}}`.
+    """
+    return page.evaluate(_PAGE_ELEMENTS_SCRIPT, FORM_ELEMENT_TYPES)
+
+
+def _get_page_elements(page, url) -> tuple[str, Form, Links]:
+    """Get the cleaned text, form elements and links of the page with a single page evaluation."""
+    page_elements = _extract_page_elements(page)
+    text = _clean_text(page_elements["text"])
+    form = _get_form_elements(page_elements, url)
+    links = _get_page_links(page_elements, url)
+    return text, form, links
+
+
+def _get_form_elements(page_elements: dict, url) -> Form:
     page_form = Form(url=url, elements=[])
-    _get_elements_by_type(page, "input", page_form)
-    _get_elements_by_type(page, "button", page_form)
-    _get_elements_by_type(page, "select", page_form)
-    _get_elements_by_type(page, "textarea", page_form)
-    _get_elements_by_type(page, "table", page_form)
+    for element_type in FORM_ELEMENT_TYPES:
+        _get_elements_by_type(page_elements, element_type, page_form)
     return page_form
 
 
-def _get_page_links(page, url) -> Links:
-    link_elements = page.locator("//a").all()
+def _get_page_links(page_elements: dict, url) -> Links:
+    parsed_url = urlparse(url)
     links = []
-    for element in link_elements:
-        if not element.is_visible():
-            continue
-        href = element.get_attribute("href")
-        text = _clean_text(element.text_content())
+    for link in page_elements["links"]:
+        href = link["href"]
+        text = _clean_text(link["text"])
         if href and "http" not in href:
-            parsed_url = urlparse(url)
             href = f"{parsed_url.scheme}://{parsed_url.netloc}{href}"
         links.append(Link(href=href or "", text=text or ""))
     return Links(links=links)
 
 
-def _get_elements_by_type(page, element_type, page_form):
-    elements = page.locator(f"//{element_type}").all()
+def _get_elements_by_type(page_elements: dict, element_type, page_form):
+    elements = page_elements["elements"].get(element_type, [])
     print(f"len {element_type}: {len(elements)}")
     form_elements = {}
     for element in elements:
-        options = []
-        if element_type == "select":
-            select_options = element.locator("option").all()
-            options = [
-                Option(
-                    value=option.get_attribute("value"),
-                    text=_clean_text(option.text_content()),
-                )
-                for option in select_options
-            ]
+        options = [
+            Option(value=option["value"], text=_clean_text(option["text"]))
+            for option in element["options"]
+        ]
 
         fe = FormElement(
             type=element_type,
-            text=_clean_text(element.text_content()),
-            placeholder=element.get_attribute("placeholder") or "",
-            aria_label=element.get_attribute("aria-label") or "",
-            value_type=element.get_attribute("type") or "",
-            class_=element.get_attribute("class") or "",
-            id=element.get_attribute("id") or "",
-            name=element.get_attribute("name") or "",
+            text=_clean_text(element["text"]),
+            placeholder=element["placeholder"],
+            aria_label=element["aria_label"],
+            value_type=element["value_type"],
+            class_=element["class_"],
+            id=element["id"],
+            name=element["name"],
             options=options,
         )
         if fe in form_elements:
@@ -84,6 +143,57 @@ def _get_elements_by_type(page, element_type, page_form):
     return page_form
 
 
+def _get_element_locator(page, element, page_elements: dict):
+    """
+    Get the locator of the form element to fill.
+
+    The element is located by its id, class, placeholder or aria label, in this order.
+    With the page elements at hand, the first of these that matches an element of the
+    same type on the page is used, so stale attributes don't make the action wait for
+    an element that isn't there. Without a match, the order alone decides.
+    """
+    # (name, key in the page elements, value, locator factory)
+    strategies = [
+        ("id", "id", element.id, lambda: page.locator(f"css=#{element.id}")),
+        (
+            "class",
+            "class_",
+            element.class_,
+            lambda: page.locator(f"css=.{element.class_}"),
+        ),
+        (
+            "placeholder",
+            "placeholder",
+            element.placeholder,
+            lambda: page.get_by_placeholder(element.placeholder),
+        ),
+        (
+            "aria_label",
+            "aria_label",
+            element.aria_label,
+            lambda: page.locator(
+                f"//{element.type}[@aria-label='{element.aria_label}']"
+            ),
+        ),
+    ]
+    strategies = [strategy for strategy in strategies if strategy[2]]
+    if not strategies:
+        return None
+
+    candidates = page_elements["elements"].get(element.type, [])
+    selected = next(
+        (
+            strategy
+            for strategy in strategies
+            if any(candidate[strategy[1]] == strategy[2] for candidate in candidates)
+        ),
+        strategies[0],
+    )
+    name, _, value, get_locator = selected
+    print(f"selected element with {name}: {value}")
+    return get_locator()
+
+
 def _ensure_https(url):
     if not url.startswith(("http://", "https://")):
         url = "https://" + url
@@ -99,6 +209,88 @@ def _locator_action(locator, element):
         locator.fill(element.value_to_fill)
 
 
+# Resource types not needed when only the text and elements of a page are wanted
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+
+PAGE_READY_STRATEGIES = ["domcontentloaded", "dom_quiet", "networkidle"]
+
+# The DOM is considered settled when it hasn't changed for this long
+DOM_QUIET_WINDOW_MS = 500
+
+# Resolves true once the document has had no mutations for the quiet window,
+# or false when the timeout is reached first (e.g. pages with tickers or long polling)
+_DOM_QUIET_SCRIPT = """
+([quietWindowMs, timeoutMs]) => new Promise((resolve) => {
+    let quietTimer = null;
+    let timeoutTimer = null;
+    const done = (quiet) => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(timeoutTimer);
+        resolve(quiet);
+    };
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => done(true), quietWindowMs);
+    });
+    observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+    quietTimer = setTimeout(() => done(true), quietWindowMs);
+    timeoutTimer = setTimeout(() => done(false), timeoutMs);
+})
+"""
+
+
+def _block_resources(route):
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        route.abort()
+    else:
+        route.continue_()
+
+
+def _goto_page(page, url, wait_until, ready_selector, timeout, block_resources):
+    """
+    Navigate to the URL and wait until the page is ready, according to the given strategy.
+
+    - `domcontentloaded`: the HTML is parsed, scripts may still be rendering content.
+    - `dom_quiet`: the DOM has had no changes for DOM_QUIET_WINDOW_MS.
+    - `networkidle`: the page is loaded and there have been no network requests for 500 ms.
+
+    When a ready selector is given, the page is ready once an element matching it is attached,
+    whatever the strategy. None of the waits fail the navigation, after the timeout
+    the page is used as it is.
+    """
+    if wait_until not in PAGE_READY_STRATEGIES:
+        raise ActionError(
+            f"Unknown page ready strategy '{wait_until}', use one of: {', '.join(PAGE_READY_STRATEGIES)}"
+        )
+
+    if block_resources:
+        page.route("**/*", _block_resources)
+
+    try:
+        if wait_until == "networkidle" and not ready_selector:
+            response = page.goto(url)
+        else:
+            response = page.goto(url, wait_until="domcontentloaded")
+
+        try:
+            if ready_selector:
+                page.wait_for_selector(ready_selector, state="attached", timeout=timeout)
+            elif wait_until == "dom_quiet":
+                page.evaluate(_DOM_QUIET_SCRIPT, [DOM_QUIET_WINDOW_MS, timeout])
+            elif wait_until == "networkidle":
+                page.wait_for_load_state("networkidle", timeout=timeout)
+        except PlaywrightError as e:
+            # Timeouts, or the page navigating again (e.g. a client-side redirect) while waiting
+            print(f"page ready wait ended early: {e}")
+    finally:
+        if block_resources:
+            # The page is shared with the other actions, which may want the resources
+            page.unroute("**/*", _block_resources)
+
+    return response
+
+
 def _get_filename_from_cd(cd):
     """
     Get filename from content-disposition header if available.
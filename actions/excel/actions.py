@@ -5,10 +5,10 @@ retrieving and setting data from/into their cells.
 """
 
 import contextlib
+import functools
 import os
 import re
 import tempfile
-from copy import copy
 from datetime import datetime
 from pathlib import Path
 
@@ -16,6 +16,7 @@ import openpyxl.utils
 from models import (
     CrossReferenceResult,
     Header,
+    RangeUpdate,
     Row,
     Schema,
     Sheet,
@@ -287,31 +288,115 @@ def update_sheet_rows(
     Returns:
          Message indicating the success or failure of the operation.
     """
-    start_column, start_row = _extract_column_and_row(start_cell)
-    start_column_number = _column_to_number(start_column)
-    start_row = int(start_row)
-
     data = data if isinstance(data, list) else data.as_list()
     with _open_workbook(file_path, sheet_name, sheet_required=True) as (
-        workbook,
+        _,
         worksheet,
     ):
-        for i, row_values in enumerate(data):
-            current_row = start_row + i  # Move down rows
-
-            for j, value in enumerate(row_values):
-                column_number = start_column_number + j  # Move across columns
-                start_column_letter = openpyxl.utils.get_column_letter(column_number)
-                update_cell_value(
-                    worksheet,
-                    f"{start_column_letter}{current_row}",
-                    str(value),
-                    overwrite,
-                )
-        workbook.save(file_path)
+        _write_block(worksheet, start_cell, data, overwrite)
     return Response(result="Rows were successfully updated.")
 
 
+@action(is_consequential=True)
+def update_sheet_ranges(
+    file_path: str,
+    sheet_name: str,
+    updates: list[RangeUpdate],
+    overwrite: bool = False,
+) -> Response[str]:
+    """Update several ranges of cells in a worksheet at once, using A1 notation.
+
+    Prefer this over calling `update_sheet_rows` repeatedly, as the workbook is opened and
+    saved only once for all the updates.
+
+    Args:
+        file_path: The file name or a local path pointing to the workbook file.
+        sheet_name: The name of the sheet you want to store the rows into.
+        updates: The ranges to update, each with its start cell and the data to insert from there.
+        overwrite: If True, the data will overwrite the existing data in the cells.
+
+    Returns:
+         Message indicating the success or failure of the operation.
+    """
+    with _open_workbook(file_path, sheet_name, sheet_required=True) as (
+        _,
+        worksheet,
+    ):
+        updated = sum(
+            _write_block(worksheet, update.start_cell, update.data.as_list(), overwrite)
+            for update in updates
+        )
+    return Response(
+        result=f"{updated} cell(s) in {len(updates)} range(s) were successfully updated."
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _number_format_kind(number_format: str) -> str:
+    # Resolved once per distinct number format, instead of once per written cell.
+    if number_format.endswith("%"):
+        return "percentage"
+    elif "General" in number_format or "0" in number_format:
+        return "number"
+    return "text"
+
+
+def _convert_value(value, number_format: str):
+    """Convert value to appropriate type based on current cell format."""
+    if not isinstance(value, str) or value.startswith("="):  # Formula
+        return value
+
+    kind = _number_format_kind(number_format)
+    if kind == "percentage":
+        try:
+            return float(value.rstrip("%")) / 100
+        except ValueError:
+            return value
+    elif kind == "number":
+        try:
+            if "." in value:
+                return float(value)
+            else:
+                return int(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _write_block(
+    ws: Worksheet, start_cell: str, data: list[list], overwrite: bool = False
+) -> int:
+    """Write a 2D block of values starting from `start_cell`, returning the number of cells written.
+
+    Only the cell values are assigned, so fonts, fills, borders, alignment, number formats and
+    comments stay as they are - no style objects get copied per cell.
+    """
+    start_column, start_row = _extract_column_and_row(start_cell)
+    start_column_number = _column_to_number(start_column.upper())
+    start_row = int(start_row)
+
+    sheet = ws._workbook.excel.book[ws.name]
+    written = 0
+
+    for i, row_values in enumerate(data):
+        for j, value in enumerate(row_values):
+            cell = sheet.cell(row=start_row + i, column=start_column_number + j)
+
+            # Check if the cell contains a formula
+            if (
+                not overwrite
+                and isinstance(cell.value, str)
+                and cell.value.startswith("=")
+            ):
+                print(f"Cannot overwrite formula in {cell.coordinate}")
+                continue
+
+            cell.value = _convert_value(str(value), cell.number_format)
+            written += 1
+
+    return written
+
+
 def update_cell_value(
     ws: Worksheet, cell_reference: str, value: str, overwrite: bool = False
 ) -> None:
@@ -325,58 +410,7 @@ def update_cell_value(
         value: Value to insert into the cell
         overwrite: If True, the data will overwrite the existing formula in the cells.
     """
-    worksheet = ws._workbook.excel.book.active
-    cell = worksheet[cell_reference]
-
-    # Check if the cell contains a formula
-    has_existing_formula = isinstance(cell.value, str) and cell.value.startswith("=")
-    if has_existing_formula and not overwrite:
-        print(f"Cannot overwrite formula in {cell_reference}")
-        return
-    # Store all formatting attributes
-    font = copy(cell.font)
-    fill = copy(cell.fill)
-    border = copy(cell.border)
-    alignment = copy(cell.alignment)
-    number_format = cell.number_format
-
-    # Store comment if exists
-    comment = cell.comment
-    # Convert value to appropriate type based on current cell format
-    if isinstance(value, str):
-        if value.startswith("="):  # Formula
-            converted_value = value
-        elif number_format.endswith("%"):  # Percentage
-            try:
-                converted_value = float(value.rstrip("%")) / 100
-            except ValueError:
-                converted_value = value
-        elif "General" in number_format or "0" in number_format:  # Number
-            try:
-                if "." in value:
-                    converted_value = float(value)
-                else:
-                    converted_value = int(value)
-            except ValueError:
-                converted_value = value
-        else:  # Default to string
-            converted_value = value
-    else:
-        converted_value = value
-
-    # Set the new value
-    cell.value = converted_value
-
-    # Reapply all formatting
-    cell.font = font
-    cell.fill = fill
-    cell.border = border
-    cell.alignment = alignment
-    cell.number_format = number_format
-
-    # Reapply comment if it existed
-    if comment:
-        cell.comment = comment
+    _write_block(ws, cell_reference, [[value]], overwrite)
 
 
 @action(is_consequential=False)
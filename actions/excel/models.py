@@ -31,6 +31,13 @@ class Table(BaseModel):
         return [row.as_list() for row in self.rows]
 
 
+class RangeUpdate(BaseModel):
+    start_cell: Annotated[
+        str, Field(description="The cell from where to start the update, in A1 notation")
+    ]
+    data: Annotated[Table, Field(description="Data to be inserted from the start cell")]
+
+
 class Sheet(BaseModel):
     name: Annotated[str, Field(description="Sheet name")]
     data_range: Annotated[str, Field(description="Data range")]
@@ -22,6 +22,7 @@ from typing_extensions import Self
 
 from models.documents import CommentAuthor, CommentInfo, DocumentInfo, MarkdownDocument, RawDocument, SearchResult, TabInfo
 from models.update_operations import BatchUpdateBody
+from search_index import DocumentSearchIndex, get_bigrams
 
 
 class Context:
@@ -2201,6 +2202,10 @@ def search_documents(
             search_results = []
             search_query_lower = search_query.lower()
 
+            # Extracted text of documents seen before is reused from the local index,
+            # documents are only fetched again when their modifiedTime changed.
+            search_index = DocumentSearchIndex()
+
             for file in all_files:
                 file_name = file.get('name', '')
                 file_name_lower = file_name.lower()
@@ -2248,9 +2253,12 @@ def search_documents(
                 # Search content if enabled (expensive operation)
                 if search_content and total_score < 0.8:  # Only search content if not already high scoring
                     try:
-                        # Get document content for searching
-                        doc_data = ctx.documents.get(documentId=file['id']).execute()
-                        content = _extract_text_from_document(doc_data)
+                        # Get document content for searching, from the index if the document did not change
+                        content = search_index.get_text(file['id'], file.get('modifiedTime'))
+                        if content is None:
+                            doc_data = ctx.documents.get(documentId=file['id']).execute()
+                            content = _extract_text_from_document(doc_data)
+                            search_index.put_text(file['id'], file.get('modifiedTime'), content)
                         content_lower = content.lower()
 
                         # Search in content
@@ -2284,6 +2292,8 @@ def search_documents(
 
                     search_results.append(result_item)
 
+            search_index.save()
+
             # Sort by similarity score (descending) and limit results
             search_results.sort(key=lambda x: x.similarity_score, reverse=True)
             search_results = search_results[:max_results]
@@ -2334,9 +2344,6 @@ def _simple_similarity(s1: str, s2: str) -> float:
         return 0.0
 
     # Calculate Jaccard similarity using character bigrams
-    def get_bigrams(s):
-        return set(s[i:i+2] for i in range(len(s)-1))
-
     bigrams1 = get_bigrams(s1)
     bigrams2 = get_bigrams(s2)
 
@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+import threading
+
+# Bump when the format of the stored entries changes, older index files are then ignored.
+INDEX_VERSION = 1
+
+# Document text is private to the user, the index is kept in a folder only they can read
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.expanduser("~"), ".sema4ai", "google-docs", "search_index.json"
+)
+
+
+def get_bigrams(text: str) -> set[str]:
+    """Return the set of character bigrams of the given text."""
+    return set(text[i:i + 2] for i in range(len(text) - 1))
+
+
+class DocumentSearchIndex:
+    """On-disk index of extracted document text, keyed by file id and modifiedTime.
+
+    Entries are only ever served for file ids returned by the caller's own Drive listing,
+    so documents are not exposed to accounts that can't list them anyway.
+    The location can be overridden with the GOOGLE_DOCS_SEARCH_INDEX_PATH environment variable.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, path: str | None = None):
+        self._path = path or os.environ.get("GOOGLE_DOCS_SEARCH_INDEX_PATH") or DEFAULT_INDEX_PATH
+        self._entries: dict[str, dict] | None = None
+        self._dirty = False
+
+    def _load(self) -> dict[str, dict]:
+        """Read the index file on first use, so searches which don't need any text don't read it at all."""
+        if self._entries is not None:
+            return self._entries
+
+        self._entries = {}
+        try:
+            with open(self._path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return self._entries
+
+        if data.get("version") == INDEX_VERSION:
+            self._entries = data.get("documents", {})
+        return self._entries
+
+    def get_text(self, file_id: str, modified_time: str | None) -> str | None:
+        """Return the indexed text of the document, or None if it is missing or outdated."""
+        entry = self._load().get(file_id)
+        if entry is None or modified_time is None or entry.get("modified_time") != modified_time:
+            return None
+
+        return entry.get("text")
+
+    def put_text(self, file_id: str, modified_time: str | None, text: str) -> None:
+        if modified_time is None:
+            return
+
+        entries = self._load()
+        entry = entries.get(file_id)
+        if entry is not None and entry.get("modified_time") == modified_time and entry.get("text") == text:
+            return
+
+        entries[file_id] = {"modified_time": modified_time, "text": text}
+        self._dirty = True
+
+    def save(self) -> None:
+        """Write the index to disk, if anything changed. Failures are not fatal, the index is only a cache."""
+        if not self._dirty:
+            return
+
+        with self._lock:
+            try:
+                directory = os.path.dirname(self._path)
+                if directory:
+                    os.makedirs(directory, mode=0o700, exist_ok=True)
+                if self._path == DEFAULT_INDEX_PATH:
+                    os.chmod(directory, 0o700)
+
+                # mkstemp creates the file readable only by the user, it keeps that mode when replacing the index
+                fd, temp_path = tempfile.mkstemp(dir=directory or None, suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as file:
+                    json.dump({"version": INDEX_VERSION, "documents": self._entries}, file)
+
+                os.replace(temp_path, self._path)
+                self._dirty = False
+            except OSError as e:
+                print(f"Warning: Could not save search index to {self._path}: {str(e)}")
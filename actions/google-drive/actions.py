@@ -3,8 +3,11 @@ from pathlib import Path
 from typing import Literal, Optional, Union
 import csv
 import io
+import tempfile
 
 from dotenv import load_dotenv
+from downloads import download_files
+from folder_paths import get_cache_scope, resolve_file_locations
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import Resource, build
 from googleapiclient.errors import HttpError
@@ -14,11 +17,23 @@ from sema4ai.actions import OAuth2Secret, action, chat, ActionError
 
 load_dotenv(Path(__file__).absolute().parent / "devdata" / ".env")
 
+# Largest page size accepted by files.list
+MAX_PAGE_SIZE = 1000
+
 EXPORT_MIMETYPE_MAP = {
     "application/vnd.google-apps.spreadsheet": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
     "application/vnd.google-apps.document": "text/plain",
 }
 
+# Formats Google-native files are attached in, the smallest of the supported export formats
+# that keeps the content. Spreadsheets stay as Excel, CSV would only export the first sheet.
+ATTACHMENT_EXPORT_MIMETYPE_MAP = {
+    **EXPORT_MIMETYPE_MAP,
+    "application/vnd.google-apps.presentation": "text/plain",
+    "application/vnd.google-apps.drawing": "image/svg+xml",
+    "application/vnd.google-apps.script": "application/vnd.google-apps.script+json",
+}
+
 
 def _build_service(credentials: OAuth2Secret) -> Resource:
     # Create the Google Drive V3 service interface
@@ -96,61 +111,6 @@ def _get_excel_content(file_content: BytesIO, worksheet: Optional[str] = None) -
     return df_cleaned.to_string(index=False)
 
 
-def _resolve_full_path(service: Resource, file: dict, id_to_file: dict) -> str:
-    path_parts = []
-    parents = file.get("parents", [])
-    drive_type = None
-    found_drive_root = False
-    while parents:
-        parent_id = parents[0]
-        parent = id_to_file.get(parent_id)
-        if not parent:
-            try:
-                parent = service.files().get(
-                    fileId=parent_id,
-                    fields="id, name, parents, driveId, mimeType",
-                    supportsAllDrives=True
-                ).execute()
-                id_to_file[parent_id] = parent
-            except Exception:
-                # Try as shared drive root
-                try:
-                    drive = service.drives().get(driveId=parent_id, fields="id, name").execute()
-                    path_parts.append(drive.get("name", "?"))
-                    drive_type = "shared"
-                    found_drive_root = True
-                    break
-                except Exception:
-                    path_parts.append("?")
-                    break
-        # If parent is the root of a shared drive (no parents, has driveId), use the drive's name
-        if parent.get("driveId", None) is not None and not parent.get("parents", []):
-            try:
-                drive = service.drives().get(driveId=parent.get("driveId"), fields="id, name").execute()
-                path_parts.append(drive.get("name", "?"))
-                drive_type = "shared"
-                found_drive_root = True
-            except Exception:
-                path_parts.append("?")
-            break
-        # If parent is the My Drive root, stop and mark
-        if parent.get("mimeType") == "application/vnd.google-apps.folder" and not parent.get("parents"):
-            path_parts.append(parent.get("name", "?"))
-            drive_type = "mydrive"
-            found_drive_root = True
-            break
-        path_parts.append(parent.get("name", "?"))
-        parents = parent.get("parents", [])
-    path_parts = list(reversed([p for p in path_parts if p]))
-    if drive_type == "shared" and found_drive_root:
-        path_parts = ["Shared Drives"] + path_parts
-    elif drive_type == "mydrive" and found_drive_root:
-        path_parts = ["My Drive"] + path_parts
-
-
-    return "/".join(path_parts) if path_parts else "/"
-
-
 def to_csv_for_filelist(file_list: FileList) -> str:
     # Convert FileList (with File or BasicFile objects) to CSV string
     if not file_list.files:
@@ -314,6 +274,26 @@ def _preprocess_query(service: Resource, query: str, search_all_drives: bool = F
     return query
 
 
+def _attach_files(credentials: OAuth2Secret, files: list[File]) -> None:
+    """Download the files concurrently and attach them to the chat, in the order of the list."""
+    with tempfile.TemporaryDirectory() as directory:
+        paths = download_files(
+            lambda: _build_service(credentials),
+            files,
+            directory,
+            ATTACHMENT_EXPORT_MIMETYPE_MAP,
+        )
+        for file_obj in files:
+            path = paths.get(file_obj.id)
+            if path is None:
+                continue
+            try:
+                chat.attach_file(path, name=file_obj.name)
+                file_obj.chat_filename = file_obj.name
+            except Exception as e:
+                print(f"Could not attach {file_obj.name}: {str(e)}")
+
+
 @action(is_consequential=False)
 def get_file_by_id(
     google_credentials: OAuth2Secret[
@@ -378,6 +358,7 @@ def get_files_by_query(
     basic_info_only: bool = False,
     save_result_as_csv: Union[bool, str] = False,
     attach: bool = False,
+    max_results: int = 1000,
 ) -> Response[FileList]:
     """Get all files from Google Drive that match the given query.
 
@@ -394,6 +375,7 @@ def get_files_by_query(
         save_result_as_csv: If True, saves results to 'query_result.csv'. If a string is provided,
             uses that as the filename to save the CSV results.
         attach: Whether to attach each file to the chat. Default is False.
+        max_results: Maximum number of files to return, -1 for all matching files. Default is 1000.
 
     Returns:
         A list of files or an error message if no files were found.
@@ -408,7 +390,7 @@ def get_files_by_query(
             "supportsAllDrives": True,
             "includeItemsFromAllDrives": True,
             "q": processed_query,
-            "fields": "files(id, name, mimeType, createdTime, modifiedTime, owners, size, version, webViewLink, permissions, parents, driveId)",
+            "fields": "nextPageToken, files(id, name, mimeType, createdTime, modifiedTime, owners, size, version, webViewLink, permissions, parents, driveId)",
         }
 
         if search_all_drives:
@@ -416,16 +398,25 @@ def get_files_by_query(
             list_args["spaces"] = "drive"
 
         print(f"Executing final query with args: {list_args}")
-        response = service.files().list(**list_args).execute()
-        files_data = response.get("files", [])
+        files_data = []
+        while True:
+            remaining = max_results - len(files_data) if max_results > 0 else MAX_PAGE_SIZE
+            list_args["pageSize"] = min(remaining, MAX_PAGE_SIZE)
+            response = service.files().list(**list_args).execute()
+            files_data.extend(response.get("files", []))
 
-        # Build a map of id to file for quick lookup
-        id_to_file = {f["id"]: f for f in files_data}
+            page_token = response.get("nextPageToken")
+            if not page_token or (max_results > 0 and len(files_data) >= max_results):
+                break
+            list_args["pageToken"] = page_token
 
         # Resolve location for each file
+        locations = resolve_file_locations(
+            service, files_data, get_cache_scope(google_credentials.access_token)
+        )
         files = []
         for f in files_data:
-            location = _resolve_full_path(service, f, id_to_file)
+            location = locations[f["id"]]
             if basic_info_only:
                 basic_file = BasicFile(
                     id=f.get("id"),
@@ -437,19 +428,11 @@ def get_files_by_query(
             else:
                 file_obj = File(**f)
                 file_obj.location = location
-                if attach and file_obj.mimeType != "application/vnd.google-apps.folder":
-                    try:
-                        # Use export if available, otherwise download as-is
-                        export_mime = EXPORT_MIMETYPE_MAP.get(file_obj.mimeType)
-                        file_bytes = _download_file_content(service, file_obj, mime_type=export_mime)
-                        if file_bytes is not None:
-                            chat_filename = file_obj.name
-                            chat.attach_file_content(name=chat_filename, data=file_bytes)
-                            file_obj.chat_filename = chat_filename
-                    except Exception:
-                        pass
                 files.append(file_obj)
 
+        if attach and not basic_info_only:
+            _attach_files(google_credentials, files)
+
         file_list = FileList(files=files)
         if not files:
             if "in parents" in query and "in parents" in processed_query:
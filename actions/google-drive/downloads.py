@@ -0,0 +1,160 @@
+"""Concurrent downloads of Drive files to temporary files, within per-file and total byte budgets.
+
+Content is streamed to disk in chunks, so memory use doesn't grow with the size of the files.
+Each worker thread uses a Drive service of its own, as the underlying HTTP client is not thread-safe.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from googleapiclient.discovery import Resource
+from googleapiclient.http import MediaIoBaseDownload
+from models import File
+
+MAX_CONCURRENT_DOWNLOADS = 4
+
+MAX_FILE_BYTES = 100 * 1024 * 1024
+
+MAX_TOTAL_BYTES = 500 * 1024 * 1024
+
+# Size of the ranges requested at a time, the budgets are checked after each of them
+DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+FOLDER_MIMETYPE = "application/vnd.google-apps.folder"
+
+
+class DownloadBudgetExceeded(Exception):
+    pass
+
+
+class ByteBudget:
+    """Total number of bytes that the downloads may use together."""
+
+    def __init__(self, max_bytes: int):
+        self._remaining = max_bytes
+        self._lock = threading.Lock()
+
+    def reserve(self, num_bytes: int) -> bool:
+        with self._lock:
+            if num_bytes > self._remaining:
+                return False
+            self._remaining -= num_bytes
+            return True
+
+    def release(self, num_bytes: int) -> None:
+        with self._lock:
+            self._remaining += num_bytes
+
+
+def download_to_file(
+    service: Resource,
+    file: File,
+    path: str,
+    export_mime_type: Optional[str],
+    max_file_bytes: int,
+    budget: ByteBudget,
+) -> int:
+    """Download or export the file to the given path, returning the number of bytes written.
+
+    Raises DownloadBudgetExceeded when the file doesn't fit the per-file or total budget,
+    nothing is then kept of it.
+    """
+    if export_mime_type:
+        request = service.files().export_media(fileId=file.id, mimeType=export_mime_type)
+        known_size = None
+    else:
+        request = service.files().get_media(fileId=file.id)
+        known_size = int(file.size) if file.size else None
+
+    # The size of stored files is known, those are checked and reserved before downloading anything
+    reserved = 0
+    if known_size is not None:
+        if known_size > max_file_bytes:
+            raise DownloadBudgetExceeded(f"{file.name} is larger than {max_file_bytes} bytes")
+        if not budget.reserve(known_size):
+            raise DownloadBudgetExceeded(f"{file.name} doesn't fit in the total download budget")
+        reserved = known_size
+
+    try:
+        with open(path, "wb") as fh:
+            downloader = MediaIoBaseDownload(fh, request, chunksize=DOWNLOAD_CHUNK_SIZE)
+            done = False
+            while not done:
+                _, done = downloader.next_chunk()
+                written = fh.tell()
+                if written > max_file_bytes:
+                    raise DownloadBudgetExceeded(f"{file.name} is larger than {max_file_bytes} bytes")
+                if written > reserved:
+                    if not budget.reserve(written - reserved):
+                        raise DownloadBudgetExceeded(
+                            f"{file.name} doesn't fit in the total download budget"
+                        )
+                    reserved = written
+        budget.release(reserved - written)
+        return written
+    except BaseException:
+        budget.release(reserved)
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+
+def download_files(
+    service_factory: Callable[[], Resource],
+    files: list[File],
+    directory: str,
+    export_mime_types: dict[str, str],
+    max_workers: int = MAX_CONCURRENT_DOWNLOADS,
+    max_file_bytes: int = MAX_FILE_BYTES,
+    max_total_bytes: int = MAX_TOTAL_BYTES,
+) -> dict[str, str]:
+    """Download the files concurrently into the directory.
+
+    Google-native files are exported to the mime type given for them in export_mime_types.
+
+    Returns:
+        The paths of the downloaded files by file id. Files which failed
+        or didn't fit the budgets are left out.
+    """
+    files = [f for f in files if f.mimeType != FOLDER_MIMETYPE]
+    if not files:
+        return {}
+
+    budget = ByteBudget(max_total_bytes)
+    local = threading.local()
+    services = []
+    services_lock = threading.Lock()
+
+    def get_service() -> Resource:
+        if not hasattr(local, "service"):
+            local.service = service_factory()
+            with services_lock:
+                services.append(local.service)
+        return local.service
+
+    def download(index: int, file: File) -> Optional[str]:
+        path = os.path.join(directory, f"{index}.download")
+        try:
+            download_to_file(
+                get_service(),
+                file,
+                path,
+                export_mime_types.get(file.mimeType),
+                max_file_bytes,
+                budget,
+            )
+            return path
+        except Exception as e:
+            print(f"Could not download {file.name} ({file.id}): {str(e)}")
+            return None
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(files))) as executor:
+            paths = list(executor.map(download, range(len(files)), files))
+    finally:
+        for service in services:
+            service.close()
+
+    return {file.id: path for file, path in zip(files, paths) if path is not None}
@@ -0,0 +1,181 @@
+"""Resolution of the folder path (location) of Drive files, with batched lookups and a process-level cache.
+
+Parents are fetched one tree level at a time, all folders of a level in one request to the
+Drive batch endpoint. Resolved paths are kept per folder id for FOLDER_PATH_TTL_SECONDS, so
+files of the same folders, and later queries, don't walk the same ancestors again.
+"""
+
+import hashlib
+import threading
+import time
+from typing import Optional
+
+from googleapiclient.discovery import Resource
+
+FOLDER_MIMETYPE = "application/vnd.google-apps.folder"
+
+FOLDER_PATH_TTL_SECONDS = 300
+
+# The Drive batch endpoint accepts at most 100 calls per request
+BATCH_SIZE = 100
+
+FOLDER_FIELDS = "id, name, parents, driveId, mimeType"
+
+
+class FolderPathCache:
+    """Folder id to path cache, shared by all the action calls of the process.
+
+    Paths are cached per scope, derived from the caller's credentials, so folder names are
+    not served to accounts which may not be able to read them.
+    """
+
+    def __init__(self, ttl_seconds: float = FOLDER_PATH_TTL_SECONDS):
+        self._ttl_seconds = ttl_seconds
+        self._paths: dict[tuple[str, str], tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, scope: str, folder_id: str) -> Optional[str]:
+        with self._lock:
+            entry = self._paths.get((scope, folder_id))
+            if entry is None:
+                return None
+            expires_at, path = entry
+            if expires_at < time.monotonic():
+                del self._paths[(scope, folder_id)]
+                return None
+            return path
+
+    def put_many(self, scope: str, paths: dict[str, str]) -> None:
+        expires_at = time.monotonic() + self._ttl_seconds
+        with self._lock:
+            # Expired entries are dropped on writes, so the cache doesn't grow without bound
+            now = time.monotonic()
+            for key in [key for key, (expiry, _) in self._paths.items() if expiry < now]:
+                del self._paths[key]
+            for folder_id, path in paths.items():
+                self._paths[(scope, folder_id)] = (expires_at, path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._paths.clear()
+
+
+folder_path_cache = FolderPathCache()
+
+
+def get_cache_scope(access_token: str) -> str:
+    return hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+
+
+def _batch_get(service: Resource, ids: list[str], make_request) -> dict[str, dict]:
+    """Execute one request per id through the batch endpoint, returning the successful responses by id."""
+    results = {}
+
+    def callback(request_id, response, exception):
+        if exception is None:
+            results[request_id] = response
+
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=callback)
+        for item_id in ids[start:start + BATCH_SIZE]:
+            batch.add(make_request(item_id), request_id=item_id)
+        batch.execute()
+
+    return results
+
+
+def _child_path(parent_path: str, name: Optional[str]) -> str:
+    if not name:
+        return parent_path
+    if parent_path == "/":
+        return name
+    return f"{parent_path}/{name}"
+
+
+def resolve_file_locations(service: Resource, files: list[dict], scope: str) -> dict[str, str]:
+    """Return the location of each of the files by file id, e.g. 'My Drive/Folder1/Folder2'.
+
+    Ancestors the caller can't read are shown as '?'.
+    """
+    # Files of the result which are folders are parents themselves, no need to fetch them
+    folders: dict[str, dict] = {f["id"]: f for f in files}
+    paths: dict[str, str] = {}
+    missing: set[str] = set()
+
+    def needs_lookup(folder_id: str) -> bool:
+        if folder_id in paths or folder_id in missing:
+            return False
+        cached = folder_path_cache.get(scope, folder_id)
+        if cached is not None:
+            paths[folder_id] = cached
+            return False
+        return True
+
+    # Walk up one level of the trees at a time, until reaching roots or cached folders
+    level = {f["parents"][0] for f in files if f.get("parents")}
+    while level:
+        level = {folder_id for folder_id in level if needs_lookup(folder_id)}
+        to_fetch = sorted(folder_id for folder_id in level if folder_id not in folders)
+        fetched = _batch_get(
+            service,
+            to_fetch,
+            lambda folder_id: service.files().get(
+                fileId=folder_id, fields=FOLDER_FIELDS, supportsAllDrives=True
+            ),
+        )
+        folders.update(fetched)
+        missing.update(folder_id for folder_id in to_fetch if folder_id not in fetched)
+
+        level = {
+            folders[folder_id]["parents"][0]
+            for folder_id in level
+            if folder_id in folders and folders[folder_id].get("parents")
+        }
+
+    # Roots of shared drives are named after the drive. Ids which couldn't be read
+    # as folders may be shared drive ids themselves.
+    drive_ids = set(missing)
+    for folder in folders.values():
+        if folder.get("driveId") is not None and not folder.get("parents"):
+            drive_ids.add(folder["driveId"])
+    drives = _batch_get(
+        service,
+        sorted(drive_ids),
+        lambda drive_id: service.drives().get(driveId=drive_id, fields="id, name"),
+    )
+
+    def shared_drive_path(drive_id: str) -> str:
+        if drive_id not in drives:
+            return "?"
+        return _child_path("Shared Drives", drives[drive_id].get("name", "?"))
+
+    resolved: dict[str, str] = {}
+
+    def folder_path(folder_id: str) -> str:
+        if folder_id in paths:
+            return paths[folder_id]
+
+        folder = folders.get(folder_id)
+        if folder is None:
+            path = shared_drive_path(folder_id)
+        elif folder.get("driveId") is not None and not folder.get("parents"):
+            path = shared_drive_path(folder["driveId"])
+        elif folder.get("mimeType") == FOLDER_MIMETYPE and not folder.get("parents"):
+            path = _child_path("My Drive", folder.get("name", "?"))
+        else:
+            parents = folder.get("parents", [])
+            parent_path = folder_path(parents[0]) if parents else "/"
+            path = _child_path(parent_path, folder.get("name", "?"))
+
+        paths[folder_id] = path
+        resolved[folder_id] = path
+        return path
+
+    locations = {
+        f["id"]: folder_path(f["parents"][0]) if f.get("parents") else "/"
+        for f in files
+    }
+
+    folder_path_cache.put_many(scope, resolved)
+
+    return locations
@@ -0,0 +1,168 @@
+import os
+import threading
+from pathlib import Path
+
+import downloads
+import pytest
+from downloads import FOLDER_MIMETYPE, ByteBudget, download_files
+from models import File
+
+DOC_MIMETYPE = "application/vnd.google-apps.document"
+
+
+class FakeMediaRequest:
+    def __init__(self, data: bytes | None):
+        self.data = data
+
+
+class FakeMediaIoBaseDownload:
+    """Writes the content of the request to the file handle, one chunk at a time."""
+
+    def __init__(self, fh, request: FakeMediaRequest, chunksize: int):
+        if request.data is None:
+            raise IOError("HTTP 500")
+        self._fh = fh
+        self._data = request.data
+        self._chunksize = chunksize
+        self._position = 0
+
+    def next_chunk(self):
+        self._fh.write(self._data[self._position : self._position + self._chunksize])
+        self._position += self._chunksize
+        return None, self._position >= len(self._data)
+
+
+class FakeDriveService:
+    def __init__(self, contents: dict[str, bytes | None], exports: dict[str, bytes]):
+        self._contents = contents
+        self._exports = exports
+        self.closed = False
+
+    def files(self) -> "FakeDriveService":
+        return self
+
+    def get_media(self, fileId: str) -> FakeMediaRequest:
+        return FakeMediaRequest(self._contents[fileId])
+
+    def export_media(self, fileId: str, mimeType: str) -> FakeMediaRequest:
+        return FakeMediaRequest(self._exports[fileId])
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def _file(file_id: str, size: int | None = None, mime_type: str = "application/pdf") -> File:
+    return File(
+        id=file_id,
+        name=f"{file_id}.bin",
+        mimeType=mime_type,
+        createdTime="2026-01-01T00:00:00Z",
+        modifiedTime="2026-01-01T00:00:00Z",
+        version="1",
+        webViewLink=f"https://drive/{file_id}",
+        size=str(size) if size is not None else None,
+    )
+
+
+@pytest.fixture(autouse=True)
+def fake_downloader(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(downloads, "MediaIoBaseDownload", FakeMediaIoBaseDownload)
+    monkeypatch.setattr(downloads, "DOWNLOAD_CHUNK_SIZE", 16)
+
+
+@pytest.fixture
+def services() -> list[FakeDriveService]:
+    return []
+
+
+@pytest.fixture
+def service_factory(services: list[FakeDriveService]):
+    lock = threading.Lock()
+
+    def factory() -> FakeDriveService:
+        service = FakeDriveService(
+            {"a": b"a" * 100, "b": b"b" * 60, "broken": None},
+            {"doc": b"exported text"},
+        )
+        with lock:
+            services.append(service)
+        return service
+
+    return factory
+
+
+class TestByteBudget:
+    """Tests for the shared total budget of the downloads."""
+
+    def test_reserve_and_release(self) -> None:
+        budget = ByteBudget(100)
+
+        assert budget.reserve(100)
+        assert not budget.reserve(1)
+
+        budget.release(40)
+
+        assert budget.reserve(40)
+        assert not budget.reserve(1)
+
+
+class TestDownloadFiles:
+    """Tests for downloading Drive files within the per-file and total budgets."""
+
+    def test_downloads_and_exports(self, service_factory, services, tmp_path: Path) -> None:
+        files = [
+            _file("a", 100),
+            _file("doc", mime_type=DOC_MIMETYPE),
+            _file("folder", mime_type=FOLDER_MIMETYPE),
+        ]
+
+        paths = download_files(service_factory, files, str(tmp_path), {DOC_MIMETYPE: "text/plain"})
+
+        assert set(paths) == {"a", "doc"}
+        assert Path(paths["a"]).read_bytes() == b"a" * 100
+        assert Path(paths["doc"]).read_bytes() == b"exported text"
+        assert services and all(service.closed for service in services)
+
+    def test_file_over_limit(self, service_factory, tmp_path: Path) -> None:
+        paths = download_files(
+            service_factory, [_file("a", 100), _file("b", 60)], str(tmp_path), {}, max_file_bytes=80
+        )
+
+        assert set(paths) == {"b"}
+
+    def test_export_over_limit(self, service_factory, tmp_path: Path) -> None:
+        paths = download_files(
+            service_factory,
+            [_file("doc", mime_type=DOC_MIMETYPE)],
+            str(tmp_path),
+            {DOC_MIMETYPE: "text/plain"},
+            max_file_bytes=5,
+        )
+
+        assert paths == {}
+        assert not os.listdir(tmp_path)
+
+    def test_total_budget(self, service_factory, tmp_path: Path) -> None:
+        paths = download_files(
+            service_factory,
+            [_file("a", 100), _file("b", 60)],
+            str(tmp_path),
+            {},
+            max_workers=1,
+            max_total_bytes=120,
+        )
+
+        assert set(paths) == {"a"}
+        assert os.listdir(tmp_path) == [os.path.basename(paths["a"])]
+
+    def test_failed_file_releases_its_budget(self, service_factory, tmp_path: Path) -> None:
+        paths = download_files(
+            service_factory,
+            [_file("broken", 100), _file("b", 60)],
+            str(tmp_path),
+            {},
+            max_workers=1,
+            max_total_bytes=120,
+        )
+
+        assert set(paths) == {"b"}
@@ -0,0 +1,141 @@
+import pytest
+from folder_paths import FOLDER_MIMETYPE, folder_path_cache, resolve_file_locations
+
+
+class FakeRequest:
+    def __init__(self, result: dict | None):
+        self.result = result
+
+
+class FakeBatch:
+    def __init__(self, service: "FakeDriveService", callback):
+        self._service = service
+        self._callback = callback
+        self._requests: list[tuple[str, FakeRequest]] = []
+
+    def add(self, request: FakeRequest, request_id: str) -> None:
+        self._requests.append((request_id, request))
+
+    def execute(self) -> None:
+        self._service.batches.append([request_id for request_id, _ in self._requests])
+        for request_id, request in self._requests:
+            if request.result is None:
+                self._callback(request_id, None, Exception("File not found"))
+            else:
+                self._callback(request_id, request.result, None)
+
+
+class FakeDriveService:
+    """Drive service answering files().get and drives().get from dicts, only through batches."""
+
+    def __init__(self, folders: dict[str, dict], drives: dict[str, dict]):
+        self.folders = folders
+        self.drives_by_id = drives
+        self.batches: list[list[str]] = []
+
+    def new_batch_http_request(self, callback) -> FakeBatch:
+        return FakeBatch(self, callback)
+
+    def files(self) -> "FakeDriveService":
+        return self
+
+    def drives(self) -> "FakeDriveService":
+        return self
+
+    def get(self, fileId: str = None, driveId: str = None, **kwargs) -> FakeRequest:
+        if driveId is not None:
+            return FakeRequest(self.drives_by_id.get(driveId))
+        return FakeRequest(self.folders.get(fileId))
+
+
+def _folder(folder_id: str, name: str, parent: str | None = None, drive_id: str | None = None) -> dict:
+    folder = {"id": folder_id, "name": name, "mimeType": FOLDER_MIMETYPE}
+    if parent is not None:
+        folder["parents"] = [parent]
+    if drive_id is not None:
+        folder["driveId"] = drive_id
+    return folder
+
+
+def _file(file_id: str, parent: str | None) -> dict:
+    return {"id": file_id, "name": file_id, "parents": [parent] if parent else []}
+
+
+@pytest.fixture
+def service() -> FakeDriveService:
+    folders = {
+        "root": _folder("root", "My Drive"),
+        "projects": _folder("projects", "Projects", "root"),
+        "alpha": _folder("alpha", "Alpha", "projects"),
+        "beta": _folder("beta", "Beta", "projects"),
+        "drive-1": _folder("drive-1", "Drive", drive_id="drive-1"),
+        "team": _folder("team", "Team", "drive-1", drive_id="drive-1"),
+    }
+    drives = {"drive-1": {"id": "drive-1", "name": "Sales"}}
+    return FakeDriveService(folders, drives)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    folder_path_cache.clear()
+    yield
+    folder_path_cache.clear()
+
+
+class TestResolveFileLocations:
+    """Tests for resolving file locations with batched, cached folder lookups."""
+
+    def test_my_drive_paths(self, service: FakeDriveService) -> None:
+        locations = resolve_file_locations(
+            service, [_file("a.txt", "alpha"), _file("b.txt", "beta"), _file("c.txt", "root")], "scope"
+        )
+
+        assert locations == {
+            "a.txt": "My Drive/My Drive/Projects/Alpha",
+            "b.txt": "My Drive/My Drive/Projects/Beta",
+            "c.txt": "My Drive/My Drive",
+        }
+
+    def test_one_batch_per_tree_level(self, service: FakeDriveService) -> None:
+        resolve_file_locations(service, [_file("a.txt", "alpha"), _file("b.txt", "beta")], "scope")
+
+        assert service.batches == [["alpha", "beta"], ["projects"], ["root"]]
+
+    def test_folders_of_the_result_are_not_fetched(self, service: FakeDriveService) -> None:
+        files = [service.folders["projects"], _file("a.txt", "projects")]
+
+        locations = resolve_file_locations(service, files, "scope")
+
+        assert locations == {"projects": "My Drive/My Drive", "a.txt": "My Drive/My Drive/Projects"}
+        assert service.batches == [["root"]]
+
+    def test_shared_drive_paths(self, service: FakeDriveService) -> None:
+        locations = resolve_file_locations(
+            service, [_file("a.txt", "team"), _file("b.txt", "drive-1")], "scope"
+        )
+
+        assert locations == {"a.txt": "Shared Drives/Sales/Team", "b.txt": "Shared Drives/Sales"}
+
+    def test_unreadable_parents(self, service: FakeDriveService) -> None:
+        service.folders["projects"]["parents"] = ["hidden"]
+
+        locations = resolve_file_locations(service, [_file("a.txt", "alpha"), _file("b.txt", None)], "scope")
+
+        assert locations == {"a.txt": "?/Projects/Alpha", "b.txt": "/"}
+
+    def test_cached_paths_are_reused(self, service: FakeDriveService) -> None:
+        resolve_file_locations(service, [_file("a.txt", "alpha")], "scope")
+        service.batches.clear()
+
+        locations = resolve_file_locations(service, [_file("b.txt", "beta")], "scope")
+
+        assert locations == {"b.txt": "My Drive/My Drive/Projects/Beta"}
+        assert service.batches == [["beta"]]
+
+    def test_cache_is_per_scope(self, service: FakeDriveService) -> None:
+        resolve_file_locations(service, [_file("a.txt", "alpha")], "scope")
+        service.batches.clear()
+
+        resolve_file_locations(service, [_file("a.txt", "alpha")], "other-scope")
+
+        assert service.batches == [["alpha"], ["projects"], ["root"]]
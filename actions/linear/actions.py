@@ -3,19 +3,13 @@ import json
 from models import FilterOptions, Issue, IssueList
 from queries import (
     query_add_comment,
-    query_create_issue,
     query_get_issues,
     query_search_issues,
 )
 from sema4ai.actions import Response, Secret, action
 from support import (
-    _get_assignee_id,
-    _get_label_ids,
-    _get_project_id,
-    _get_projects,
-    _get_state_id,
-    _get_team_id,
-    _get_teams,
+    _create_issue,
+    _get_issue_input,
     _make_graphql_request,
     _set_default_variables,
     _set_query_variables,
@@ -71,30 +65,8 @@ def create_issue(
     Returns:
         The created issue details
     """
-    projects_result = _get_projects(api_key)
-    teams_result = _get_teams(api_key)
-    team_id = _get_team_id(issue_details, teams_result)
-    input_vars = {
-        "teamId": team_id,
-        "title": issue_details.title,
-    }
-
-    # Add optional fields if provided
-    if issue_details.description:
-        input_vars["description"] = issue_details.description
-    if issue_details.assignee:
-        input_vars["assigneeId"] = _get_assignee_id(issue_details, api_key)
-    if issue_details.project:
-        input_vars["projectId"] = _get_project_id(issue_details, projects_result)
-    if issue_details.state:
-        input_vars["stateId"] = _get_state_id(issue_details, team_id, teams_result)
-    if issue_details.labels:
-        label_ids = _get_label_ids(issue_details, api_key)
-        if label_ids:
-            input_vars["labelIds"] = label_ids
-    variables = {"input": input_vars}
-
-    issue_response = _make_graphql_request(query_create_issue, variables, api_key)
+    input_vars = _get_issue_input(issue_details, api_key)
+    issue_response = _create_issue(input_vars, api_key)
     return Response(result=json.dumps(issue_response))
 
 
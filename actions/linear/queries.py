@@ -201,3 +201,76 @@ query WorkflowStates($teamId: String!) {
     }
 }
 """
+
+# Everything create_issue needs to resolve names to ids, in one request.
+# Users and labels beyond the first page are fetched with query_get_users and query_get_labels.
+query_get_workspace = """
+query Workspace {
+    teams {
+        nodes {
+            id
+            name
+            key
+            description
+            states {
+                nodes {
+                    id
+                    name
+                    type
+                    color
+                }
+            }
+        }
+    }
+    projects {
+        nodes {
+            id
+            name
+            description
+            startDate
+            targetDate
+        }
+    }
+    users(first: 250) {
+        nodes {
+            id
+            name
+            email
+            displayName
+        }
+        pageInfo {
+            hasNextPage
+            endCursor
+        }
+    }
+    issueLabels(first: 250) {
+        nodes {
+            id
+            name
+        }
+        pageInfo {
+            hasNextPage
+            endCursor
+        }
+    }
+}
+"""
+
+
+def build_query_create_labels(count: int) -> str:
+    """Mutation creating the given number of labels at once, from variables $input0, $input1, ...
+
+    The result of each is returned under the alias label0, label1, ...
+    """
+    variables = ", ".join(f"$input{i}: IssueLabelCreateInput!" for i in range(count))
+    mutations = "\n".join(
+        f"""    label{i}: issueLabelCreate(input: $input{i}) {{
+        success
+        issueLabel {{
+            id
+            name
+        }}
+    }}"""
+        for i in range(count)
+    )
+    return f"mutation CreateLabels({variables}) {{\n{mutations}\n}}\n"
@@ -7,14 +7,17 @@ import sema4ai_http
 from dotenv import load_dotenv
 from models import FilterOptions, Issue, Project, ProjectList, Team, TeamList
 from queries import (
-    query_create_label,
+    build_query_create_labels,
+    query_create_issue,
     query_get_labels,
     query_get_projects,
     query_get_states,
     query_get_teams,
     query_get_users,
+    query_get_workspace,
 )
 from sema4ai.actions import Secret
+from workspace_cache import WorkspaceSnapshot, get_cache_scope, workspace_cache
 
 GRAPHQL_API_URL = "https://api.linear.app/graphql"
 
@@ -63,97 +66,192 @@ def _get_api_key(api_key: Secret) -> str:
         return os.getenv("LINEAR_API_KEY")
 
 
-def _get_team_id(issue_details: Issue, teams_data: TeamList) -> str:
-    team = next(
-        (
-            team
-            for team in teams_data
-            if issue_details.team.name.lower() in team.name.lower()
-        ),
-        None,
+def _get_workspace(api_key: Secret, refresh: bool = False) -> tuple[WorkspaceSnapshot, bool]:
+    """Get the workspace entities, from the cache when available
+
+    Args:
+        api_key: The API key to use to authenticate with the Linear API
+        refresh: Whether to fetch the workspace even if it is cached
+    Returns:
+        The workspace snapshot and whether it came from the cache
+    """
+    scope = get_cache_scope(_get_api_key(api_key))
+    if not refresh:
+        workspace = workspace_cache.get(scope)
+        if workspace is not None:
+            return workspace, True
+
+    response_data = _make_graphql_request(query_get_workspace, {}, api_key)
+
+    users = response_data["users"]["nodes"]
+    if response_data["users"]["pageInfo"]["hasNextPage"]:
+        users = _make_graphql_request(query_get_users, {}, api_key, paginated=True)[
+            "users"
+        ]["nodes"]
+
+    labels = response_data["issueLabels"]["nodes"]
+    if response_data["issueLabels"]["pageInfo"]["hasNextPage"]:
+        labels = _make_graphql_request(
+            query_get_labels, {}, api_key, paginated=True
+        )["issueLabels"]["nodes"]
+
+    workspace = WorkspaceSnapshot(
+        teams=[Team.model_validate(team) for team in response_data["teams"]["nodes"]],
+        projects=[
+            Project.model_validate(project)
+            for project in response_data["projects"]["nodes"]
+        ],
+        users=users,
+        labels=labels,
     )
-    return team.id if team else None
-
-
-def _get_state_id(issue_details: Issue, team_id: str, teams_data: TeamList) -> str:
-    state_id = issue_details.state.id
-    if not state_id:
-        # Find the team first
-        team = next((team for team in teams_data if team.id == team_id), None)
-        if team:
-            # Find the state in that team
-            state = next(
-                (
-                    state
-                    for state in team.states.nodes
-                    if state.name.lower() == issue_details.state.name.lower()
-                ),
-                None,
-            )
-            return state.id if state else None
-    return state_id
-
-
-def _get_project_id(issue_details: Issue, projects_data: ProjectList) -> str:
-    project_id = issue_details.project.id
-    if not project_id:
-        project = next(
-            (
-                project
-                for project in projects_data
-                if project.name == issue_details.project.name
-            ),
-            None,
+    workspace_cache.put(scope, workspace)
+    return workspace, False
+
+
+def _build_issue_input(
+    issue_details: Issue, workspace: WorkspaceSnapshot
+) -> tuple[dict, bool]:
+    """Resolve the names in the issue details to ids
+
+    Args:
+        issue_details: The details of the issue to create
+        workspace: The workspace to look the names up in
+    Returns:
+        The input of the issue, without labels, and whether all names were found
+    """
+    team_id = workspace.get_team_id(issue_details.team.name or "")
+    input_vars = {
+        "teamId": team_id,
+        "title": issue_details.title,
+    }
+    resolved = team_id is not None
+
+    # Add optional fields if provided
+    if issue_details.description:
+        input_vars["description"] = issue_details.description
+    if issue_details.assignee:
+        input_vars["assigneeId"] = workspace.get_user_id(
+            issue_details.assignee.name or ""
         )
-        return project.id if project else None
-    return project_id
+        resolved = resolved and input_vars["assigneeId"] is not None
+    if issue_details.project:
+        input_vars["projectId"] = issue_details.project.id or workspace.get_project_id(
+            issue_details.project.name
+        )
+        resolved = resolved and input_vars["projectId"] is not None
+    if issue_details.state:
+        input_vars["stateId"] = issue_details.state.id or workspace.get_state_id(
+            team_id, issue_details.state.name or ""
+        )
+        resolved = resolved and input_vars["stateId"] is not None
+    if issue_details.labels:
+        resolved = resolved and all(
+            workspace.get_label_id(label.name) is not None
+            for label in issue_details.labels
+        )
+
+    return input_vars, resolved
+
+
+def _get_issue_input(issue_details: Issue, api_key: Secret) -> dict:
+    """Get the input for creating the issue, creating labels which don't exist yet
+
+    Args:
+        issue_details: The details of the issue to create
+        api_key: The API key to use to authenticate with the Linear API
+    Returns:
+        The input of the issue create mutation
+    """
+    workspace, cached = _get_workspace(api_key)
+    input_vars, resolved = _build_issue_input(issue_details, workspace)
+    if not resolved and cached:
+        # The names may belong to entities added after the workspace was cached
+        workspace, _ = _get_workspace(api_key, refresh=True)
+        input_vars, _ = _build_issue_input(issue_details, workspace)
+
+    if issue_details.labels:
+        label_ids = _get_label_ids(issue_details, workspace, api_key)
+        if label_ids:
+            input_vars["labelIds"] = label_ids
+
+    return input_vars
 
 
-def _get_label_ids(issue_details: Issue, api_key: Secret) -> List[str]:
+def _get_label_ids(
+    issue_details: Issue, workspace: WorkspaceSnapshot, api_key: Secret
+) -> List[str]:
     """Get label IDs from label names, creating new labels if they don't exist
 
+    Labels to create are all created in one request.
+
     Args:
         issue_details: Issue details containing labels
+        workspace: The workspace to look the labels up in
         api_key: The API key to use to authenticate with the Linear API
     Returns:
         List of label IDs
     """
-    # First get existing labels
-    response_data = _make_graphql_request(query_get_labels, {}, api_key, paginated=True)
-    existing_labels = response_data["issueLabels"]["nodes"]
-    label_ids = []
+    missing_labels = {}
     for issue_label in issue_details.labels:
-        # Try to find existing label
-        label = next(
-            (
-                label
-                for label in existing_labels
-                if label["name"].lower() == issue_label.name.lower()
-            ),
-            None,
-        )
-
-        if label:
-            label_ids.append(label["id"])
-        else:
-            # Create new label if it doesn't exist
-            variables = {
-                "input": {
-                    "name": issue_label.name,
-                    "color": "#000000",  # Default color, you might want to make this configurable
-                }
+        if workspace.get_label_id(issue_label.name) is None:
+            missing_labels.setdefault(issue_label.name.lower(), issue_label.name)
+
+    if missing_labels:
+        variables = {
+            f"input{i}": {
+                "name": name,
+                "color": "#000000",  # Default color, you might want to make this configurable
             }
+            for i, name in enumerate(missing_labels.values())
+        }
+        try:
             create_response = _make_graphql_request(
-                query_create_label,
-                variables,
-                api_key,
+                build_query_create_labels(len(missing_labels)), variables, api_key
             )
-            new_label_id = create_response["issueLabelCreate"]["issueLabel"]["id"]
-            label_ids.append(new_label_id)
-            if "errors" in create_response:
-                raise Exception(f"Failed to create label: {create_response['errors']}")
+        except Exception:
+            # Some of the labels may have been created
+            workspace_cache.invalidate(get_cache_scope(_get_api_key(api_key)))
+            raise
+        workspace.add_labels(
+            [
+                create_response[f"label{i}"]["issueLabel"]
+                for i in range(len(missing_labels))
+            ]
+        )
+
+    # Labels given more than once, in any case, are only set once
+    return list(
+        dict.fromkeys(
+            workspace.get_label_id(label.name) for label in issue_details.labels
+        )
+    )
 
-    return label_ids
+
+def _create_issue(input_vars: dict, api_key: Secret) -> dict:
+    """Create the issue, dropping the cached workspace when the response shows it is outdated
+
+    Args:
+        input_vars: The input of the issue create mutation
+        api_key: The API key to use to authenticate with the Linear API
+    Returns:
+        The issue create response
+    """
+    scope = get_cache_scope(_get_api_key(api_key))
+    try:
+        issue_response = _make_graphql_request(
+            query_create_issue, {"input": input_vars}, api_key
+        )
+    except Exception:
+        # E.g. an id of an entity which has been deleted since it was cached
+        workspace_cache.invalidate(scope)
+        raise
+
+    workspace = workspace_cache.get(scope)
+    issue = (issue_response.get("issueCreate") or {}).get("issue") or {}
+    if workspace is not None and not workspace.knows_issue(issue):
+        workspace_cache.invalidate(scope)
+
+    return issue_response
 
 
 def _make_graphql_request(
@@ -200,35 +298,6 @@ def _make_graphql_request(
     return {next(iter(response_json["data"])): {"nodes": all_data}}
 
 
-def _get_assignee_id(issue_details: Issue, api_key: Secret) -> str:
-    """Get user ID from assignee name
-
-    Args:
-        issue_details: Issue details
-        api_key: The API key to use to authenticate with the Linear API
-    Returns:
-        User ID if found, None otherwise
-    """
-
-    user_response = _make_graphql_request(query_get_users, {}, api_key, paginated=True)
-    all_users = user_response["users"]["nodes"]
-
-    # Try to match by exact name first
-    user = next(
-        (
-            user
-            for user in all_users
-            if user["name"].lower() == issue_details.assignee.name.lower()
-            or user.get("displayName", "").lower()
-            == issue_details.assignee.name.lower()
-            or issue_details.assignee.name.lower() in user["name"].lower()
-        ),
-        None,
-    )
-
-    return user["id"] if user else None
-
-
 def _get_workflow_states(team_id: str, api_key: Secret) -> str:
     """Get all workflow states for a team
 
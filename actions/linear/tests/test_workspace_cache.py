@@ -0,0 +1,113 @@
+import pytest
+from models import Project, Team
+from workspace_cache import WorkspaceCache, WorkspaceSnapshot
+
+
+def _team(team_id: str, name: str, states: dict[str, str]) -> Team:
+    return Team.model_validate(
+        {
+            "id": team_id,
+            "name": name,
+            "key": name[:3].upper(),
+            "states": {
+                "nodes": [
+                    {"id": state_id, "name": state_name, "type": "unstarted", "color": "#000"}
+                    for state_name, state_id in states.items()
+                ]
+            },
+        }
+    )
+
+
+@pytest.fixture
+def snapshot() -> WorkspaceSnapshot:
+    return WorkspaceSnapshot(
+        teams=[
+            _team("team-eng", "Engineering", {"Todo": "state-eng-todo", "Done": "state-eng-done"}),
+            _team("team-ops", "Operations", {"Todo": "state-ops-todo"}),
+            _team("team-eng-2", "engineering", {}),
+        ],
+        projects=[
+            Project(id="project-1", name="Launch"),
+            Project(id="project-2", name="launch"),
+        ],
+        users=[
+            {"id": "user-1", "name": "Ada Lovelace", "displayName": "ada"},
+            {"id": "user-2", "name": "Alan Turing", "displayName": "alan"},
+        ],
+        labels=[{"id": "label-1", "name": "Bug"}],
+    )
+
+
+class TestWorkspaceSnapshot:
+    """Tests for name to id lookups of the cached workspace entities."""
+
+    def test_team_by_name(self, snapshot: WorkspaceSnapshot) -> None:
+        assert snapshot.get_team_id("ENGINEERING") == "team-eng"
+        assert snapshot.get_team_id("Operations") == "team-ops"
+
+    def test_team_by_partial_name(self, snapshot: WorkspaceSnapshot) -> None:
+        assert snapshot.get_team_id("oper") == "team-ops"
+        assert snapshot.get_team_id("Marketing") is None
+
+    def test_states_are_per_team(self, snapshot: WorkspaceSnapshot) -> None:
+        assert snapshot.get_state_id("team-eng", "todo") == "state-eng-todo"
+        assert snapshot.get_state_id("team-ops", "Todo") == "state-ops-todo"
+        assert snapshot.get_state_id("team-ops", "Done") is None
+
+    def test_projects_are_case_sensitive(self, snapshot: WorkspaceSnapshot) -> None:
+        assert snapshot.get_project_id("Launch") == "project-1"
+        assert snapshot.get_project_id("launch") == "project-2"
+        assert snapshot.get_project_id("LAUNCH") is None
+
+    def test_user_by_name_or_display_name(self, snapshot: WorkspaceSnapshot) -> None:
+        assert snapshot.get_user_id("ada lovelace") == "user-1"
+        assert snapshot.get_user_id("Alan") == "user-2"
+        assert snapshot.get_user_id("Turing") == "user-2"
+        assert snapshot.get_user_id("Grace") is None
+
+    def test_added_labels(self, snapshot: WorkspaceSnapshot) -> None:
+        assert snapshot.get_label_id("bug") == "label-1"
+        assert snapshot.get_label_id("Feature") is None
+
+        snapshot.add_labels([{"id": "label-2", "name": "Feature"}])
+
+        assert snapshot.get_label_id("feature") == "label-2"
+
+    def test_knows_issue(self, snapshot: WorkspaceSnapshot) -> None:
+        issue = {
+            "team": {"id": "team-eng"},
+            "project": {"id": "project-1"},
+            "state": {"id": "state-eng-todo"},
+            "labels": {"nodes": [{"id": "label-1"}]},
+        }
+        assert snapshot.knows_issue(issue)
+        assert snapshot.knows_issue({"team": {"id": "team-ops"}, "project": None})
+
+        issue["labels"]["nodes"].append({"id": "label-new"})
+        assert not snapshot.knows_issue(issue)
+
+
+class TestWorkspaceCache:
+    """Tests for keeping snapshots per scope for the TTL."""
+
+    def test_get_per_scope(self, snapshot: WorkspaceSnapshot) -> None:
+        cache = WorkspaceCache(ttl_seconds=60)
+        cache.put("scope-1", snapshot)
+
+        assert cache.get("scope-1") is snapshot
+        assert cache.get("scope-2") is None
+
+    def test_expired(self, snapshot: WorkspaceSnapshot) -> None:
+        cache = WorkspaceCache(ttl_seconds=60)
+        snapshot.fetched_at -= 61
+        cache.put("scope", snapshot)
+
+        assert cache.get("scope") is None
+
+    def test_invalidate(self, snapshot: WorkspaceSnapshot) -> None:
+        cache = WorkspaceCache(ttl_seconds=60)
+        cache.put("scope", snapshot)
+        cache.invalidate("scope")
+
+        assert cache.get("scope") is None
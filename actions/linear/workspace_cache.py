@@ -0,0 +1,122 @@
+"""Process-level cache of the Linear workspace entities needed to create issues.
+
+Teams (with their workflow states), projects, users and labels are fetched together in one
+GraphQL request and indexed by name. The snapshot is reused for WORKSPACE_CACHE_TTL_SECONDS,
+and dropped earlier when a create response refers to entities it doesn't know.
+"""
+
+import hashlib
+import threading
+import time
+from typing import Optional
+
+from models import Project, Team
+
+WORKSPACE_CACHE_TTL_SECONDS = 300
+
+
+class WorkspaceSnapshot:
+    """Workspace entities with name to id indexes. Names are matched case-insensitively,
+    except for projects, and the first entity with a given name wins."""
+
+    def __init__(self, teams: list[Team], projects: list[Project], users: list[dict], labels: list[dict]):
+        self.fetched_at = time.monotonic()
+        self.teams = teams
+        self.users = users
+
+        # Ids of all the entities, to check the responses of mutations against
+        self._known_ids = set()
+
+        self._team_ids = {}
+        self._state_ids = {}
+        for team in teams:
+            self._known_ids.add(team.id)
+            self._team_ids.setdefault(team.name.lower(), team.id)
+            for state in team.states.nodes:
+                self._known_ids.add(state.id)
+                self._state_ids.setdefault((team.id, state.name.lower()), state.id)
+
+        self._project_ids = {}
+        for project in projects:
+            self._known_ids.add(project.id)
+            self._project_ids.setdefault(project.name, project.id)
+
+        self._user_ids = {}
+        for user in users:
+            for name in (user.get("name"), user.get("displayName")):
+                if name:
+                    self._user_ids.setdefault(name.lower(), user["id"])
+
+        self._label_ids = {}
+        self.add_labels(labels)
+
+    def get_team_id(self, name: str) -> Optional[str]:
+        name = name.lower()
+        team_id = self._team_ids.get(name)
+        if team_id is None:
+            # Partial names match the first team containing them
+            team_id = next((team.id for team in self.teams if name in team.name.lower()), None)
+        return team_id
+
+    def get_state_id(self, team_id: str, name: str) -> Optional[str]:
+        return self._state_ids.get((team_id, name.lower()))
+
+    def get_project_id(self, name: str) -> Optional[str]:
+        return self._project_ids.get(name)
+
+    def get_user_id(self, name: str) -> Optional[str]:
+        name = name.lower()
+        user_id = self._user_ids.get(name)
+        if user_id is None:
+            # Partial names match the first user whose name contains them
+            user_id = next(
+                (user["id"] for user in self.users if name in (user.get("name") or "").lower()),
+                None,
+            )
+        return user_id
+
+    def get_label_id(self, name: str) -> Optional[str]:
+        return self._label_ids.get(name.lower())
+
+    def add_labels(self, labels: list[dict]) -> None:
+        for label in labels:
+            self._known_ids.add(label["id"])
+            self._label_ids.setdefault(label["name"].lower(), label["id"])
+
+    def knows_issue(self, issue: dict) -> bool:
+        """Whether all the entities the created issue refers to are in the snapshot."""
+        ids = [
+            (issue.get(key) or {}).get("id") for key in ("team", "project", "state")
+        ]
+        ids.extend(label["id"] for label in (issue.get("labels") or {}).get("nodes", []))
+        return all(entity_id in self._known_ids for entity_id in ids if entity_id)
+
+
+class WorkspaceCache:
+    def __init__(self, ttl_seconds: float = WORKSPACE_CACHE_TTL_SECONDS):
+        self._ttl_seconds = ttl_seconds
+        self._snapshots: dict[str, WorkspaceSnapshot] = {}
+        self._lock = threading.Lock()
+
+    def get(self, scope: str) -> Optional[WorkspaceSnapshot]:
+        with self._lock:
+            snapshot = self._snapshots.get(scope)
+            if snapshot is None or time.monotonic() - snapshot.fetched_at > self._ttl_seconds:
+                return None
+            return snapshot
+
+    def put(self, scope: str, snapshot: WorkspaceSnapshot) -> None:
+        with self._lock:
+            self._snapshots[scope] = snapshot
+
+    def invalidate(self, scope: str) -> None:
+        with self._lock:
+            self._snapshots.pop(scope, None)
+
+
+workspace_cache = WorkspaceCache()
+
+
+def get_cache_scope(api_key: str) -> str:
+    # The workspace is the one of the API key, which is not kept in memory as such
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
@@ -28,6 +28,7 @@ Currently supporting:
 from sema4ai.actions import action, OAuth2Secret, Response, ActionError
 from sema4ai.actions.chat import attach_file, attach_file_content
 from microsoft_mail.models import Email, EmailAttachment, Emails, MessageFlag, Category
+from microsoft_mail.mail_cache import can_answer_from_cache, list_cached_emails
 from microsoft_mail.support import (
     _find_folder,
     _get_inbox_folder_id,
@@ -53,6 +54,43 @@ import tempfile
 
 load_dotenv(Path(__file__).absolute().parent.parent / "devdata" / ".env")
 
+# Properties of Graph message resources which can be requested with $select
+MESSAGE_PROPERTIES = [
+    "bccRecipients",
+    "body",
+    "bodyPreview",
+    "categories",
+    "ccRecipients",
+    "changeKey",
+    "conversationId",
+    "conversationIndex",
+    "createdDateTime",
+    "flag",
+    "from",
+    "hasAttachments",
+    "id",
+    "importance",
+    "inferenceClassification",
+    "internetMessageHeaders",
+    "internetMessageId",
+    "isDeliveryReceiptRequested",
+    "isDraft",
+    "isRead",
+    "isReadReceiptRequested",
+    "lastModifiedDateTime",
+    "parentFolderId",
+    "receivedDateTime",
+    "replyTo",
+    "sender",
+    "sentDateTime",
+    "subject",
+    "toRecipients",
+    "uniqueBody",
+    "webLink",
+]
+
+_SELECTABLE_PROPERTIES = {p.lower(): p for p in MESSAGE_PROPERTIES}
+
 
 @action
 def list_emails(
@@ -66,6 +104,7 @@ def list_emails(
     max_emails_to_return: int = -1,
     return_only_count: bool = False,
     has_attachments: bool = False,
+    use_cache: bool = False,
 ) -> Response[Emails]:
     """
     List emails in the user's mailbox matching search query using Microsoft Graph API OData syntax.
@@ -129,6 +168,7 @@ def list_emails(
         max_emails_to_return: Maximum number of emails to return. Default is -1 (return all emails).
         return_only_count: Limit response size, but still return the count matching the query.
         has_attachments: Filter emails to only include those with attachments. Default is False.
+        use_cache: Answer from a local cache of message headers, synced incrementally with delta queries. Only used for '*' or '' queries on a named folder, when all requested properties are cached. Default is False.
 
     Returns:
         List of the emails matching the search query.
@@ -148,6 +188,33 @@ def list_emails(
     headers["ConsistencyLevel"] = "eventual"
     folders = []
 
+    if (
+        use_cache
+        and folder_to_search
+        and can_answer_from_cache(search_query, keys_to_return)
+    ):
+        if folder_to_search == "inbox":
+            cached_folder_id = _get_inbox_folder_id(token)
+        else:
+            folders = list_folders(token).result
+            folder_found = _find_folder(folders, folder_to_search)
+            if folder_found is None:
+                raise ActionError(f"Folder '{folder_to_search}' not found.")
+            cached_folder_id = folder_found["id"]
+
+        emails = list_cached_emails(
+            headers,
+            _get_me(token)["id"],
+            cached_folder_id,
+            keys_to_return,
+            keys_to_pop,
+            max_emails_to_return,
+            has_attachments,
+        )
+        if return_only_count:
+            emails.items = emails.items[:50]
+        return Response(result=emails)
+
     # Handle has_attachments parameter
     if has_attachments:
         if search_query == "*" or search_query == "":
@@ -222,6 +289,18 @@ def list_emails(
                 f"/me/messages?{items_per_query}{count_param}&$filter={search_query}"
             )
 
+    # Select only the requested properties server side, to keep the payloads small.
+    # Graph fails the whole request on unknown names in $select, so it's only used when
+    # all of them are known; otherwise they are picked from the full messages below.
+    requested_properties = [k.strip() for k in keys_to_return if k.strip()]
+    if requested_properties and all(
+        k in _SELECTABLE_PROPERTIES for k in requested_properties
+    ):
+        properties_to_select = [_SELECTABLE_PROPERTIES[k] for k in requested_properties]
+        if needs_client_side_filtering and "hasattachments" not in requested_properties:
+            properties_to_select.append("hasAttachments")
+        query = f"{query}&$select={','.join(properties_to_select)}"
+
     # If we're doing client-side filtering, remove hasAttachments from the query
     if needs_client_side_filtering:
         # Remove hasAttachments from the query since we'll filter client-side
@@ -286,6 +365,7 @@ def emails_as_csv(
     csv_filename: str,
     properties_to_return: str = "id,subject,from,bodyPreview,receivedDateTime,hasAttachments",
     folder_to_search: str = "inbox",
+    use_cache: bool = False,
 ) -> Response[str]:
     """List emails matching a search query and save them to a CSV file.
 
@@ -335,6 +415,7 @@ def emails_as_csv(
         csv_filename: The filename for the CSV output file (will be created in temp directory).
         properties_to_return: Comma separated list of properties to include as CSV columns. Default is 'id,subject,from,bodyPreview,receivedDateTime,hasAttachments'.
         folder_to_search: The folder to search for emails. Default is 'inbox'.
+        use_cache: Answer from the local cache of message headers, see 'list_emails'. Default is False.
 
     Returns:
         The path to the created CSV file.
@@ -345,6 +426,7 @@ def emails_as_csv(
         search_query=search_query,
         properties_to_return=properties_to_return,
         folder_to_search=folder_to_search,
+        use_cache=use_cache,
     ).result
 
     if not emails_result.items:
@@ -409,6 +491,7 @@ def filter_by_recipients(
     bcc_recipients: str = "",
     folder_to_search: str = "inbox",
     return_only_count: bool = False,
+    use_cache: bool = False,
 ) -> Response[Emails]:
     """Filter list of emails objects by recipients.
 
@@ -421,6 +504,7 @@ def filter_by_recipients(
         cc_recipients: Comma separated list of email addresses of the cc recipients to filter by.
         bcc_recipients: Comma separated list of email addresses of the bcc recipients to filter by.
         return_only_count: Limit response size, but still return the count matching the query.
+        use_cache: Answer from the local cache of message headers, see 'list_emails'. Default is False.
     Returns:
         The list of emails filtered by recipients.
     """
@@ -436,7 +520,10 @@ def filter_by_recipients(
     froms = from_ or None
 
     email_list = list_emails(
-        token=token, search_query=search_query, folder_to_search=folder_to_search
+        token=token,
+        search_query=search_query,
+        folder_to_search=folder_to_search,
+        use_cache=use_cache,
     ).result
     filtered_emails = []
     for email in email_list.items:
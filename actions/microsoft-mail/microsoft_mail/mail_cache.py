@@ -0,0 +1,272 @@
+"""Opt-in local cache of message headers, kept up to date with Microsoft Graph delta queries.
+
+Messages are stored per account and folder in a SQLite file. Each sync only fetches
+the changes since the previous one, using the stored `@odata.deltaLink`.
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+import sema4ai_http
+from microsoft_mail.models import Emails
+from microsoft_mail.support import BASE_GRAPH_URL
+from sema4ai.actions import ActionError
+
+# Message headers are private to the user, the cache is kept in a folder only they can read
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".sema4ai", "microsoft-mail", "mailbox_cache.sqlite"
+)
+
+# Header properties requested from the delta endpoint. Queries asking for other
+# properties (like 'body') are not answered from the cache.
+CACHED_PROPERTIES = [
+    "id",
+    "subject",
+    "from",
+    "sender",
+    "toRecipients",
+    "ccRecipients",
+    "bccRecipients",
+    "replyTo",
+    "receivedDateTime",
+    "sentDateTime",
+    "createdDateTime",
+    "lastModifiedDateTime",
+    "hasAttachments",
+    "importance",
+    "isRead",
+    "isDraft",
+    "flag",
+    "categories",
+    "bodyPreview",
+    "conversationId",
+    "parentFolderId",
+    "webLink",
+]
+
+_CACHED_PROPERTIES_LOWER = {p.lower() for p in CACHED_PROPERTIES}
+
+DELTA_PAGE_SIZE = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync_state (
+    account_id TEXT NOT NULL,
+    folder_id TEXT NOT NULL,
+    delta_link TEXT,
+    synced_at REAL,
+    PRIMARY KEY (account_id, folder_id)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    account_id TEXT NOT NULL,
+    folder_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    received_date_time TEXT,
+    has_attachments INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL,
+    PRIMARY KEY (account_id, folder_id, id)
+);
+CREATE INDEX IF NOT EXISTS messages_by_received
+    ON messages (account_id, folder_id, received_date_time DESC);
+"""
+
+
+def get_cache_path() -> str:
+    return os.environ.get("MICROSOFT_MAIL_CACHE_PATH") or DEFAULT_CACHE_PATH
+
+
+def can_answer_from_cache(search_query: str, keys_to_return: list[str]) -> bool:
+    """The cache holds whole folders of message headers, so it can only answer unfiltered queries."""
+    if search_query.strip() not in ("", "*"):
+        return False
+
+    return all(key in _CACHED_PROPERTIES_LOWER for key in keys_to_return)
+
+
+class DeltaLinkExpired(ActionError):
+    """Raised when Graph answers a delta request with 410 Gone, the sync state is no longer valid."""
+
+
+def _get_delta_page(url: str, headers: dict) -> dict:
+    query_url = url if url.startswith("http") else f"{BASE_GRAPH_URL}{url}"
+    try:
+        response = sema4ai_http.get(query_url, headers=headers)
+    except Exception as e:
+        raise ActionError(f"Error on 'sync messages': {str(e)}")
+    if response.status_code == 410:
+        raise DeltaLinkExpired(f"Error on 'sync messages': HTTP 410: {response.text}")
+    if response.status_code != 200:
+        raise ActionError(f"Error on 'sync messages': HTTP {response.status_code}: {response.text}")
+    return response.json()
+
+
+class MailboxCache:
+    def __init__(self, path: str | None = None):
+        self._path = path or get_cache_path()
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        if self._path == DEFAULT_CACHE_PATH:
+            os.chmod(directory, 0o700)
+        # SQLite creates its journal files with the permissions of the database file
+        os.close(os.open(self._path, os.O_RDWR | os.O_CREAT, 0o600))
+        os.chmod(self._path, 0o600)
+
+        self._connection = sqlite3.connect(self._path)
+        self._connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> "MailboxCache":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def _get_delta_link(self, account_id: str, folder_id: str) -> str | None:
+        row = self._connection.execute(
+            "SELECT delta_link FROM sync_state WHERE account_id = ? AND folder_id = ?",
+            (account_id, folder_id),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _reset_folder(self, account_id: str, folder_id: str) -> None:
+        with self._connection:
+            self._connection.execute(
+                "DELETE FROM messages WHERE account_id = ? AND folder_id = ?",
+                (account_id, folder_id),
+            )
+            self._connection.execute(
+                "DELETE FROM sync_state WHERE account_id = ? AND folder_id = ?",
+                (account_id, folder_id),
+            )
+
+    def sync_folder(self, headers: dict, account_id: str, folder_id: str) -> None:
+        """Fetch changes of the folder since the last sync, or the whole folder on the first sync."""
+        delta_link = self._get_delta_link(account_id, folder_id)
+        if delta_link is None:
+            # Drop leftovers of an interrupted first sync, the full sync fetches them again.
+            self._reset_folder(account_id, folder_id)
+
+        try:
+            self._apply_delta(headers, account_id, folder_id, delta_link)
+        except DeltaLinkExpired:
+            # The folder has to be synced from scratch
+            if delta_link is None:
+                raise
+            self._reset_folder(account_id, folder_id)
+            self._apply_delta(headers, account_id, folder_id, None)
+
+    def _apply_delta(
+        self, headers: dict, account_id: str, folder_id: str, delta_link: str | None
+    ) -> None:
+        delta_headers = {
+            **headers,
+            "Prefer": f"odata.maxpagesize={DELTA_PAGE_SIZE}",
+        }
+        url = delta_link or (
+            f"/me/mailFolders/{folder_id}/messages/delta"
+            f"?$select={','.join(CACHED_PROPERTIES)}"
+        )
+
+        while url:
+            response = _get_delta_page(url, delta_headers)
+
+            removed = []
+            upserted = []
+            for message in response.get("value", []):
+                if "@removed" in message:
+                    removed.append((account_id, folder_id, message["id"]))
+                else:
+                    upserted.append(
+                        (
+                            account_id,
+                            folder_id,
+                            message["id"],
+                            message.get("receivedDateTime"),
+                            1 if message.get("hasAttachments") else 0,
+                            json.dumps(message),
+                        )
+                    )
+
+            new_delta_link = response.get("@odata.deltaLink")
+
+            # Each page is committed on its own, together with the link to continue from.
+            with self._connection:
+                self._connection.executemany(
+                    "DELETE FROM messages WHERE account_id = ? AND folder_id = ? AND id = ?",
+                    removed,
+                )
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO messages "
+                    "(account_id, folder_id, id, received_date_time, has_attachments, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    upserted,
+                )
+                if new_delta_link:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO sync_state "
+                        "(account_id, folder_id, delta_link, synced_at) VALUES (?, ?, ?, ?)",
+                        (account_id, folder_id, new_delta_link, time.time()),
+                    )
+
+            url = response.get("@odata.nextLink")
+
+    def list_messages(
+        self,
+        account_id: str,
+        folder_id: str,
+        has_attachments: bool = False,
+        limit: int = -1,
+    ) -> tuple[list[dict], int]:
+        """Return cached messages of the folder, newest first, and the total count of matching messages."""
+        condition = "account_id = ? AND folder_id = ?"
+        params: list = [account_id, folder_id]
+        if has_attachments:
+            condition += " AND has_attachments = 1"
+
+        count = self._connection.execute(
+            f"SELECT COUNT(*) FROM messages WHERE {condition}", params
+        ).fetchone()[0]
+
+        query = f"SELECT data FROM messages WHERE {condition} ORDER BY received_date_time DESC"
+        if limit > 0:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        messages = [json.loads(row[0]) for row in self._connection.execute(query, params)]
+
+        return messages, count
+
+
+def list_cached_emails(
+    headers: dict,
+    account_id: str,
+    folder_id: str,
+    keys_to_return: list[str],
+    keys_to_pop: list[str],
+    max_emails_to_return: int = -1,
+    has_attachments: bool = False,
+) -> Emails:
+    """Sync the folder incrementally and answer the listing from the local cache."""
+    with MailboxCache() as cache:
+        cache.sync_folder(headers, account_id, folder_id)
+        messages, count = cache.list_messages(
+            account_id,
+            folder_id,
+            has_attachments=has_attachments,
+            limit=max_emails_to_return,
+        )
+
+    emails = Emails(items=[], count=count)
+    for message in messages:
+        if keys_to_return:
+            message = {k: v for k, v in message.items() if k.lower() in keys_to_return}
+        else:
+            for k in keys_to_pop:
+                message.pop(k, None)
+        emails.items.append(message)
+
+    return emails
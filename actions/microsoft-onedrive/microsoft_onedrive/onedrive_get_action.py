@@ -3,6 +3,7 @@ from pathlib import Path
 
 from sema4ai.actions import ActionError, OAuth2Secret, Response, action
 
+from microsoft_onedrive.downloads import DownloadItem, download_items
 from microsoft_onedrive.models import (
     GetOneDriveItemByIdParams,
     OneDriveListingParams,
@@ -10,8 +11,10 @@ from microsoft_onedrive.models import (
     DownloadRequest,
 )
 from microsoft_onedrive.support import (
+    BASE_GRAPH_URL,
     build_headers,
     get_folders_recursively,
+    get_folders_with_delta,
     parse_onedrive_items,
     send_request,
 )
@@ -71,12 +74,19 @@ def list_all_onedrive_folders_recursively(
         List[Literal["Files.Read"]],
     ],
     root_folder: str = "/",
+    max_depth: int = -1,
+    max_items: int = -1,
+    use_delta: bool = False,
 ) -> Response[dict]:
     """Recursively list all folders in OneDrive starting from a specified root folder.
 
     Args:
         token: OAuth2 token.
         root_folder: The root folder to start listing folders from. Use "/" for the root of OneDrive.
+        max_depth: How many levels of subfolders to list, -1 for all. 1 lists only the folders directly under the root folder.
+        max_items: Maximum number of folders to return, -1 for all.
+        use_delta: Whether to get the folder hierarchy of the whole drive in a few paged calls.
+            Faster for drives with many folders.
 
     Returns:
         Dictionary with a 'folders' key mapping to a list of dictionaries,
@@ -84,13 +94,18 @@ def list_all_onedrive_folders_recursively(
     """
     headers = build_headers(token)
 
+    if use_delta:
+        start_folder = "/" if root_folder in ["/", "root", "home"] else root_folder
+        all_folders = get_folders_with_delta(start_folder, headers, max_depth, max_items)
+        return Response(result={"folders": all_folders})
+
     if root_folder in ["/", "root", "home"]:
         url = "/me/drive/root/children"
     else:
         folder_path = root_folder.strip("/")
         url = f"/me/drive/root:/{folder_path}:/children"
 
-    all_folders = get_folders_recursively(url, headers)
+    all_folders = get_folders_recursively(url, headers, max_depth, max_items)
     return Response(result={"folders": all_folders})
 
 
@@ -243,22 +258,30 @@ def download_onedrive_file(
             )
     else:
         raise ActionError("Either query or download_url, name must be provided.")
-    download_count = 0
+    items = []
     for file in matching_files:
         download_url = file.get("download_url")
-        if download_url:
-            file_name = file.get("name")
-            download_content = send_request(
-                "get", download_url, "download file", headers=headers
-            )
-            if download_content:
-                with open(f"{download_location}/{file_name}", "wb") as f:
-                    f.write(download_content)
-                download_count += 1
-            else:
-                raise ActionError("Failed to download file")
-        else:
+        if not download_url:
             raise ActionError(f"No download URL available for file: {file.get('name')}")
+        if not download_url.startswith("http"):
+            download_url = f"{BASE_GRAPH_URL}{download_url}"
+        items.append(
+            DownloadItem(
+                name=file.get("name"),
+                url=download_url,
+                path=str(download_location / file.get("name")),
+                size=file.get("size"),
+            )
+        )
+
+    download_items(items, headers=headers)
+
+    failed = [item for item in items if item.error is not None]
+    if failed:
+        raise ActionError(
+            "Failed to download file(s): " + "; ".join(item.error for item in failed)
+        )
+    download_count = len(items)
     return Response(
         result=f"{download_count} file(s) downloaded successfully to {download_location}."
     )
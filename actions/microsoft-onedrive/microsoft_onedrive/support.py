@@ -1,3 +1,4 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Dict, List
 
 import sema4ai_http
@@ -89,19 +90,158 @@ def parse_onedrive_items(response_data: dict, item_type: ItemType) -> List[dict]
     return parsed_items
 
 
-def get_folders_recursively(url: str, headers: dict) -> List[Dict[str, str]]:
+# Folder listings run this many at a time
+FOLDER_LISTING_WORKERS = 8
+
+# Only the properties needed to build the folder tree are requested
+FOLDER_TREE_SELECT = "id,name,folder,parentReference"
+
+
+def _list_child_folders(url: str, headers: dict) -> List[dict]:
     folders = []
+    url = f"{url}?$select={FOLDER_TREE_SELECT}"
     while url:
         data = send_request("get", url, "get folders", headers=headers)
-        for item in data.get("value", []):
-            if item.get("folder"):
-                folder_path = (
-                    item["parentReference"].get("path", "") + "/" + item["name"]
-                )
-                folder_info = {"path": folder_path, "id": item["id"]}
-                folders.append(folder_info)
-                child_url = f"/me/drive/items/{item['id']}/children"
-                folders.extend(get_folders_recursively(child_url, headers))
-
+        folders.extend(item for item in data.get("value", []) if item.get("folder"))
+        # Next links already carry the query parameters
         url = data.get("@odata.nextLink")
     return folders
+
+
+def _folders_in_tree_order(children: Dict, max_items: int) -> List[Dict[str, str]]:
+    """Flatten the folder tree depth-first, parents before their children, in listing order."""
+    folders = []
+    stack = list(reversed(children.get(None, [])))
+    while stack and (max_items < 0 or len(folders) < max_items):
+        folder = stack.pop()
+        folders.append(folder)
+        stack.extend(reversed(children.get(folder["id"], [])))
+    return folders
+
+
+def get_folders_recursively(
+    url: str,
+    headers: dict,
+    max_depth: int = -1,
+    max_items: int = -1,
+    max_workers: int = FOLDER_LISTING_WORKERS,
+) -> List[Dict[str, str]]:
+    """
+    List the folders under the folder whose children are listed by the given URL.
+
+    The tree is walked breadth-first, listing the children of up to max_workers
+    folders concurrently. A folder is listed as soon as its parent listing completes,
+    so wide trees are not enumerated one folder at a time.
+
+    :param url: URL listing the children of the folder to start from.
+    :param headers: Headers for the requests.
+    :param max_depth: How many levels of folders to list, -1 for all. 1 lists only the direct children.
+    :param max_items: Maximum number of folders to return, -1 for all.
+    :param max_workers: Maximum number of concurrent folder listings.
+    :return: Folders with their 'path' and 'id', each folder followed by its subfolders.
+    """
+    children: Dict = {}
+    found = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Listing futures, with the id of the listed folder (None for the start folder) and its depth
+        pending = {executor.submit(_list_child_folders, url, headers): (None, 0)}
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    parent_id, depth = pending.pop(future)
+                    items = future.result()
+
+                    children[parent_id] = [
+                        {
+                            "path": item["parentReference"].get("path", "")
+                            + "/"
+                            + item["name"],
+                            "id": item["id"],
+                        }
+                        for item in items
+                    ]
+                    found += len(items)
+
+                    if 0 < max_depth <= depth + 1:
+                        continue
+                    for item in items:
+                        if max_items >= 0 and found >= max_items:
+                            break
+                        child_url = f"/me/drive/items/{item['id']}/children"
+                        child_future = executor.submit(
+                            _list_child_folders, child_url, headers
+                        )
+                        pending[child_future] = (item["id"], depth + 1)
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+
+    return _folders_in_tree_order(children, max_items)
+
+
+def get_folders_with_delta(
+    root_folder: str,
+    headers: dict,
+    max_depth: int = -1,
+    max_items: int = -1,
+) -> List[Dict[str, str]]:
+    """
+    List the folders under the given folder from the delta of the whole drive.
+
+    The hierarchy of the drive comes in a few paged calls, whatever its shape, which is
+    faster than folder by folder listings for drives with many folders. Delta responses
+    don't include parent paths, so paths are built from the folder names.
+
+    :param root_folder: Path of the folder to start from, "/" for the root of the drive.
+    :param headers: Headers for the requests.
+    :param max_depth: How many levels of folders to list, -1 for all. 1 lists only the direct children.
+    :param max_items: Maximum number of folders to return, -1 for all.
+    :return: Folders with their 'path' and 'id', each folder followed by its subfolders.
+    """
+    folder_path = root_folder.strip("/")
+    if folder_path:
+        start = send_request(
+            "get",
+            f"/me/drive/root:/{folder_path}?$select=id,name,parentReference",
+            "get folder",
+            headers=headers,
+        )
+        start_path = start["parentReference"].get("path", "") + "/" + start["name"]
+    else:
+        start = None
+        start_path = "/drive/root:"
+
+    items_by_parent: Dict = {}
+    root_id = None
+    url = f"/me/drive/root/delta?$select={FOLDER_TREE_SELECT},root,deleted"
+    while url:
+        data = send_request("get", url, "get folder delta", headers=headers)
+        for item in data.get("value", []):
+            if "root" in item:
+                root_id = item["id"]
+            elif item.get("folder") and "deleted" not in item:
+                parent_id = item.get("parentReference", {}).get("id")
+                items_by_parent.setdefault(parent_id, []).append(item)
+        url = data.get("@odata.nextLink")
+
+    start_id = start["id"] if start else root_id
+
+    children: Dict = {}
+    level = [(start_id, None, start_path)]
+    depth = 0
+    while level and (max_depth <= 0 or depth < max_depth):
+        next_level = []
+        for folder_id, key, path in level:
+            subfolders = sorted(items_by_parent.get(folder_id, []), key=lambda item: item["name"].lower())
+            children[key] = []
+            for item in subfolders:
+                item_path = f"{path}/{item['name']}"
+                children[key].append({"path": item_path, "id": item["id"]})
+                next_level.append((item["id"], item["id"], item_path))
+        level = next_level
+        depth += 1
+
+    return _folders_in_tree_order(children, max_items)
@@ -0,0 +1,157 @@
+import os
+import threading
+from pathlib import Path
+
+import pytest
+from microsoft_onedrive import downloads
+from microsoft_onedrive.downloads import ByteBudget, DownloadItem, download_items
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, content: bytes = b""):
+        self.status_code = status_code
+        self._content = content
+
+    def stream(self, chunk_size: int):
+        for start in range(0, len(self._content), chunk_size):
+            yield self._content[start : start + chunk_size]
+
+    def release_conn(self) -> None:
+        pass
+
+
+class FakeServer:
+    """Serves the files by URL, honoring Range headers like Graph download URLs."""
+
+    def __init__(self, files: dict[str, bytes], failing: tuple[str, ...] = ()):
+        self.files = files
+        self.failing = failing
+        self.requests: list[tuple[str, str | None]] = []
+        self._lock = threading.Lock()
+
+    def get(self, url: str, headers: dict = None, preload_content: bool = True) -> FakeResponse:
+        range_header = (headers or {}).get("Range")
+        with self._lock:
+            self.requests.append((url, range_header))
+
+        if url in self.failing:
+            return FakeResponse(500)
+
+        content = self.files[url]
+        if range_header is None:
+            return FakeResponse(200, content)
+
+        start, end = range_header[len("bytes=") :].split("-")
+        return FakeResponse(206, content[int(start) : int(end) + 1])
+
+
+@pytest.fixture
+def server(monkeypatch: pytest.MonkeyPatch) -> FakeServer:
+    server = FakeServer(
+        {
+            "https://files/a": b"a" * 100,
+            "https://files/b": b"b" * 60,
+            "https://files/c": bytes(range(256)) * 4,
+        }
+    )
+    monkeypatch.setattr(downloads.sema4ai_http, "get", server.get)
+    monkeypatch.setattr(downloads, "STREAM_CHUNK_SIZE", 16)
+    return server
+
+
+def _item(tmp_path: Path, name: str, size: int | None = None) -> DownloadItem:
+    return DownloadItem(name, f"https://files/{name}", str(tmp_path / name), size)
+
+
+class TestByteBudget:
+    """Tests for the shared total budget of the downloads."""
+
+    def test_reserve_within_budget(self) -> None:
+        budget = ByteBudget(100)
+
+        assert budget.reserve(60)
+        assert budget.reserve(40)
+        assert not budget.reserve(1)
+
+    def test_release(self) -> None:
+        budget = ByteBudget(100)
+        budget.reserve(100)
+        budget.release(30)
+
+        assert not budget.reserve(31)
+        assert budget.reserve(30)
+
+
+class TestDownloadItems:
+    """Tests for downloading items within the per-file and total budgets."""
+
+    def test_downloads_items(self, server: FakeServer, tmp_path: Path) -> None:
+        items = download_items([_item(tmp_path, "a", 100), _item(tmp_path, "b")])
+
+        assert [item.error for item in items] == [None, None]
+        assert (tmp_path / "a").read_bytes() == server.files["https://files/a"]
+        assert (tmp_path / "b").read_bytes() == server.files["https://files/b"]
+        assert not list(tmp_path.glob("*.part"))
+
+    def test_large_items_in_ranges(
+        self, server: FakeServer, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(downloads, "RANGE_SIZE", 300)
+
+        [item] = download_items([_item(tmp_path, "c", 1024)])
+
+        assert item.error is None
+        assert (tmp_path / "c").read_bytes() == server.files["https://files/c"]
+        assert sorted(r for _, r in server.requests) == [
+            "bytes=0-299",
+            "bytes=300-599",
+            "bytes=600-899",
+            "bytes=900-1023",
+        ]
+
+    def test_file_over_limit_is_not_requested(self, server: FakeServer, tmp_path: Path) -> None:
+        [item] = download_items([_item(tmp_path, "a", 100)], max_file_bytes=99)
+
+        assert "larger than 99 bytes" in item.error
+        assert server.requests == []
+
+    def test_file_of_unknown_size_over_limit(self, server: FakeServer, tmp_path: Path) -> None:
+        [item] = download_items([_item(tmp_path, "a")], max_file_bytes=50)
+
+        assert "larger than 50 bytes" in item.error
+        assert not os.listdir(tmp_path)
+
+    def test_total_budget_of_known_sizes(self, server: FakeServer, tmp_path: Path) -> None:
+        items = download_items(
+            [_item(tmp_path, "a", 100), _item(tmp_path, "b", 60)], max_total_bytes=120
+        )
+
+        assert items[0].error is None
+        assert "total download budget" in items[1].error
+        assert server.requests == [("https://files/a", None)]
+
+    def test_total_budget_of_unknown_sizes(self, server: FakeServer, tmp_path: Path) -> None:
+        items = download_items(
+            [_item(tmp_path, "a", 100), _item(tmp_path, "b")], max_workers=1, max_total_bytes=120
+        )
+
+        assert items[0].error is None
+        assert "total download budget" in items[1].error
+        assert os.listdir(tmp_path) == ["a"]
+
+    def test_failed_item_releases_its_budget(self, server: FakeServer, tmp_path: Path) -> None:
+        server.failing = ("https://files/a",)
+
+        items = download_items(
+            [_item(tmp_path, "a", 100), _item(tmp_path, "b")], max_workers=1, max_total_bytes=120
+        )
+
+        assert "HTTP 500" in items[0].error
+        assert items[1].error is None
+        assert os.listdir(tmp_path) == ["b"]
+
+    def test_incomplete_item(self, server: FakeServer, tmp_path: Path) -> None:
+        [item] = download_items([_item(tmp_path, "b", 80)])
+
+        assert "got 60 of 80 bytes" in item.error
+        assert not os.listdir(tmp_path)
@@ -0,0 +1,200 @@
+"""Download engine for drive items: concurrent, streamed to disk and within byte budgets.
+
+Items are written to disk as they arrive, so memory use stays flat whatever the size of the
+files. Content goes to a '.part' file next to the target path, which replaces the target
+only once the item is complete.
+
+Items of known size larger than RANGE_SIZE are fetched as parallel ranged GETs. All requests,
+whole items and ranges, share one pool of MAX_CONCURRENT_REQUESTS workers.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import sema4ai_http
+
+MAX_CONCURRENT_REQUESTS = 4
+
+MAX_FILE_BYTES = 1024 * 1024 * 1024
+
+MAX_TOTAL_BYTES = 4 * 1024 * 1024 * 1024
+
+RANGE_SIZE = 16 * 1024 * 1024
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+class DownloadError(Exception):
+    pass
+
+
+class DownloadItem:
+    """A file to download from the URL to the path. The size is used to check the budgets upfront
+    and to split the download in ranges, when known."""
+
+    def __init__(self, name: str, url: str, path: str, size: Optional[int] = None):
+        self.name = name
+        self.url = url
+        self.path = path
+        self.size = size
+        self.error: Optional[str] = None
+
+        self._lock = threading.Lock()
+        self._written = 0
+        self._reserved = 0
+
+    @property
+    def part_path(self) -> str:
+        return f"{self.path}.part"
+
+
+class ByteBudget:
+    """Total number of bytes that the downloads may use together."""
+
+    def __init__(self, max_bytes: int):
+        self._remaining = max_bytes
+        self._lock = threading.Lock()
+
+    def reserve(self, num_bytes: int) -> bool:
+        with self._lock:
+            if num_bytes > self._remaining:
+                return False
+            self._remaining -= num_bytes
+            return True
+
+    def release(self, num_bytes: int) -> None:
+        with self._lock:
+            self._remaining += num_bytes
+
+
+def _account(item: DownloadItem, num_bytes: int, max_file_bytes: int, budget: ByteBudget) -> None:
+    """Count bytes received for the item against the budgets, reserving more of the total as needed."""
+    with item._lock:
+        if item.error is not None:
+            raise DownloadError(item.error)
+        item._written += num_bytes
+        if item._written > max_file_bytes:
+            raise DownloadError(f"'{item.name}' is larger than {max_file_bytes} bytes")
+        if item._written > item._reserved:
+            if not budget.reserve(item._written - item._reserved):
+                raise DownloadError(f"'{item.name}' doesn't fit in the total download budget")
+            item._reserved = item._written
+
+
+def _fetch(
+    item: DownloadItem,
+    headers: dict,
+    offset: int,
+    length: Optional[int],
+    max_file_bytes: int,
+    budget: ByteBudget,
+) -> None:
+    request_headers = dict(headers or {})
+    if length is not None:
+        request_headers["Range"] = f"bytes={offset}-{offset + length - 1}"
+
+    response = sema4ai_http.get(item.url, headers=request_headers, preload_content=False)
+    try:
+        if length is not None and response.status_code == 200:
+            raise DownloadError(f"Ranged download of '{item.name}' is not supported by the server")
+        expected_status = 200 if length is None else 206
+        if response.status_code != expected_status:
+            raise DownloadError(
+                f"Downloading '{item.name}' failed with HTTP {response.status_code}"
+            )
+
+        with open(item.part_path, "r+b") as fh:
+            fh.seek(offset)
+            received = 0
+            for chunk in response.stream(STREAM_CHUNK_SIZE):
+                received += len(chunk)
+                if length is not None and received > length:
+                    raise DownloadError(f"Range of '{item.name}' is longer than requested")
+                _account(item, len(chunk), max_file_bytes, budget)
+                fh.write(chunk)
+    finally:
+        response.release_conn()
+
+
+def download_items(
+    items: List[DownloadItem],
+    headers: Optional[dict] = None,
+    max_workers: int = MAX_CONCURRENT_REQUESTS,
+    max_file_bytes: int = MAX_FILE_BYTES,
+    max_total_bytes: int = MAX_TOTAL_BYTES,
+) -> List[DownloadItem]:
+    """
+    Download the items to their paths.
+
+    An item which fails, or doesn't fit the per-file or total budget, gets an error
+    and nothing is kept of it. The other items are downloaded regardless.
+    Items without an error are complete at their paths.
+
+    :param items: The items to download.
+    :param headers: Headers for the download requests.
+    :param max_workers: Maximum number of concurrent requests.
+    :param max_file_bytes: Maximum size of a single item.
+    :param max_total_bytes: Maximum size of all the items together.
+    :return: The items, in the given order.
+    """
+    budget = ByteBudget(max_total_bytes)
+
+    # Requests to make: the item, and the offset and length of the range (None for whole items)
+    tasks = []
+    for item in items:
+        if item.size is not None:
+            if item.size > max_file_bytes:
+                item.error = f"'{item.name}' is larger than {max_file_bytes} bytes"
+                continue
+            if not budget.reserve(item.size):
+                item.error = f"'{item.name}' doesn't fit in the total download budget"
+                continue
+            item._reserved = item.size
+
+        try:
+            with open(item.part_path, "wb") as fh:
+                if item.size is not None:
+                    fh.truncate(item.size)
+        except OSError as e:
+            item.error = f"'{item.name}' can't be written: {str(e)}"
+            budget.release(item._reserved)
+            item._reserved = 0
+            continue
+
+        if item.size is not None and item.size > RANGE_SIZE:
+            tasks.extend(
+                (item, offset, min(RANGE_SIZE, item.size - offset))
+                for offset in range(0, item.size, RANGE_SIZE)
+            )
+        else:
+            tasks.append((item, 0, None))
+
+    def run(task):
+        item, offset, length = task
+        try:
+            _fetch(item, headers, offset, length, max_file_bytes, budget)
+        except Exception as e:
+            # Nothing is kept of a failed item, its bytes are given back to the other items
+            with item._lock:
+                if item.error is None:
+                    item.error = str(e)
+                budget.release(item._reserved)
+                item._reserved = 0
+
+    if tasks:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+            list(executor.map(run, tasks))
+
+    for item in items:
+        if not os.path.exists(item.part_path):
+            continue
+        if item.error is None and item.size is not None and item._written != item.size:
+            item.error = f"'{item.name}' was incomplete, got {item._written} of {item.size} bytes"
+        if item.error is None:
+            os.replace(item.part_path, item.path)
+        else:
+            os.remove(item.part_path)
+
+    return items
@@ -5,22 +5,37 @@ Currently supporting:
 - Upload a file to the Sharepoint site
 - Searching files in the Sharepoint
 """
-from typing import Literal
+from pathlib import Path
+from typing import Literal, Optional
+import os
+import tempfile
 import time
 
 import sema4ai_http
+from microsoft_sharepoint.downloads import DownloadItem, download_items
 from microsoft_sharepoint.models import File, FileList, Location, SiteIdentifier
 from microsoft_sharepoint.sharepoint_site_action import (
     get_sharepoint_site,
     search_for_site,
 )
+from microsoft_sharepoint.site_cache import get_cache_scope, site_id_cache
 from microsoft_sharepoint.support import (
     BASE_GRAPH_URL,
     build_headers,
     send_request,
 )
+from microsoft_sharepoint.uploads import UploadError, get_journal_key, upload_in_session
 from sema4ai.actions import ActionError, OAuth2Secret, Response, action, chat
 
+# Results per search request, the maximum of the search API
+SEARCH_PAGE_SIZE = 500
+
+# Waiting for a chat file to be available: first and longest delay between the checks, and the total time
+CHAT_FILE_FIRST_DELAY = 0.1
+CHAT_FILE_MAX_DELAY = 2
+CHAT_FILE_TIMEOUT = 10
+
+
 @action(is_consequential=False)
 def download_sharepoint_file(
     filelist: FileList,
@@ -45,63 +60,92 @@ def download_sharepoint_file(
     """
     headers = build_headers(token)
     headers["Content-Type"] = "application/octet-stream"
-    downloaded_files = []
 
     files = filelist.files if isinstance(filelist, FileList) else [filelist]
+    entries = []
     for afile in files:
         # Use file_id if present
         file_id = getattr(afile, "file_id", None) or afile.file.get("id") or ""
         name = getattr(afile, "name", None) or afile.file.get("name") or ""
+        if not file_id and not name:
+            raise ActionError("Each file must have at least a file_id or name.")
         fileinfo_data = afile.file if hasattr(afile, "file") else afile
-        parent_ref = fileinfo_data.get("parentReference", {})
+        entries.append((file_id, name, fileinfo_data))
+
+    # Files given only by name are all looked up with a single search
+    names = [name for file_id, name, _ in entries if not file_id]
+    found_by_name = _search_files_by_name(names, token) if names else {}
+
+    # Files to download in order, as (name, download url, size)
+    downloads = []
+    for file_id, name, fileinfo_data in entries:
         # Use the value from SiteIdentifier
-        resolved_site_id = parent_ref.get("siteId", "") or site.site_id
-        drive_type = parent_ref.get("driveType", "")
+        resolved_site_id = fileinfo_data.get("parentReference", {}).get("siteId", "") or site.site_id
 
         if file_id:
-            # Robust endpoint selection
-            if drive_type == "personal":
-                download_file_url = f"{BASE_GRAPH_URL}/me/drive/items/{file_id}/content"
-            elif resolved_site_id:
-                download_file_url = f"{BASE_GRAPH_URL}/sites/{resolved_site_id}/drive/items/{file_id}/content"
-            else:
-                # If both site_id and drive_type are missing, assume OneDrive
-                download_file_url = f"{BASE_GRAPH_URL}/me/drive/items/{file_id}/content"
             item_file_name = name or fileinfo_data.get("name", file_id)
-            download_r = sema4ai_http.get(download_file_url, headers=headers)
-            if attach:
-                if not isinstance(download_r.data, bytes):
-                    raise ActionError(f"Downloaded content for '{item_file_name}' is not bytes. Response: {download_r.data}")
-                chat.attach_file_content(name=item_file_name, data=download_r.data)
-            downloaded_files.append(item_file_name)
-        elif name:
-            search_resp = search_sharepoint_files(search_text=name, token=token, site=resolved_site_id)
-            found_files = [f for f in search_resp.result.files if (getattr(f, "name", None) or f.file.get("name")) == name]
-            if not found_files:
-                raise ActionError(f"File with name '{name}' not found.")
-            for found in found_files:
-                found_fileinfo = found.file if hasattr(found, "file") else found
-                found_file_id = getattr(found, "file_id", None) or found_fileinfo.get("id")
-                found_parent_ref = found_fileinfo.get("parentReference", {})
-                found_site_id = found_parent_ref.get("siteId", "") or resolved_site_id
-                found_drive_type = found_parent_ref.get("driveType", "")
-                # Robust endpoint selection for found files
-                if found_drive_type == "personal":
-                    download_file_url = f"{BASE_GRAPH_URL}/me/drive/items/{found_file_id}/content"
-                elif found_site_id:
-                    download_file_url = f"{BASE_GRAPH_URL}/sites/{found_site_id}/drive/items/{found_file_id}/content"
-                else:
-                    download_file_url = f"{BASE_GRAPH_URL}/me/drive/items/{found_file_id}/content"
-                item_file_name = getattr(found, "name", None) or found_fileinfo.get("name", found_file_id)
-                download_r = sema4ai_http.get(download_file_url, headers=headers)
-                if attach:
-                    if not isinstance(download_r.data, bytes):
-                        raise ActionError(f"Downloaded content for '{item_file_name}' is not bytes. Response: {download_r.data}")
-                    chat.attach_file_content(name=item_file_name, data=download_r.data)
-                downloaded_files.append(item_file_name)
-        else:
-            raise ActionError("Each file must have at least a file_id or name.")
-    return Response(result=downloaded_files)
+            download_file_url = _get_download_url(file_id, fileinfo_data, resolved_site_id)
+            downloads.append((item_file_name, download_file_url, fileinfo_data.get("size")))
+            continue
+
+        found_files = found_by_name.get(name, [])
+        if not found_files:
+            raise ActionError(f"File with name '{name}' not found.")
+        for found in found_files:
+            found_fileinfo = found.file if hasattr(found, "file") else found
+            found_file_id = getattr(found, "file_id", None) or found_fileinfo.get("id")
+            item_file_name = getattr(found, "name", None) or found_fileinfo.get("name", found_file_id)
+            download_file_url = _get_download_url(found_file_id, found_fileinfo, resolved_site_id)
+            downloads.append((item_file_name, download_file_url, found_fileinfo.get("size")))
+
+    if attach:
+        _attach_files(downloads, headers)
+    return Response(result=[item_file_name for item_file_name, _, _ in downloads])
+
+
+def _get_download_url(file_id: str, fileinfo: dict, default_site_id: str) -> str:
+    parent_ref = fileinfo.get("parentReference", {})
+    site_id = parent_ref.get("siteId", "") or default_site_id
+    # Robust endpoint selection
+    if parent_ref.get("driveType", "") == "personal":
+        return f"{BASE_GRAPH_URL}/me/drive/items/{file_id}/content"
+    elif site_id:
+        return f"{BASE_GRAPH_URL}/sites/{site_id}/drive/items/{file_id}/content"
+    # If both site_id and drive_type are missing, assume OneDrive
+    return f"{BASE_GRAPH_URL}/me/drive/items/{file_id}/content"
+
+
+def _search_files_by_name(names: list[str], token: OAuth2Secret) -> dict[str, list[File]]:
+    """Search for all the names at once, returning the files with exactly each name."""
+    wanted = set(names)
+    # Quoted phrases, quotes within the names can't be escaped in the query
+    query = " OR ".join('"' + name.replace('"', "") + '"' for name in dict.fromkeys(names))
+    found = _search_files(query, token, page_size=SEARCH_PAGE_SIZE, with_site_names=False)
+
+    found_by_name: dict[str, list[File]] = {}
+    for f in found.files:
+        name = getattr(f, "name", None) or f.file.get("name")
+        if name in wanted:
+            found_by_name.setdefault(name, []).append(f)
+    return found_by_name
+
+
+def _attach_files(downloads: list[tuple], headers: dict) -> None:
+    """Download the files concurrently and attach them to the chat, in the order of the list."""
+    with tempfile.TemporaryDirectory() as directory:
+        items = [
+            DownloadItem(name, url, os.path.join(directory, f"{index}.download"), size)
+            for index, (name, url, size) in enumerate(downloads)
+        ]
+        download_items(items, headers=headers)
+
+        failed = [item for item in items if item.error is not None]
+        if failed:
+            raise ActionError(
+                "Failed to download file(s): " + "; ".join(item.error for item in failed)
+            )
+        for item in items:
+            chat.attach_file(item.path, name=item.name)
 
 
 @action
@@ -124,6 +168,17 @@ def search_sharepoint_files(
     Returns:
         List of files matching the search criteria
     """
+    return Response(result=_search_files(search_text, token, site))
+
+
+def _search_files(
+    search_text: str,
+    token: OAuth2Secret,
+    site: SiteIdentifier = SiteIdentifier(site_id="", site_name=""),
+    page_size: Optional[int] = None,
+    with_site_names: bool = True,
+) -> FileList:
+    """Search files, optionally with a larger page of results and without looking up the site names."""
     headers = build_headers(token)
     if len(search_text) == 0:
         raise ActionError("Search text cannot be empty")
@@ -147,6 +202,8 @@ def search_sharepoint_files(
         site_resp = get_sharepoint_site(token=token, site=SiteIdentifier(site_name=site_name_value))
         resolved_site_id = site_resp.result["id"]
         search_payload["requests"][0]["scopes"] = [f"/sites/{resolved_site_id}/drive"]
+    if page_size is not None:
+        search_payload["requests"][0]["size"] = page_size
     search_results = send_request(
         "post", "/search/query", "Search files", headers=headers, data=search_payload
     )
@@ -157,7 +214,7 @@ def search_sharepoint_files(
             parent = result["resource"]["parentReference"]
             site_id_for_result = parent.get("siteId")
             site_name = ""
-            if site_id_for_result:
+            if site_id_for_result and with_site_names:
                 if site_id_for_result in site_name_cache:
                     site_name = site_name_cache[site_id_for_result]
                 else:
@@ -179,7 +236,7 @@ def search_sharepoint_files(
                     location=Location(name=site_name, url=result["resource"]["webUrl"]),
                 )
             )
-    return Response(result=FileList(files=files))
+    return FileList(files=files)
 
 
 @action
@@ -190,98 +247,100 @@ def upload_file_to_sharepoint(
         list[Literal["Files.ReadWrite"]],
     ],
     site: SiteIdentifier = SiteIdentifier(site_id="me", site_name=""),
+    chunk_size_mb: int = 10,
 ) -> Response[str]:
     """
     Upload a file to the Sharepoint site.
 
+    Files larger than 4MB are uploaded in chunks. An interrupted upload of the same file
+    to the same location continues where it stopped when the action is run again.
+
     Args:
         site: SiteIdentifier for the SharePoint site (can be a plain name like 'me', 'my files', a site name, or a full site ID).
         filename: name of the file.
         token: OAuth2 token to use for the operation.
+        chunk_size_mb: size of the chunks in megabytes, for the files uploaded in chunks.
 
     Returns:
         Result of the operation
     """
     headers = build_headers(token)
-    max_attempts = 10
-    for attempt in range(max_attempts):
-        try:
-            _ = chat.get_file(filename)
-            break
-        except Exception as e:
-            if attempt == max_attempts - 1:
-                raise ActionError(f"File {filename} not found in Files after {max_attempts} attempts: {e}")
-            time.sleep(1)
-    chat_file_content = chat.get_file_content(filename)
-    filesize = len(chat_file_content)
+    chat_file_path = _wait_for_chat_file(filename)
+    filesize = os.path.getsize(chat_file_path)
 
+    scope = get_cache_scope(token.access_token)
     site_id_value = site.site_id
     site_name_value = site.site_name
     if site_id_value.lower() in ["me", "my files", "myfiles"]:
-        upload_url = f"{BASE_GRAPH_URL}/me/drive/root:/{filename}:/content"
-        upload_session_url = (
-            f"{BASE_GRAPH_URL}/me/drive/root:/{filename}:/createUploadSession"
-        )
-    elif site_id_value:
-        response = search_for_site(site_id_value, token)
-        sites = response.result["value"]
-        if len(sites) == 0:
-            raise ActionError(f"Site {site_id_value} not found")
-        elif len(sites) > 1:
-            raise ActionError(f"Multiple sites with name {site_id_value} found")
-        id_field = sites[0]["id"]
-        resolved_site_id = id_field.split(",")[1]
-        upload_url = (
-            f"{BASE_GRAPH_URL}/sites/{resolved_site_id}/drive/root:/{filename}:/content"
-        )
-        upload_session_url = f"{BASE_GRAPH_URL}/sites/{resolved_site_id}/drive/root:/{filename}:/createUploadSession"
-    elif site_name_value:
-        response = search_for_site(site_name_value, token)
-        sites = response.result["value"]
-        if len(sites) == 0:
-            raise ActionError(f"Site {site_name_value} not found")
-        elif len(sites) > 1:
-            raise ActionError(f"Multiple sites with name {site_name_value} found")
-        id_field = sites[0]["id"]
-        resolved_site_id = id_field.split(",")[1]
-        upload_url = (
-            f"{BASE_GRAPH_URL}/sites/{resolved_site_id}/drive/root:/{filename}:/content"
-        )
-        upload_session_url = f"{BASE_GRAPH_URL}/sites/{resolved_site_id}/drive/root:/{filename}:/createUploadSession"
+        site_key = None
+        drive_url = f"{BASE_GRAPH_URL}/me/drive"
+    elif site_id_value or site_name_value:
+        site_key = site_id_value or site_name_value
+        resolved_site_id = _resolve_site_id(site_key, token, scope)
+        drive_url = f"{BASE_GRAPH_URL}/sites/{resolved_site_id}/drive"
     else:
         raise ActionError("Either site_id or site_name must be provided for upload.")
+    upload_url = f"{drive_url}/root:/{filename}:/content"
+    upload_session_url = f"{drive_url}/root:/{filename}:/createUploadSession"
+
     headers.update({"Content-Type": "application/octet-stream"})
     if filesize <= 4000000:  # 4MB
-        upload_response = sema4ai_http.put(
-            upload_url, headers=headers, body=chat_file_content
-        )
-        if upload_response.status_code in [200, 201]:
-            web_url_parts = upload_response.json()["webUrl"].split("/")[:-1]
-            web_url = "/".join(web_url_parts)
-            return Response(
-                result=f"File uploaded successfully and can be found at {web_url}"
-            )
-        else:
+        with open(chat_file_path, "rb") as fh:
+            upload_response = sema4ai_http.put(upload_url, headers=headers, body=fh.read())
+        if upload_response.status_code not in [200, 201]:
+            if site_key is not None:
+                site_id_cache.invalidate(scope, site_key)
             raise ActionError(f"Failed to upload file: {upload_response.text}")
+        uploaded_item = upload_response.json()
     else:
-        # upload bigger file in session
-        upload_session_response = sema4ai_http.post(upload_session_url, headers=headers)
-        upload_url = upload_session_response.json()["uploadUrl"]
-        chunk_size = 327680  # 320KB
-        i = 0
-        while True:
-            start = i * chunk_size
-            end = start + chunk_size
-            chunk_data = chat_file_content[start:end]
-            if not chunk_data:
-                break
-            chunk_start = start
-            chunk_end = start + len(chunk_data) - 1
-            headers.update({"Content-Range": f"bytes {chunk_start}-{chunk_end}/{filesize}"})
-            chunk_response = sema4ai_http.put(
-                upload_url, headers=headers, body=chunk_data
+        # upload bigger file in a resumable session
+        journal_key = get_journal_key(upload_session_url, str(chat_file_path))
+        try:
+            uploaded_item = upload_in_session(
+                upload_session_url,
+                str(chat_file_path),
+                headers,
+                journal_key,
+                chunk_size=chunk_size_mb * 1024 * 1024,
             )
-            if not chunk_response.ok():
-                raise ActionError(f"Failed to upload file: {chunk_response.text}")
-            i += 1
-        return Response(result="File uploaded successfully")
+        except UploadError as e:
+            if site_key is not None:
+                site_id_cache.invalidate(scope, site_key)
+            raise ActionError(str(e))
+
+    web_url_parts = uploaded_item["webUrl"].split("/")[:-1]
+    web_url = "/".join(web_url_parts)
+    return Response(
+        result=f"File uploaded successfully and can be found at {web_url}"
+    )
+
+
+def _wait_for_chat_file(filename: str) -> Path:
+    """Get the path of the chat file, waiting for it to be available with increasing delays."""
+    delay = CHAT_FILE_FIRST_DELAY
+    deadline = time.monotonic() + CHAT_FILE_TIMEOUT
+    while True:
+        try:
+            return chat.get_file(filename)
+        except Exception as e:
+            if time.monotonic() + delay > deadline:
+                raise ActionError(f"File {filename} not found in Files after {CHAT_FILE_TIMEOUT} seconds: {e}")
+            time.sleep(delay)
+            delay = min(delay * 2, CHAT_FILE_MAX_DELAY)
+
+
+def _resolve_site_id(site_key: str, token: OAuth2Secret, scope: str) -> str:
+    resolved_site_id = site_id_cache.get(scope, site_key)
+    if resolved_site_id is not None:
+        return resolved_site_id
+
+    response = search_for_site(site_key, token)
+    sites = response.result["value"]
+    if len(sites) == 0:
+        raise ActionError(f"Site {site_key} not found")
+    elif len(sites) > 1:
+        raise ActionError(f"Multiple sites with name {site_key} found")
+    id_field = sites[0]["id"]
+    resolved_site_id = id_field.split(",")[1]
+    site_id_cache.put(scope, site_key, resolved_site_id)
+    return resolved_site_id
@@ -0,0 +1,51 @@
+"""Process-level cache of resolved site ids, so repeated actions on a site don't search for it again."""
+
+import hashlib
+import threading
+import time
+from typing import Optional
+
+SITE_ID_TTL_SECONDS = 300
+
+
+class SiteIdCache:
+    """Site name or id as given by the caller to the resolved site id.
+
+    Ids are cached per scope, derived from the caller's token, so sites are
+    not resolved for accounts which may not be able to see them.
+    """
+
+    def __init__(self, ttl_seconds: float = SITE_ID_TTL_SECONDS):
+        self._ttl_seconds = ttl_seconds
+        self._site_ids: dict[tuple[str, str], tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, scope: str, site: str) -> Optional[str]:
+        with self._lock:
+            entry = self._site_ids.get((scope, site))
+            if entry is None:
+                return None
+            expires_at, site_id = entry
+            if expires_at < time.monotonic():
+                del self._site_ids[(scope, site)]
+                return None
+            return site_id
+
+    def put(self, scope: str, site: str, site_id: str) -> None:
+        with self._lock:
+            # Expired entries are dropped on writes, so the cache doesn't grow without bound
+            now = time.monotonic()
+            for key in [key for key, (expiry, _) in self._site_ids.items() if expiry < now]:
+                del self._site_ids[key]
+            self._site_ids[(scope, site)] = (now + self._ttl_seconds, site_id)
+
+    def invalidate(self, scope: str, site: str) -> None:
+        with self._lock:
+            self._site_ids.pop((scope, site), None)
+
+
+site_id_cache = SiteIdCache()
+
+
+def get_cache_scope(access_token: str) -> str:
+    return hashlib.sha256(access_token.encode("utf-8")).hexdigest()
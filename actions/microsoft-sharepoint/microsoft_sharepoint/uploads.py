@@ -0,0 +1,168 @@
+"""Resumable uploads of files to drives through Graph upload sessions.
+
+The content is streamed from disk one chunk at a time. The upload URL of each session is
+recorded in a local journal until the upload completes, so an upload which is interrupted
+continues from the last range the server received when the same file is uploaded again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Optional
+
+import sema4ai_http
+
+# Fragments of upload sessions must be multiples of 320 KiB, and at most 60 MiB
+CHUNK_SIZE_UNIT = 320 * 1024
+
+MAX_CHUNK_SIZE = 60 * 1024 * 1024
+
+DEFAULT_CHUNK_SIZE = 10 * 1024 * 1024
+
+# Upload URLs are credentials on their own, the journal is kept in a private folder of the user
+JOURNAL_DIRECTORY = os.path.join(
+    os.path.expanduser("~"), ".sema4ai", "microsoft-sharepoint", "upload-sessions"
+)
+
+# Read size when hashing the content of files
+HASH_READ_SIZE = 1024 * 1024
+
+
+class UploadError(Exception):
+    pass
+
+
+def normalize_chunk_size(chunk_size: int) -> int:
+    """Round the chunk size down to a size accepted by upload sessions."""
+    chunk_size = min(chunk_size, MAX_CHUNK_SIZE)
+    return max(CHUNK_SIZE_UNIT, chunk_size - chunk_size % CHUNK_SIZE_UNIT)
+
+
+class UploadJournal:
+    """Upload URLs of the unfinished sessions, one JSON file per upload in the directory."""
+
+    def __init__(self, directory: str = JOURNAL_DIRECTORY):
+        self._directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as fh:
+                    return json.load(fh).get("uploadUrl")
+            except (OSError, ValueError):
+                return None
+
+    def put(self, key: str, upload_url: str) -> None:
+        with self._lock:
+            try:
+                os.makedirs(self._directory, mode=0o700, exist_ok=True)
+                os.chmod(self._directory, 0o700)
+                fd = os.open(self._path(key), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                    json.dump({"uploadUrl": upload_url}, fh)
+            except OSError:
+                # Without the journal the upload can't be resumed, but it still works
+                pass
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+
+upload_journal = UploadJournal()
+
+
+def get_journal_key(session_url: str, path: str) -> str:
+    """Key of an upload: the target and the size and content of the file.
+
+    The key doesn't depend on the access token, so uploads also resume after the token was refreshed.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{session_url}\n{os.path.getsize(path)}\n".encode("utf-8"))
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(HASH_READ_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _next_offset(session: dict) -> Optional[int]:
+    """First byte the server expects next, None when it expects nothing more."""
+    ranges = session.get("nextExpectedRanges") or []
+    if not ranges:
+        return None
+    return int(ranges[0].split("-")[0])
+
+
+def _resume_session(upload_url: str) -> Optional[int]:
+    """Offset to continue the recorded session from, None if it can't be continued."""
+    try:
+        response = sema4ai_http.get(upload_url)
+    except Exception:
+        return None
+    if response.status_code != 200:
+        return None
+    return _next_offset(response.json())
+
+
+def upload_in_session(
+    session_url: str,
+    path: str,
+    headers: dict,
+    journal_key: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    journal: UploadJournal = upload_journal,
+) -> dict:
+    """
+    Upload the file at the path through an upload session, resuming the session
+    recorded in the journal for the key if there is one.
+
+    :param session_url: The createUploadSession URL of the target item.
+    :param path: The file to upload.
+    :param headers: Headers for creating the session.
+    :param journal_key: The key of the upload in the journal, see get_journal_key.
+    :param chunk_size: Size of the fragments, rounded down to a multiple of 320 KiB.
+    :param journal: The journal of the unfinished sessions.
+    :return: The uploaded drive item.
+    """
+    chunk_size = normalize_chunk_size(chunk_size)
+    filesize = os.path.getsize(path)
+
+    upload_url = journal.get(journal_key)
+    offset = _resume_session(upload_url) if upload_url else None
+    if offset is None:
+        response = sema4ai_http.post(session_url, headers=headers)
+        if response.status_code != 200:
+            raise UploadError(f"Failed to create upload session: {response.text}")
+        upload_url = response.json()["uploadUrl"]
+        journal.put(journal_key, upload_url)
+        offset = 0
+
+    # The upload URL is pre-authenticated, requests to it must not carry the Authorization header
+    with open(path, "rb") as fh:
+        while True:
+            fh.seek(offset)
+            chunk_data = fh.read(chunk_size)
+            chunk_end = offset + len(chunk_data) - 1
+            response = sema4ai_http.put(
+                upload_url,
+                headers={"Content-Range": f"bytes {offset}-{chunk_end}/{filesize}"},
+                body=chunk_data,
+            )
+            if response.status_code in [200, 201]:
+                journal.remove(journal_key)
+                return response.json()
+            if response.status_code != 202:
+                raise UploadError(f"Failed to upload file: {response.text}")
+
+            next_offset = _next_offset(response.json())
+            if next_offset is None or next_offset <= offset:
+                raise UploadError(f"Upload session did not accept the range starting at {offset}")
+            offset = next_offset
@@ -0,0 +1,136 @@
+from pathlib import Path
+
+import pytest
+from microsoft_sharepoint import uploads
+from microsoft_sharepoint.uploads import (
+    CHUNK_SIZE_UNIT,
+    MAX_CHUNK_SIZE,
+    UploadError,
+    UploadJournal,
+    _next_offset,
+    get_journal_key,
+    normalize_chunk_size,
+    upload_in_session,
+)
+
+
+class TestNormalizeChunkSize:
+    """Tests for rounding chunk sizes to sizes accepted by upload sessions."""
+
+    @pytest.mark.parametrize(
+        "chunk_size, expected",
+        [
+            (CHUNK_SIZE_UNIT, CHUNK_SIZE_UNIT),
+            (3 * CHUNK_SIZE_UNIT, 3 * CHUNK_SIZE_UNIT),
+            (3 * CHUNK_SIZE_UNIT + 1, 3 * CHUNK_SIZE_UNIT),
+            (4 * CHUNK_SIZE_UNIT - 1, 3 * CHUNK_SIZE_UNIT),
+            (10 * 1024 * 1024, 32 * CHUNK_SIZE_UNIT),
+        ],
+    )
+    def test_rounds_down_to_unit(self, chunk_size: int, expected: int) -> None:
+        assert normalize_chunk_size(chunk_size) == expected
+
+    @pytest.mark.parametrize("chunk_size", [0, 1, CHUNK_SIZE_UNIT - 1, -CHUNK_SIZE_UNIT])
+    def test_at_least_one_unit(self, chunk_size: int) -> None:
+        assert normalize_chunk_size(chunk_size) == CHUNK_SIZE_UNIT
+
+    def test_at_most_max_chunk_size(self) -> None:
+        assert normalize_chunk_size(10 * MAX_CHUNK_SIZE) == MAX_CHUNK_SIZE
+        assert MAX_CHUNK_SIZE % CHUNK_SIZE_UNIT == 0
+
+
+class TestNextOffset:
+    """Tests for reading the next expected byte of an upload session."""
+
+    def test_open_range(self) -> None:
+        assert _next_offset({"nextExpectedRanges": ["327680-"]}) == 327680
+
+    def test_first_of_several_ranges(self) -> None:
+        assert _next_offset({"nextExpectedRanges": ["12345-55232", "77829-99375"]}) == 12345
+
+    @pytest.mark.parametrize("session", [{}, {"nextExpectedRanges": []}, {"nextExpectedRanges": None}])
+    def test_nothing_expected(self, session: dict) -> None:
+        assert _next_offset(session) is None
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, body: dict):
+        self.status_code = status_code
+        self._body = body
+        self.text = str(body)
+
+    def json(self) -> dict:
+        return self._body
+
+
+class FakeUploadService:
+    """Upload sessions which accept ranges in order, and can fail once at a given offset."""
+
+    def __init__(self):
+        self.sessions: dict[str, bytearray] = {}
+        self.fail_at: int | None = None
+        self.created = 0
+
+    def post(self, url: str, headers: dict = None) -> FakeResponse:
+        self.created += 1
+        upload_url = f"https://upload/{self.created}"
+        self.sessions[upload_url] = bytearray()
+        return FakeResponse(200, {"uploadUrl": upload_url})
+
+    def get(self, url: str, headers: dict = None) -> FakeResponse:
+        if url not in self.sessions:
+            return FakeResponse(404, {})
+        return FakeResponse(200, {"nextExpectedRanges": [f"{len(self.sessions[url])}-"]})
+
+    def put(self, url: str, headers: dict = None, body: bytes = b"") -> FakeResponse:
+        assert "Authorization" not in headers
+        start, rest = headers["Content-Range"][len("bytes ") :].split("-")
+        end, total = (int(value) for value in rest.split("/"))
+        if self.fail_at is not None and int(start) >= self.fail_at:
+            self.fail_at = None
+            return FakeResponse(500, {"error": "failed"})
+
+        received = self.sessions[url]
+        assert int(start) == len(received)
+        received.extend(body)
+        if end + 1 == total:
+            return FakeResponse(201, {"content": bytes(received)})
+        return FakeResponse(202, {"nextExpectedRanges": [f"{end + 1}-"]})
+
+
+class TestUploadInSession:
+    """Tests for resuming interrupted uploads from the journal."""
+
+    @pytest.fixture
+    def service(self, monkeypatch: pytest.MonkeyPatch) -> FakeUploadService:
+        service = FakeUploadService()
+        monkeypatch.setattr(uploads.sema4ai_http, "post", service.post)
+        monkeypatch.setattr(uploads.sema4ai_http, "get", service.get)
+        monkeypatch.setattr(uploads.sema4ai_http, "put", service.put)
+        return service
+
+    def test_resumes_interrupted_upload(self, service: FakeUploadService, tmp_path: Path) -> None:
+        content = bytes(range(256)) * 5000
+        path = tmp_path / "file.bin"
+        path.write_bytes(content)
+        journal = UploadJournal(str(tmp_path / "journal"))
+        key = get_journal_key("https://graph/createUploadSession", str(path))
+
+        service.fail_at = 2 * CHUNK_SIZE_UNIT
+        with pytest.raises(UploadError):
+            upload_in_session("https://graph/createUploadSession", str(path), {}, key, CHUNK_SIZE_UNIT, journal)
+        assert journal.get(key) == "https://upload/1"
+
+        result = upload_in_session("https://graph/createUploadSession", str(path), {}, key, CHUNK_SIZE_UNIT, journal)
+
+        assert result == {"content": content}
+        assert service.created == 1
+        assert journal.get(key) is None
+
+    def test_journal_key_depends_on_content(self, tmp_path: Path) -> None:
+        path = tmp_path / "file.bin"
+        path.write_bytes(b"first")
+        first = get_journal_key("https://graph/createUploadSession", str(path))
+        path.write_bytes(b"other")
+
+        assert get_journal_key("https://graph/createUploadSession", str(path)) != first
@@ -12,7 +12,9 @@ from support import _get_pdf_content
 
 
 @action(is_consequential=False)
-def read_text_from_pdf(filename: str) -> Response[PDFContent]:
+def read_text_from_pdf(
+    filename: str, start_page: int = 1, end_page: int = -1, ocr_dpi: int = 300
+) -> Response[PDFContent]:
     """
     Returns text from a PDF file.
 
@@ -20,19 +22,28 @@ def read_text_from_pdf(filename: str) -> Response[PDFContent]:
     summarize the text, extract keywords, or perform any other
     NLP tasks.
 
+    Pages without a text layer are read with OCR.
+
     Args:
         filename: The name of the file to read.
+        start_page: The first page to read, starting from 1 (default 1).
+        end_page: The last page to read, -1 reads until the end of the file (default -1).
+        ocr_dpi: Resolution used when pages need OCR (default 300). Lower values are faster.
 
     Returns:
         Text content of the file per page.
     """
-    pdf = _get_pdf_content(filename)
+    pdf = _get_pdf_content(filename, start_page, end_page, ocr_dpi)
     return Response(result=pdf)
 
 
 @action(is_consequential=False)
 def find_text_in_pdf(
-    text_to_find: str, filename: str, case_sensitive: bool = False
+    text_to_find: str,
+    filename: str,
+    case_sensitive: bool = False,
+    start_page: int = 1,
+    end_page: int = -1,
 ) -> Response[Matches]:
     """
     Returns the pages where the text was found in the PDF.
@@ -43,11 +54,13 @@ def find_text_in_pdf(
         text_to_find: The text to find in the PDF.
         filename: The name of the file to read.
         case_sensitive: Whether the search should be case sensitive (default False)
+        start_page: The first page to search, starting from 1 (default 1).
+        end_page: The last page to search, -1 searches until the end of the file (default -1).
 
     Returns:
         Matches found in the PDF.
     """
-    pdf = _get_pdf_content(filename)
+    pdf = _get_pdf_content(filename, start_page, end_page)
     matches = Matches(items=[])
     text_find = text_to_find if case_sensitive else text_to_find.lower()
     for page, content in pdf.content.items():
@@ -1,18 +1,29 @@
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
 import pytesseract
 from pdf2image import convert_from_path
 from pypdf import PdfReader
 from models import PDFContent
 from sema4ai.actions import chat
-import os
 
+DEFAULT_OCR_DPI = 300
 
-def _read_text_from_pdf(filename: str, pdf: PDFContent) -> str:
-    pages = convert_from_path(filename, dpi=300)
+# Extracted text is cached by the content hash of the PDF, so the same document is never OCR'd twice.
+CACHE_DIR = os.environ.get(
+    "PDF_TEXT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "sema4ai-pdf-cache")
+)
 
-    for page_number, page in enumerate(pages, start=1):
-        text = _ocr_image(page)
-        pdf.length += len(text)
-        pdf.content[page_number + 1] = text
+
+def _ocr_page(filename: str, page_number: int, dpi: int) -> str:
+    # Only the requested page is rasterized, so memory use doesn't grow with the page count
+    images = convert_from_path(
+        filename, dpi=dpi, first_page=page_number, last_page=page_number
+    )
+    return "".join(_ocr_image(image) for image in images)
 
 
 def _ocr_image(image):
@@ -20,18 +31,109 @@ def _ocr_image(image):
     return text
 
 
-def _get_pdf_content(filename: str):
+def _ocr_pages(filename: str, page_numbers: list[int], dpi: int) -> dict[int, str]:
+    if not page_numbers:
+        return {}
+
+    if len(page_numbers) == 1:
+        return {page_numbers[0]: _ocr_page(filename, page_numbers[0], dpi)}
+
+    max_workers = min(len(page_numbers), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        texts = executor.map(
+            _ocr_page,
+            [filename] * len(page_numbers),
+            page_numbers,
+            [dpi] * len(page_numbers),
+        )
+        return dict(zip(page_numbers, texts))
+
+
+def _file_hash(filename: str) -> str:
+    hash_obj = hashlib.sha256()
+    with open(filename, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            hash_obj.update(chunk)
+    return hash_obj.hexdigest()
+
+
+def _load_cache(cache_path: str) -> dict:
+    try:
+        with open(cache_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache_path: str, cache: dict) -> None:
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(cache, file)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        # The cache is only an optimization, failing to write it is not an error
+        pass
+
+
+def _get_pdf_content(
+    filename: str,
+    start_page: int = 1,
+    end_page: int = -1,
+    dpi: int = DEFAULT_OCR_DPI,
+):
     filename = _access_file(filename)
-    reader = PdfReader(filename)
-    pdf = PDFContent(pages=len(reader.pages), content={}, length=0)
+    cache_path = os.path.join(CACHE_DIR, f"{_file_hash(filename)}.json")
+    cache = _load_cache(cache_path)
+    text_cache: dict = cache.setdefault("text", {})
+    ocr_cache: dict = cache.setdefault("ocr", {}).setdefault(str(dpi), {})
+
+    if "pages" in cache:
+        reader = None
+        page_count = cache["pages"]
+    else:
+        reader = PdfReader(filename)
+        page_count = len(reader.pages)
+        cache["pages"] = page_count
+
+    first = max(1, start_page)
+    last = page_count if end_page is None or end_page < 1 else min(end_page, page_count)
+
+    pdf = PDFContent(pages=page_count, content={}, length=0)
+    pages_to_ocr = []
+    cache_updated = False
+
+    for page_number in range(first, last + 1):
+        key = str(page_number)
+        if key not in text_cache:
+            reader = reader or PdfReader(filename)
+            text_cache[key] = reader.pages[page_number - 1].extract_text()
+            cache_updated = True
 
-    for page_number in range(pdf.pages):
-        page = reader.pages[page_number]
-        text = page.extract_text()
+        text = text_cache[key]
+        # Pages with a text layer don't need OCR
+        if not text.strip():
+            if key in ocr_cache:
+                text = ocr_cache[key]
+            else:
+                pages_to_ocr.append(page_number)
+                continue
+
+        pdf.length += len(text)
+        pdf.content[page_number] = text
+
+    for page_number, text in _ocr_pages(filename, pages_to_ocr, dpi).items():
+        ocr_cache[str(page_number)] = text
+        cache_updated = True
         pdf.length += len(text)
-        pdf.content[page_number + 1] = text
-    if pdf.length == 0:
-        _read_text_from_pdf(filename, pdf)
+        pdf.content[page_number] = text
+
+    pdf.content = dict(sorted(pdf.content.items()))
+
+    if cache_updated:
+        _save_cache(cache_path, cache)
+
     return pdf
 
 
@@ -1,36 +1,223 @@
 from sema4ai.actions import ActionError, Response, Table, action, Secret
 import concurrent.futures
-from typing import Dict, Any
-from contextlib import closing
-from sema4ai.data import get_snowflake_connection
+import hashlib
+import json
+import queue
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from contextlib import closing, contextmanager
+from sema4ai.data import get_snowflake_connection, get_snowflake_connection_details
 
-def process_single_table(table_name: str, warehouse: str, database: str, schema: str) -> Dict[str, Any]:
-    """Process a single table to get its columns, sample data, and row count."""
-    try:
-        with get_snowflake_connection() as connection, closing(connection.cursor()) as cursor:
-            # Use the provided warehouse, database, and schema
+# How long results of get_tables_info are reused for the same user, role, warehouse, database and schema.
+TABLE_METADATA_TTL_SECONDS = 300
+
+MAX_POOLED_CONNECTIONS = 5
+
+# Idle pooled connections are checked with a round trip before reuse, once idle for longer than this
+POOLED_CONNECTION_CHECK_AFTER_SECONDS = 30
+
+# Connection details which determine who a connection is authenticated as
+CREDENTIAL_FIELDS = ("account", "host", "authenticator", "user", "role", "token", "private_key")
+
+
+def _get_credentials_key() -> str:
+    """Fingerprint of the credentials get_snowflake_connection would connect with."""
+    details = get_snowflake_connection_details()
+    credentials = {field: str(details.get(field)) for field in CREDENTIAL_FIELDS}
+    return hashlib.sha256(json.dumps(credentials, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class _PooledConnection:
+    """A long-lived Snowflake connection, remembering the warehouse, database and schema last used on it."""
+
+    def __init__(self):
+        self._context_manager = get_snowflake_connection()
+        self.connection = self._context_manager.__enter__()
+        self.current_context: Optional[Tuple[str, str, str]] = None
+        try:
+            with closing(self.connection.cursor()) as cursor:
+                cursor.execute("SELECT CURRENT_USER(), CURRENT_ROLE()")
+                user, role = cursor.fetchone()
+        except Exception:
+            self.close()
+            raise
+        self.identity: Tuple[str, str] = (user, role)
+        self.last_used = time.monotonic()
+
+    def is_usable(self) -> bool:
+        """Whether the connection is still open, checked with a round trip when it was idle for a while."""
+        if self.connection.is_closed():
+            return False
+        if time.monotonic() - self.last_used < POOLED_CONNECTION_CHECK_AFTER_SECONDS:
+            return True
+        try:
+            with closing(self.connection.cursor()) as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            return True
+        except Exception:
+            return False
+
+    def use(self, cursor, warehouse: str, database: str, schema: str) -> None:
+        # USE statements are only sent when the connection was last used with a different context
+        if self.current_context != (warehouse, database, schema):
+            self.current_context = None
             cursor.execute(f"USE WAREHOUSE {warehouse}")
             cursor.execute(f"USE DATABASE {database}")
             cursor.execute(f"USE SCHEMA {schema}")
-            
-            # Get column information
-            columns_query = f"""
-            SELECT 
-                column_name,
-                data_type,
-                is_nullable
-            FROM information_schema.columns
-            WHERE table_name = '{table_name.upper()}'
-            ORDER BY column_name
-            """
-            
-            cursor.execute(columns_query)
-            columns_info = [[str(val) if val is not None else "NULL" for val in row] for row in cursor.fetchall()]
-            
-            # Get row count
-            count_query = f"SELECT COUNT(*) FROM {table_name}"
-            cursor.execute(count_query)
-            row_count = cursor.fetchone()[0]
+            self.current_context = (warehouse, database, schema)
+
+    def close(self) -> None:
+        try:
+            self._context_manager.__exit__(None, None, None)
+        except Exception:
+            pass
+
+
+class _ConnectionPool:
+    """Process-wide pool of Snowflake connections, shared by the worker threads of get_tables_info.
+
+    Idle connections are kept per set of credentials, so a connection is only reused by calls
+    which would connect as the same user and role.
+    """
+
+    def __init__(self, max_size: int):
+        self._idle: Dict[str, "queue.LifoQueue[_PooledConnection]"] = {}
+        self._idle_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _checkout(self, credentials_key: str) -> _PooledConnection:
+        with self._idle_lock:
+            idle = self._idle.setdefault(credentials_key, queue.LifoQueue())
+        while True:
+            try:
+                pooled = idle.get_nowait()
+            except queue.Empty:
+                return _PooledConnection()
+            if pooled.is_usable():
+                return pooled
+            pooled.close()
+
+    @contextmanager
+    def connection(self, warehouse: str, database: str, schema: str):
+        """Yield a pooled connection and a cursor on it, set to use the given warehouse, database and schema."""
+        credentials_key = _get_credentials_key()
+        self._slots.acquire()
+        try:
+            pooled = self._checkout(credentials_key)
+
+            try:
+                with closing(pooled.connection.cursor()) as cursor:
+                    pooled.use(cursor, warehouse, database, schema)
+                    yield pooled, cursor
+            except Exception:
+                # The connection may be in an unknown state, don't hand it out again
+                pooled.close()
+                raise
+
+            pooled.last_used = time.monotonic()
+            with self._idle_lock:
+                self._idle[credentials_key].put(pooled)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def cursor(self, warehouse: str, database: str, schema: str):
+        """Yield a cursor on a pooled connection, set to use the given warehouse, database and schema."""
+        with self.connection(warehouse, database, schema) as (_, cursor):
+            yield cursor
+
+
+_connection_pool = _ConnectionPool(MAX_POOLED_CONNECTIONS)
+
+_table_metadata_cache: Dict[Tuple[str, ...], Tuple[float, List[Dict[str, Any]]]] = {}
+_table_metadata_cache_lock = threading.Lock()
+
+
+def _get_cached_tables_info(key: Tuple[str, ...]) -> Optional[List[Dict[str, Any]]]:
+    with _table_metadata_cache_lock:
+        cached = _table_metadata_cache.get(key)
+        if cached is None:
+            return None
+        cached_at, results = cached
+        if time.monotonic() - cached_at > TABLE_METADATA_TTL_SECONDS:
+            del _table_metadata_cache[key]
+            return None
+        return results
+
+
+def _set_cached_tables_info(key: Tuple[str, ...], results: List[Dict[str, Any]]) -> None:
+    with _table_metadata_cache_lock:
+        _table_metadata_cache[key] = (time.monotonic(), results)
+
+
+def get_schema_metadata(cursor) -> Tuple[List[str], Dict[str, int], Dict[str, List[List[str]]]]:
+    """Get table names, row counts and columns of all base tables in the current schema with two queries."""
+    cursor.execute("""
+    SELECT table_name, row_count
+    FROM information_schema.tables
+    WHERE table_type = 'BASE TABLE'
+      AND table_schema = CURRENT_SCHEMA()
+    ORDER BY table_name
+    """)
+    table_rows = cursor.fetchall()
+    table_names = [str(row[0]) for row in table_rows]
+    row_counts = {str(row[0]): row[1] for row in table_rows}
+
+    cursor.execute("""
+    SELECT 
+        table_name,
+        column_name,
+        data_type,
+        is_nullable
+    FROM information_schema.columns
+    WHERE table_schema = CURRENT_SCHEMA()
+    ORDER BY table_name, column_name
+    """)
+    columns_by_table: Dict[str, List[List[str]]] = {}
+    for row in cursor.fetchall():
+        columns_by_table.setdefault(str(row[0]), []).append(
+            [str(val) if val is not None else "NULL" for val in row[1:]]
+        )
+
+    return table_names, row_counts, columns_by_table
+
+
+def process_single_table(
+    table_name: str,
+    warehouse: str,
+    database: str,
+    schema: str,
+    columns_info: Optional[List[List[str]]] = None,
+    row_count: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Process a single table to get its columns, sample data, and row count.
+
+    Columns and row count already read from information_schema can be passed in, then only the sample is queried.
+    """
+    try:
+        with _connection_pool.cursor(warehouse, database, schema) as cursor:
+            if columns_info is None:
+                # Get column information
+                columns_query = f"""
+                SELECT 
+                    column_name,
+                    data_type,
+                    is_nullable
+                FROM information_schema.columns
+                WHERE table_name = '{table_name.upper()}'
+                ORDER BY column_name
+                """
+
+                cursor.execute(columns_query)
+                columns_info = [[str(val) if val is not None else "NULL" for val in row] for row in cursor.fetchall()]
+
+            if row_count is None:
+                # Get row count
+                count_query = f"SELECT COUNT(*) FROM {table_name}"
+                cursor.execute(count_query)
+                row_count = cursor.fetchone()[0]
             
             # Get sample data (limit to 10 rows)
             sample_query = f"SELECT * FROM {table_name} LIMIT 10"
@@ -76,6 +263,62 @@ def process_single_table(table_name: str, warehouse: str, database: str, schema:
             'error': str(e)
         }
 
+def _collect_tables_info(warehouse: str, database: str, schema: str) -> List[Dict[str, Any]]:
+    """Collect columns, row counts and samples of all base tables in the schema.
+
+    Complete results are cached per user and role of the connection, as tables visible
+    to one role may not be visible to another.
+    """
+    with _connection_pool.connection(warehouse, database, schema) as (pooled, cursor):
+        cache_key = (*pooled.identity, warehouse, database, schema)
+        cached_results = _get_cached_tables_info(cache_key)
+        if cached_results is not None:
+            return cached_results
+
+        table_names, row_counts, columns_by_table = get_schema_metadata(cursor)
+
+    all_results = []
+
+    # Use ThreadPoolExecutor to process tables in parallel
+    # Note: We use threads instead of processes because database connections work better with threads.
+    # The workers share the pooled connections, so at most MAX_POOLED_CONNECTIONS connections are opened.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(len(table_names), MAX_POOLED_CONNECTIONS))) as executor:
+        # Submit all table processing tasks
+        future_to_table = {
+            executor.submit(
+                process_single_table,
+                table_name,
+                warehouse,
+                database,
+                schema,
+                columns_by_table.get(table_name, []),
+                row_counts.get(table_name),
+            ): table_name
+            for table_name in table_names
+        }
+
+        # Collect results as they complete
+        for future in concurrent.futures.as_completed(future_to_table):
+            table_name = future_to_table[future]
+            try:
+                result = future.result()
+                all_results.append(result)
+            except Exception as e:
+                all_results.append({
+                    'table_name': table_name,
+                    'error': f"Parallel processing error: {str(e)}"
+                })
+
+    # Sort results by table name to maintain consistent output
+    all_results.sort(key=lambda x: x['table_name'])
+
+    # Only complete results are cached, so that failing tables are retried on the next call
+    if not any('error' in table_info for table_info in all_results):
+        _set_cached_tables_info(cache_key, all_results)
+
+    return all_results
+
+
 @action
 def get_tables_info(warehouse: Secret, database: Secret, schema: Secret) -> Response[str]:
     """
@@ -90,51 +333,8 @@ def get_tables_info(warehouse: Secret, database: Secret, schema: Secret) -> Resp
         A markdown structure that includes all available database tables, along with details of each of their columns with datatypes, and a random sample of 10 rows to give a hint how the data looks in practise.
     """
     try:
-        with get_snowflake_connection() as connection, closing(connection.cursor()) as cursor:
-            # Use the provided warehouse, database, and schema
-            cursor.execute(f"USE WAREHOUSE {warehouse.value}")
-            cursor.execute(f"USE DATABASE {database.value}")
-            cursor.execute(f"USE SCHEMA {schema.value}")
-            
-            # Now get all tables
-            tables_query = """
-            SELECT table_name, table_type
-            FROM information_schema.tables
-            WHERE table_type = 'BASE TABLE'
-            ORDER BY table_name
-            """
-            
-            cursor.execute(tables_query)
-            tables_data = cursor.fetchall()
-            table_names = [str(row[0]) for row in tables_data]
-        
-        # Process tables in parallel for much better performance
-        all_results = []
-        
-        # Use ThreadPoolExecutor to process tables in parallel
-        # Note: We use threads instead of processes because database connections work better with threads
-        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(table_names), 5)) as executor:
-            # Submit all table processing tasks
-            future_to_table = {
-                executor.submit(process_single_table, table_name, warehouse.value, database.value, schema.value): table_name 
-                for table_name in table_names
-            }
-            
-            # Collect results as they complete
-            for future in concurrent.futures.as_completed(future_to_table):
-                table_name = future_to_table[future]
-                try:
-                    result = future.result()
-                    all_results.append(result)
-                except Exception as e:
-                    all_results.append({
-                        'table_name': table_name,
-                        'error': f"Parallel processing error: {str(e)}"
-                    })
-        
-        # Sort results by table name to maintain consistent output
-        all_results.sort(key=lambda x: x['table_name'])
-        
+        all_results = _collect_tables_info(warehouse.value, database.value, schema.value)
+
         # Format the comprehensive results as markdown
         markdown_output = "# Database Tables Information\n\n"
         
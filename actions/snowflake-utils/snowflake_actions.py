@@ -1,11 +1,16 @@
 import base64
 import datetime
+import itertools
 import os
 from decimal import Decimal
 from contextlib import closing
 
 from sema4ai.actions import ActionError, Response, Secret, action, Table, chat
-from sema4ai.data import get_snowflake_connection, execute_snowflake_query
+from sema4ai.data import get_snowflake_connection
+import snowflake.connector
+
+# Query arguments are bound server side, as :1, :2, ... placeholders
+snowflake.connector.paramstyle = "numeric"
 
 
 def serialize_value(value):
@@ -1140,6 +1145,42 @@ Resource Access Status:
             return Response(result=None, error=f"Failed to get user information: {original_error}\n\nPlease check your warehouse, database, and schema parameters. When ran in Work Room, ensure the Sema4.ai Native App is granted access to the necessary Snowflake resources.")
 
 
+# Results with at least this many columns are fetched as Arrow batches, when the connector supports it.
+ARROW_MIN_COLUMNS = 20
+
+
+def _fetch_rows_from_arrow(batches, row_limit: int) -> list[list]:
+    """Convert up to row_limit rows of the Arrow record batches, stopping as soon as the limit is reached."""
+    rows = []
+    for batch in batches:
+        remaining = row_limit - len(rows)
+        if remaining <= 0:
+            break
+        batch = batch.slice(0, remaining)
+        columns = [batch.column(i).to_pylist() for i in range(batch.num_columns)]
+        rows.extend([serialize_value(value) for value in row] for row in zip(*columns))
+    return rows
+
+
+def _fetch_limited_rows(cursor, row_limit: int) -> list[list]:
+    """Fetch at most row_limit rows from an executed cursor, without materializing the whole result set."""
+    if len(cursor.description) >= ARROW_MIN_COLUMNS:
+        try:
+            batches = cursor.fetch_arrow_batches()
+            first_batch = next(batches, None)
+        except Exception:
+            # Arrow is not available for this result (e.g. SHOW commands, or pyarrow is not installed),
+            # fall back to the regular row-based fetch. No rows were consumed from the cursor yet.
+            pass
+        else:
+            # Once batches were consumed, errors are raised: fetchmany would continue after the consumed rows
+            if first_batch is None:
+                return []
+            return _fetch_rows_from_arrow(itertools.chain([first_batch], batches), row_limit)
+
+    return [[serialize_value(value) for value in row] for row in cursor.fetchmany(row_limit)]
+
+
 @action
 def snowflake_execute_query(
     query: str,
@@ -1158,7 +1199,7 @@ def snowflake_execute_query(
         warehouse: Your Snowflake virtual warehouse to use for queries.
         numeric_args: A list of numeric arguments to pass to the query.
         row_limit: Maximum number of rows to return (default: 10000). 
-                   Set to prevent memory issues with large result sets.
+                   Only this many rows are fetched from Snowflake, the rest of the result set is never downloaded.
                    Consider adding LIMIT clause in your SQL for better performance.
 
     Returns:
@@ -1166,23 +1207,25 @@ def snowflake_execute_query(
     """
 
     try:
-        result = execute_snowflake_query(
-            query=query,
-            warehouse=warehouse.value,
-            numeric_args=numeric_args,
-        )
-        
-        # Apply row limit to prevent memory issues
-        limited_result = result[:row_limit] if result else []
-        
-        # Convert list of dicts to Table format (columns and rows)
-        if limited_result:
-            columns = list(limited_result[0].keys())
-            # Ensure consistent column order and serialize values for JSON compatibility
-            rows = [[serialize_value(row[col]) for col in columns] for row in limited_result]
-            return Response(result=Table(columns=columns, rows=rows))
-        else:
+        if row_limit <= 0:
             return Response(result=Table(columns=[], rows=[]))
+
+        with get_snowflake_connection() as connection, closing(connection.cursor()) as cursor:
+            cursor.execute(f"USE WAREHOUSE {warehouse.value}")
+            cursor.execute(query, numeric_args)
+
+            if not cursor.description:
+                return Response(result=Table(columns=[], rows=[]))
+
+            # Rows are fetched from the cursor up to row_limit, so memory is bounded by row_limit
+            # rather than by the size of the result set.
+            rows = _fetch_limited_rows(cursor, row_limit)
+
+            if rows:
+                columns = [desc[0] for desc in cursor.description]
+                return Response(result=Table(columns=columns, rows=rows))
+            else:
+                return Response(result=Table(columns=[], rows=[]))
     
     except ValueError as e:
         # Convert ValueError to ActionError for proper error reporting
@@ -9,82 +9,146 @@ from models import (
     ActionParameter,
     ActionsManifest,
     ActionVersionInfo,
+    GalleryPackageVersion,
     PackageInfo,
 )
 from utils import (
     get_version_strings_from_package_info,
     read_file_contents,
+    read_json_file,
     read_yaml_file,
 )
 
 
-def generate_actions_manifest(
-    gallery_actions_folder: str, base_url: str
-) -> ActionsManifest:
+def load_gallery_packages(
+    gallery_actions_folder: str,
+) -> dict[str, list[GalleryPackageVersion]]:
     """
-    Generates the manifest file for the built action packages.
+    Walks the gallery folder once, and parses package.yaml and hash files of every package version.
+    metadata.json is parsed lazily (see get_package_metadata), once for all manifest generators using
+    the returned packages.
 
     Parameters:
         gallery_actions_folder (str): The path to the folder containing prepared gallery action packages.
-        base_url (str): The base URL for the gallery actions in the S3.
+
+    Returns:
+        dict: Parsed package versions, keyed by the package folder name.
     """
-    manifest: ActionsManifest = {"packages": {}, "organization": "Sema4.ai"}
-    all_package_hashes = []
+    packages: dict[str, list[GalleryPackageVersion]] = {}
 
     for action_package_name in os.listdir(gallery_actions_folder):
         action_package_path = os.path.join(gallery_actions_folder, action_package_name)
 
         if os.path.isdir(action_package_path):
-            versions_info = []
+            versions: list[GalleryPackageVersion] = []
 
             for version_dir in os.listdir(action_package_path):
                 version_path = os.path.join(action_package_path, version_dir)
                 if os.path.isdir(version_path):
-                    metadata_path = os.path.join(version_path, "metadata.json")
-                    package_yaml_path = os.path.join(version_path, "package.yaml")
                     env_hash_path = os.path.join(version_path, "env.hash")
-                    package_hash_path = os.path.join(version_path, "package.hash")
 
                     # If reading of any file fails, we want to let it throw,
                     # so it can be dealt with higher up if needed.
-                    package_data = read_yaml_file(package_yaml_path)
-                    actions = get_actions_info(metadata_path)
-                    python_env_hash = read_file_contents(env_hash_path)
-                    zip_hash = read_file_contents(package_hash_path)
-
-                    version_info: ActionVersionInfo = {
-                        "version": package_data.get("version", version_dir),
-                        "description": package_data.get(
-                            "description", "No description provided."
+                    package_version: GalleryPackageVersion = {
+                        "package_folder": action_package_name,
+                        "version_dir": version_dir,
+                        "version_path": version_path,
+                        "package_data": read_yaml_file(
+                            os.path.join(version_path, "package.yaml")
+                        ),
+                        "zip_hash": read_file_contents(
+                            os.path.join(version_path, "package.hash")
                         ),
-                        "zip": f"{base_url}{action_package_name}/{version_dir}/{action_package_name}.zip",
-                        "icon": f"{base_url}{action_package_name}/{version_dir}/package.png",
-                        "metadata": f"{base_url}{action_package_name}/{version_dir}/metadata.json",
-                        "readme": f"{base_url}{action_package_name}/{version_dir}/README.md",
-                        "changelog": f"{base_url}{action_package_name}/{version_dir}/CHANGELOG.md",
-                        "actions": actions,
-                        "python_env_hash": python_env_hash,
-                        "zip_hash": zip_hash,
+                        "python_env_hash": read_file_contents(env_hash_path)
+                        if os.path.exists(env_hash_path)
+                        else None,
                     }
 
-                    versions_info.append(version_info)
+                    versions.append(package_version)
+
+            packages[action_package_name] = versions
+
+    return packages
+
+
+def get_package_metadata(package_version: GalleryPackageVersion) -> dict | None:
+    """Returns parsed metadata.json of the package version, reading it from disk only on first access."""
+    if "metadata" not in package_version:
+        metadata_path = os.path.join(package_version["version_path"], "metadata.json")
+
+        package_version["metadata"] = (
+            read_json_file(metadata_path) if os.path.exists(metadata_path) else None
+        )
+
+    return package_version["metadata"]
+
 
-                    if zip_hash:
-                        all_package_hashes.append(zip_hash)
+def generate_actions_manifest(
+    gallery_actions_folder: str,
+    base_url: str,
+    packages: dict[str, list[GalleryPackageVersion]] = None,
+) -> ActionsManifest:
+    """
+    Generates the manifest file for the built action packages.
+
+    Parameters:
+        gallery_actions_folder (str): The path to the folder containing prepared gallery action packages.
+        base_url (str): The base URL for the gallery actions in the S3.
+        packages (dict): Packages already parsed with load_gallery_packages. If not provided, the gallery
+            folder is parsed.
+    """
+    if packages is None:
+        packages = load_gallery_packages(gallery_actions_folder)
 
-            if versions_info:
-                package_name = package_data.get("name", action_package_name)
+    manifest: ActionsManifest = {"packages": {}, "organization": "Sema4.ai"}
 
-                action_package: PackageInfo = {
-                    "name": package_name,
-                    "versions": versions_info,
-                }
+    for action_package_name, package_versions in packages.items():
+        versions_info = []
+
+        for package_version in package_versions:
+            version_dir = package_version["version_dir"]
+            package_data = package_version["package_data"]
+            zip_hash = package_version["zip_hash"]
+
+            if package_version["python_env_hash"] is None:
+                raise FileNotFoundError(
+                    f"env.hash not found in {package_version['version_path']}"
+                )
+
+            version_info: ActionVersionInfo = {
+                "version": package_data.get("version", version_dir),
+                "description": package_data.get(
+                    "description", "No description provided."
+                ),
+                "zip": f"{base_url}{action_package_name}/{version_dir}/{action_package_name}.zip",
+                "icon": f"{base_url}{action_package_name}/{version_dir}/package.png",
+                "metadata": f"{base_url}{action_package_name}/{version_dir}/metadata.json",
+                "readme": f"{base_url}{action_package_name}/{version_dir}/README.md",
+                "changelog": f"{base_url}{action_package_name}/{version_dir}/CHANGELOG.md",
+                "actions": get_actions_info_from_metadata(
+                    get_package_metadata(package_version)
+                ),
+                "python_env_hash": package_version["python_env_hash"],
+                "zip_hash": zip_hash,
+            }
+
+            versions_info.append(version_info)
+
+        if versions_info:
+            package_name = package_versions[-1]["package_data"].get(
+                "name", action_package_name
+            )
 
-                manifest["packages"][package_name] = action_package
+            action_package: PackageInfo = {
+                "name": package_name,
+                "versions": versions_info,
+            }
 
-        # We only want to calculate the total hash if there are any packages in the manifest.
-        if len(manifest["packages"].keys()) > 0:
-            manifest["total_hash"] = generate_total_hash(manifest)
+            manifest["packages"][package_name] = action_package
+
+    # We only want to calculate the total hash if there are any packages in the manifest.
+    if len(manifest["packages"].keys()) > 0:
+        manifest["total_hash"] = generate_total_hash(manifest)
 
     return manifest
 
@@ -135,24 +199,28 @@ def generate_consolidated_manifest(
 
 
 def get_actions_info(metadata_path: str) -> list[ActionInfo]:
+    metadata = read_json_file(metadata_path) if os.path.exists(metadata_path) else None
+
+    return get_actions_info_from_metadata(metadata)
+
+
+def get_actions_info_from_metadata(metadata: dict | None) -> list[ActionInfo]:
     actions_info: list[ActionInfo] = []
 
-    if os.path.exists(metadata_path):
-        with open(metadata_path, "r", encoding='utf-8') as file:
-            metadata = json.load(file)
-            openapi_section = metadata.get("openapi.json", {})
-            paths = openapi_section.get("paths", {})
-            for path, operations in paths.items():
-                for method, details in operations.items():
-                    if "summary" in details:
-                        action_info: ActionInfo = {
-                            "name": details["summary"],
-                            "description": details["description"]
-                            if details["description"]
-                            else "",
-                        }
-
-                        actions_info.append(action_info)
+    if metadata is not None:
+        openapi_section = metadata.get("openapi.json", {})
+        paths = openapi_section.get("paths", {})
+        for path, operations in paths.items():
+            for method, details in operations.items():
+                if "summary" in details:
+                    action_info: ActionInfo = {
+                        "name": details["summary"],
+                        "description": details["description"]
+                        if details["description"]
+                        else "",
+                    }
+
+                    actions_info.append(action_info)
     return actions_info
 
 
@@ -160,51 +228,60 @@ def get_detailed_actions_info(metadata_path: str) -> list[ActionMethodInfo]:
     """
     Extracts detailed action information including original method names and parameters.
     """
+    metadata = read_json_file(metadata_path) if os.path.exists(metadata_path) else None
+
+    return get_detailed_actions_info_from_metadata(metadata)
+
+
+def get_detailed_actions_info_from_metadata(
+    metadata: dict | None,
+) -> list[ActionMethodInfo]:
+    """
+    Extracts detailed action information from already parsed metadata.json contents.
+    """
     actions_info: list[ActionMethodInfo] = []
 
-    if os.path.exists(metadata_path):
-        with open(metadata_path, "r", encoding='utf-8') as file:
-            metadata = json.load(file)
-            openapi_section = metadata.get("openapi.json", {})
-            paths = openapi_section.get("paths", {})
-
-            for path, operations in paths.items():
-                for method_name, details in operations.items():
-                    if "operationId" in details:
-                        parameters = []
-
-                        # Extract parameters from requestBody if it exists
-                        if "requestBody" in details:
-                            request_body = details["requestBody"]
-                            if "content" in request_body:
-                                json_content = request_body["content"].get(
-                                    "application/json", {}
+    if metadata is not None:
+        openapi_section = metadata.get("openapi.json", {})
+        paths = openapi_section.get("paths", {})
+
+        for path, operations in paths.items():
+            for method_name, details in operations.items():
+                if "operationId" in details:
+                    parameters = []
+
+                    # Extract parameters from requestBody if it exists
+                    if "requestBody" in details:
+                        request_body = details["requestBody"]
+                        if "content" in request_body:
+                            json_content = request_body["content"].get(
+                                "application/json", {}
+                            )
+                            if "schema" in json_content:
+                                properties = json_content["schema"].get(
+                                    "properties", {}
+                                )
+                                required_fields = json_content["schema"].get(
+                                    "required", []
                                 )
-                                if "schema" in json_content:
-                                    properties = json_content["schema"].get(
-                                        "properties", {}
-                                    )
-                                    required_fields = json_content["schema"].get(
-                                        "required", []
-                                    )
-
-                                    for param_name, param_details in properties.items():
-                                        param_info: ActionParameter = {
-                                            "name": param_name,
-                                            "description": param_details.get(
-                                                "description", ""
-                                            ),
-                                            "required": param_name in required_fields,
-                                            "type": param_details.get("type", "string"),
-                                        }
-                                        parameters.append(param_info)
-
-                        action_info: ActionMethodInfo = {
-                            "method_name": details["operationId"],
-                            "description": details.get("description", ""),
-                            "parameters": parameters,
-                        }
-                        actions_info.append(action_info)
+
+                                for param_name, param_details in properties.items():
+                                    param_info: ActionParameter = {
+                                        "name": param_name,
+                                        "description": param_details.get(
+                                            "description", ""
+                                        ),
+                                        "required": param_name in required_fields,
+                                        "type": param_details.get("type", "string"),
+                                    }
+                                    parameters.append(param_info)
+
+                    action_info: ActionMethodInfo = {
+                        "method_name": details["operationId"],
+                        "description": details.get("description", ""),
+                        "parameters": parameters,
+                    }
+                    actions_info.append(action_info)
 
     return actions_info
 
@@ -242,55 +319,52 @@ def save_manifest(
         json.dump(whitelist_manifest, file)
 
 
-def generate_actions_manifest_for_spcs(gallery_actions_folder: str) -> ActionsManifest:
+def generate_actions_manifest_for_spcs(
+    gallery_actions_folder: str,
+    packages: dict[str, list[GalleryPackageVersion]] = None,
+) -> ActionsManifest:
     """
     Generates a simplified manifest file for SPCS, excluding certain fields.
 
     Parameters:
         gallery_actions_folder (str): The path to the folder containing prepared gallery action packages.
-        base_url (str): The base URL for the gallery actions in the S3.
+        packages (dict): Packages already parsed with load_gallery_packages. If not provided, the gallery
+            folder is parsed.
     """
-    manifest: ActionsManifest = {"packages": {}, "organization": "Sema4.ai"}
-    all_package_hashes = []
-
-    for action_package_name in os.listdir(gallery_actions_folder):
-        action_package_path = os.path.join(gallery_actions_folder, action_package_name)
-
-        if os.path.isdir(action_package_path):
-            versions_info = []
+    if packages is None:
+        packages = load_gallery_packages(gallery_actions_folder)
 
-            for version_dir in os.listdir(action_package_path):
-                version_path = os.path.join(action_package_path, version_dir)
-                metadata_path = os.path.join(version_path, "metadata.json")
-                if os.path.isdir(version_path):
-                    package_yaml_path = os.path.join(version_path, "package.yaml")
-                    package_hash_path = os.path.join(version_path, "package.hash")
+    manifest: ActionsManifest = {"packages": {}, "organization": "Sema4.ai"}
 
-                    package_data = read_yaml_file(package_yaml_path)
-                    zip_hash = read_file_contents(package_hash_path)
+    for action_package_name, package_versions in packages.items():
+        versions_info = []
 
-                    version_info: ActionVersionInfo = {
-                        "description": package_data.get(
-                            "description", "No description provided."
-                        ),
-                        "version": package_data.get("version", version_dir),
-                        "methods": get_detailed_actions_info(metadata_path),
-                    }
+        for package_version in package_versions:
+            package_data = package_version["package_data"]
 
-                    versions_info.append(version_info)
+            version_info: ActionVersionInfo = {
+                "description": package_data.get(
+                    "description", "No description provided."
+                ),
+                "version": package_data.get("version", package_version["version_dir"]),
+                "methods": get_detailed_actions_info_from_metadata(
+                    get_package_metadata(package_version)
+                ),
+            }
 
-                    if zip_hash:
-                        all_package_hashes.append(zip_hash)
+            versions_info.append(version_info)
 
-            if versions_info:
-                package_name = package_data.get("name", action_package_name)
+        if versions_info:
+            package_name = package_versions[-1]["package_data"].get(
+                "name", action_package_name
+            )
 
-                action_package: PackageInfo = {
-                    "name": package_name,
-                    "versions": versions_info,
-                }
+            action_package: PackageInfo = {
+                "name": package_name,
+                "versions": versions_info,
+            }
 
-                manifest["packages"][package_name] = action_package
+            manifest["packages"][package_name] = action_package
 
     if len(manifest["packages"].keys()) > 0:
         manifest["total_hash"] = generate_total_hash(manifest)
@@ -3,6 +3,7 @@ import os
 from actions_manifest import (
     generate_actions_manifest,
     generate_actions_manifest_for_spcs,
+    load_gallery_packages,
     save_manifest,
 )
 from extractor import extract_all
@@ -15,6 +16,7 @@ from utils import clear_folders
 script_dir = os.path.dirname(os.path.abspath(__file__))
 zips_folder = os.path.join(script_dir, "zips")
 gallery_actions_folder = os.path.join(script_dir, "gallery")
+build_cache_folder = os.path.join(script_dir, "build_cache")
 base_url = "https://cdn.sema4.ai/gallery/actions/"
 
 
@@ -28,12 +30,17 @@ def build_all_packages():
     clear_folders(zips_folder)
     clear_folders(gallery_actions_folder)
 
-    build_action_packages(input_folder, zips_folder, action_server_path)
+    build_action_packages(
+        input_folder, zips_folder, action_server_path, cache_folder=build_cache_folder
+    )
 
     extract_all(zips_folder, gallery_actions_folder, rcc_path)
 
-    manifest = generate_actions_manifest(gallery_actions_folder, base_url)
-    spcs_manifest = generate_actions_manifest_for_spcs(gallery_actions_folder)
+    # Both manifests are generated from the same parsed view of the gallery folder.
+    packages = load_gallery_packages(gallery_actions_folder)
+
+    manifest = generate_actions_manifest(gallery_actions_folder, base_url, packages)
+    spcs_manifest = generate_actions_manifest_for_spcs(gallery_actions_folder, packages)
 
     with open("action_packages_whitelist.json", "r", encoding='utf-8') as f:
         import json
@@ -6,12 +6,15 @@ from environment_builder import build_package_environments
 script_dir = os.path.dirname(os.path.abspath(__file__))
 gallery_actions_folder = os.path.join(script_dir, "gallery")
 environments_folder = os.path.join(script_dir, "environments")
+environments_index_path = os.path.join(script_dir, "environments_index.json")
 
 @task
 def build_environments():
     clear_folders(environments_folder)
 
-    build_package_environments(gallery_actions_folder, environments_folder)
+    build_package_environments(
+        gallery_actions_folder, environments_folder, environments_index_path
+    )
 
 
 if __name__ == "__main__":
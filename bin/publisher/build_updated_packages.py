@@ -24,6 +24,7 @@ from utils import (
 script_dir = os.path.dirname(os.path.abspath(__file__))
 zips_folder = os.path.join(script_dir, "zips")
 gallery_actions_folder = os.path.join(script_dir, "gallery")
+build_cache_folder = os.path.join(script_dir, "build_cache")
 base_url = "https://cdn.sema4.ai/gallery/actions/"
 
 
@@ -67,7 +68,11 @@ def build_updated_packages():
     # We want to skip not updated packages at this point already, as building a package can also take
     # a non-trivial amount of time.
     built_count = build_action_packages(
-        input_folder, zips_folder, action_server_path, published_manifest
+        input_folder,
+        zips_folder,
+        action_server_path,
+        published_manifest,
+        cache_folder=build_cache_folder,
     )
 
     # If no packages were built, there is no point in continuing. Manifest won't be created, and the pipeline
@@ -1,7 +1,14 @@
+import json
 import os
 import platform
-from utils import read_file_contents, url_exists
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 from tools import ensure_holotree_shared, run_rcc_command
+from utils import read_file_contents, url_exists
+
+DEFAULT_PROBE_WORKERS = 8
+DEFAULT_PREBUILD_WORKERS = min(2, os.cpu_count() or 1)
 
 
 def get_environment_file_name(env_hash: str) -> str:
@@ -17,6 +24,52 @@ def get_environment_url(env_hash: str) -> str:
     return f"{base_environments_url}{file_name}"
 
 
+class ExportedEnvironmentsIndex:
+    """
+    Local, file backed index of environment hashes known to be published on the CDN.
+    Hashes found in the index skip both the CDN probe and the prebuild.
+    Locally exported environments are not recorded, as their upload may still fail.
+    """
+
+    def __init__(self, index_path: str | None):
+        self._index_path = index_path
+        self._lock = threading.Lock()
+        self._hashes: set[str] = set()
+
+        if index_path is not None and os.path.isfile(index_path):
+            try:
+                with open(index_path, "r", encoding='utf-8') as file:
+                    self._hashes = set(json.load(file).get(platform.system().lower(), []))
+            except (OSError, ValueError) as e:
+                print(f"Reading environments index {index_path} failed ({e}), starting with an empty index")
+
+    def __contains__(self, env_hash: str) -> bool:
+        with self._lock:
+            return env_hash in self._hashes
+
+    def add(self, env_hash: str) -> None:
+        with self._lock:
+            self._hashes.add(env_hash)
+
+    def save(self) -> None:
+        if self._index_path is None:
+            return
+
+        data = {}
+        if os.path.isfile(self._index_path):
+            try:
+                with open(self._index_path, "r", encoding='utf-8') as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                data = {}
+
+        with self._lock:
+            data[platform.system().lower()] = sorted(self._hashes)
+
+        with open(self._index_path, "w", encoding='utf-8', newline='\n') as file:
+            json.dump(data, file, indent=2)
+
+
 def build_package_environment(version_path: str, environments_folder: str) -> None:
     """
     Builds a single environment for given action package.
@@ -33,38 +86,111 @@ def build_package_environment(version_path: str, environments_folder: str) -> No
         print(f"Environment with hash {env_hash} for package {version_path} already exists, skipping")
         return
 
+    prebuild_environment(env_hash, version_path, environments_folder)
+
+
+def prebuild_environment(env_hash: str, version_path: str, environments_folder: str) -> bool:
+    """
+    Runs `rcc ht prebuild --export` for the package.yaml in given version path.
+
+    Returns:
+        bool: True if the environment zip was exported.
+    """
     package_yaml_path = os.path.join(version_path, "package.yaml")
     result_zip_path = os.path.join(environments_folder, get_environment_file_name(env_hash))
 
     print(f"Building: {version_path}")
 
-    run_rcc_command(['ht', 'prebuild', package_yaml_path, '--export', result_zip_path])
+    result = run_rcc_command(['ht', 'prebuild', package_yaml_path, '--export', result_zip_path])
+
+    if result.returncode != 0 or not os.path.isfile(result_zip_path):
+        print(f"Building environment {env_hash} for {version_path} failed: {result.stderr}")
+        return False
 
     print(f"Environment built: {result_zip_path}")
+    return True
 
 
-def build_package_environments(gallery_actions_folder: str, environments_folder: str) -> None:
+def collect_package_environments(gallery_actions_folder: str) -> dict[str, str]:
     """
-    Iterates over all sub-folders in the gallery folder, and builds RCC environments for related package.yaml files.
-    Args:
-        gallery_actions_folder (str): The path to the gallery folder containing built action packages.
-        environments_folder (str): The path where the resulting environment files will be stored.
+    Collects environment hashes of all package versions in the gallery folder.
+
+    Returns:
+        dict: A single package version path for each distinct environment hash.
     """
-    ensure_holotree_shared()
+    environments: dict[str, str] = {}
 
-    for action_package_name in os.listdir(gallery_actions_folder):
+    for action_package_name in sorted(os.listdir(gallery_actions_folder)):
         action_package_path = os.path.join(gallery_actions_folder, action_package_name)
 
         if os.path.isdir(action_package_path):
-            for version_dir in os.listdir(action_package_path):
+            for version_dir in sorted(os.listdir(action_package_path)):
                 version_path = os.path.join(action_package_path, version_dir)
 
-                # For debugging the exact envs
-                #env_hash_path = os.path.join(version_path, "env.hash")
-                #python_env_hash = read_file_contents(env_hash_path)
-                #print(f"python_env_hash: {python_env_hash}")
+                env_hash_path = os.path.join(version_path, "env.hash")
+                env_hash = read_file_contents(env_hash_path)
 
-                build_package_environment(version_path, environments_folder)
+                if env_hash in environments:
+                    print(f"Environment with hash {env_hash} for package {version_path} is shared with "
+                          f"{environments[env_hash]}, skipping")
+                    continue
 
+                environments[env_hash] = version_path
 
+    return environments
+
+
+def build_package_environments(
+    gallery_actions_folder: str,
+    environments_folder: str,
+    index_path: str = None,
+    max_probe_workers: int = DEFAULT_PROBE_WORKERS,
+    max_prebuild_workers: int = DEFAULT_PREBUILD_WORKERS,
+) -> None:
+    """
+    Iterates over all sub-folders in the gallery folder, and builds RCC environments for related package.yaml files.
+    Identical environment hashes are built only once, existence checks and prebuilds run concurrently.
+    Args:
+        gallery_actions_folder (str): The path to the gallery folder containing built action packages.
+        environments_folder (str): The path where the resulting environment files will be stored.
+        index_path (str): The path to the local index of already exported environment hashes. If provided,
+            hashes from the index are skipped, and hashes found on the CDN are recorded in it.
+        max_probe_workers (int): Maximum number of concurrent CDN existence checks.
+        max_prebuild_workers (int): Maximum number of concurrent `rcc ht prebuild` runs.
+    """
+    ensure_holotree_shared()
 
+    index = ExportedEnvironmentsIndex(index_path)
+    environments = collect_package_environments(gallery_actions_folder)
+
+    pending = {}
+    for env_hash, version_path in environments.items():
+        if env_hash in index:
+            print(f"Environment with hash {env_hash} for package {version_path} is in the local index, skipping")
+        else:
+            pending[env_hash] = version_path
+
+    # Probe the CDN concurrently - requests are I/O bound and independent of each other.
+    with ThreadPoolExecutor(max_workers=max(1, max_probe_workers)) as executor:
+        exists = dict(
+            zip(pending, executor.map(lambda env_hash: url_exists(get_environment_url(env_hash)), pending))
+        )
+
+    to_build = {}
+    for env_hash, version_path in pending.items():
+        if exists[env_hash]:
+            print(f"Environment with hash {env_hash} for package {version_path} already exists, skipping")
+            index.add(env_hash)
+        else:
+            to_build[env_hash] = version_path
+
+    def build(env_hash: str) -> None:
+        # Not added to the index: the export is only published once uploaded, and found on the CDN by a later run
+        prebuild_environment(env_hash, to_build[env_hash], environments_folder)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_prebuild_workers)) as executor:
+            for _ in executor.map(build, to_build):
+                pass
+    finally:
+        index.save()
@@ -1,69 +1,141 @@
 import os
-import shutil
 import subprocess
 import zipfile
-from utils import log_error, sha256, package_yaml_from_zip
+from concurrent.futures import Future, ThreadPoolExecutor
 
+import yaml
+from utils import copy_and_hash, log_error
 
-def extract_single_zip(zip_path: str, gallery_actions_folder: str, rcc_path: str):
-    """Extracts and processes a single zip file using version data from package.yaml."""
+DEFAULT_EXTRACT_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+
+# Filter and extract specific files
+FILES_TO_EXTRACT = [
+    "metadata.json",
+    "package.png",
+    "package.yaml",
+    "__action_server_metadata__.json",
+    "README.md",
+    "CHANGELOG.md"
+]
+
+
+def calculate_environment_hash(package_yaml_path: str, versioned_extract_path: str, rcc_path: str) -> None:
+    """Runs `rcc ht hash` on the extracted package.yaml and stores the result in env.hash."""
+    env_hash_path = os.path.join(versioned_extract_path, 'env.hash')
+    try:
+        with open(env_hash_path, 'w', encoding='utf-8', newline='\n') as env_hash_file:
+            subprocess.run(
+                [rcc_path, "ht", "hash", package_yaml_path, "--silent"],
+                stdout=env_hash_file,
+                check=True,
+            )
+    except subprocess.CalledProcessError as e:
+        log_error(f"Failed to run RCC on {package_yaml_path}: {str(e)}", versioned_extract_path)
+
+
+def extract_single_zip(zip_path: str, gallery_actions_folder: str, rcc_path: str | None) -> str | None:
+    """
+    Extracts and processes a single zip file using version data from package.yaml.
+
+    If rcc_path is None, the environment hash is not calculated, and the path to the extracted package.yaml
+    is returned instead, so that the caller can schedule `rcc ht hash` separately.
+    """
     base_extract_path = os.path.join(gallery_actions_folder, os.path.splitext(os.path.basename(zip_path))[0])
     os.makedirs(base_extract_path, exist_ok=True)
 
-    # Open the zip file to check contents and extract package.yaml to get the version
+    # Open the zip file once: package.yaml is parsed in memory to get the version, and then
+    # the needed files are extracted from the same handle.
     with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        package_data = package_yaml_from_zip(zip_ref, base_extract_path)
-        version = package_data.get('version', 'unknown')  # Default to 'unknown' if not found
+        names = zip_ref.namelist()
+        package_data = yaml.safe_load(zip_ref.read("package.yaml")) if "package.yaml" in names else {}
+        version = (package_data or {}).get('version', 'unknown')  # Default to 'unknown' if not found
         versioned_extract_path = os.path.join(base_extract_path, version)
         os.makedirs(versioned_extract_path, exist_ok=True)
 
-        # Filter and extract specific files
-        files_to_extract = [
-            "metadata.json",
-            "package.png",
-            "package.yaml",
-            "__action_server_metadata__.json",
-            "README.md",
-            "CHANGELOG.md"
-        ]
-
-        for item in zip_ref.namelist():
-            if any(item.endswith(x) for x in files_to_extract) or item.endswith('.yaml'):
+        for item in names:
+            if any(item.endswith(x) for x in FILES_TO_EXTRACT) or item.endswith('.yaml'):
                 zip_ref.extract(item, versioned_extract_path)
 
-        # Rename '__action_server_metadata__.json' to 'metadata.json'
-        metadata_src = os.path.join(versioned_extract_path, "__action_server_metadata__.json")
-        metadata_dst = os.path.join(versioned_extract_path, "metadata.json")
-        if os.path.exists(metadata_src):
-            # Remove existing metadata.json if it exists to avoid rename conflict
-            if os.path.exists(metadata_dst):
-                os.remove(metadata_dst)
-            os.rename(metadata_src, metadata_dst)
-
-        # Copy the zip file to the versioned target folder
-        shutil.copy(zip_path, os.path.join(versioned_extract_path, os.path.basename(zip_path)))
-
-        # Calculate the hash of the zip file and save it to package.hash
-        zip_hash = sha256(zip_path)
-        with open(os.path.join(versioned_extract_path, "package.hash"), 'w', encoding='utf-8', newline='\n') as hash_file:
-            hash_file.write(zip_hash)
-
-        # If package.yaml was extracted, run RCC command on it
-        package_yaml_path = os.path.join(versioned_extract_path, "package.yaml")
-        if os.path.exists(package_yaml_path):
-            hash_command = f"\"{rcc_path}\" ht hash {package_yaml_path} --silent > {os.path.join(versioned_extract_path, 'env.hash')}"
-            try:
-                subprocess.run(hash_command, shell=True, check=True)
-            except subprocess.CalledProcessError as e:
-                log_error(f"Failed to run RCC on {package_yaml_path}: {str(e)}", versioned_extract_path)
-
-
-def extract_all(zips_folder: str, gallery_actions_folder: str, rcc_path: str):
-    """Iterates over all zip files in the directory and processes each one."""
+    # Rename '__action_server_metadata__.json' to 'metadata.json'
+    metadata_src = os.path.join(versioned_extract_path, "__action_server_metadata__.json")
+    metadata_dst = os.path.join(versioned_extract_path, "metadata.json")
+    if os.path.exists(metadata_src):
+        # Remove existing metadata.json if it exists to avoid rename conflict
+        if os.path.exists(metadata_dst):
+            os.remove(metadata_dst)
+        os.rename(metadata_src, metadata_dst)
+
+    # Copy the zip file to the versioned target folder, hashing it while it is copied,
+    # and save the hash to package.hash
+    zip_hash = copy_and_hash(zip_path, os.path.join(versioned_extract_path, os.path.basename(zip_path)))
+    with open(os.path.join(versioned_extract_path, "package.hash"), 'w', encoding='utf-8', newline='\n') as hash_file:
+        hash_file.write(zip_hash)
+
+    # If package.yaml was extracted, run RCC command on it
+    package_yaml_path = os.path.join(versioned_extract_path, "package.yaml")
+    if not os.path.exists(package_yaml_path):
+        return None
+
+    if rcc_path is not None:
+        calculate_environment_hash(package_yaml_path, versioned_extract_path, rcc_path)
+        return None
+
+    return package_yaml_path
+
+
+def extract_all(
+    zips_folder: str,
+    gallery_actions_folder: str,
+    rcc_path: str,
+    max_workers: int = DEFAULT_EXTRACT_WORKERS,
+):
+    """
+    Iterates over all zip files in the directory and processes them in parallel.
+
+    Extraction and hashing of a zip, and the `rcc ht hash` call for its package.yaml, run as two
+    separate stages, so that rcc calls overlap with the extraction of the following zips.
+    """
     if not os.path.exists(gallery_actions_folder):
         os.makedirs(gallery_actions_folder)
 
-    for file_name in os.listdir(zips_folder):
-        if file_name.endswith(".zip"):
-            zip_path = os.path.join(zips_folder, file_name)
-            extract_single_zip(zip_path, gallery_actions_folder, rcc_path)
+    zip_paths = [
+        os.path.join(zips_folder, file_name)
+        for file_name in sorted(os.listdir(zips_folder))
+        if file_name.endswith(".zip")
+    ]
+
+    workers = max(1, max_workers)
+
+    with ThreadPoolExecutor(max_workers=workers) as hash_executor:
+        hash_futures: list[Future] = []
+
+        def schedule_environment_hash(extract_future: Future) -> None:
+            if extract_future.exception() is not None:
+                return
+
+            package_yaml_path = extract_future.result()
+            if package_yaml_path is not None:
+                hash_futures.append(
+                    hash_executor.submit(
+                        calculate_environment_hash,
+                        package_yaml_path,
+                        os.path.dirname(package_yaml_path),
+                        rcc_path,
+                    )
+                )
+
+        with ThreadPoolExecutor(max_workers=workers) as extract_executor:
+            extract_futures = [
+                extract_executor.submit(extract_single_zip, zip_path, gallery_actions_folder, None)
+                for zip_path in zip_paths
+            ]
+
+            for extract_future in extract_futures:
+                extract_future.add_done_callback(schedule_environment_hash)
+
+        # Re-raise extraction errors, the same way a sequential run would.
+        for extract_future in extract_futures:
+            extract_future.result()
+
+        for hash_future in list(hash_futures):
+            hash_future.result()
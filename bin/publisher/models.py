@@ -32,6 +32,17 @@ class ActionVersionInfo(TypedDict):
     zip_hash: str
 
 
+class GalleryPackageVersion(TypedDict):
+    """Parsed view of a single extracted package version, shared by the manifest generators."""
+    package_folder: str
+    version_dir: str
+    version_path: str
+    package_data: dict
+    zip_hash: str
+    python_env_hash: str | None
+    metadata: NotRequired[dict | None]
+
+
 class PackageInfo(TypedDict):
     name: str
     versions: list[ActionVersionInfo]
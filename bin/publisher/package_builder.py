@@ -1,33 +1,144 @@
+import hashlib
 import os
+import shutil
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from models import ActionsManifest
-from utils import get_version_strings_from_package_info, log_error, read_yaml_file
+from tools import as_version
+from utils import (
+    ensure_folders,
+    get_version_strings_from_package_info,
+    log_error,
+    read_yaml_file,
+)
+
+# Folders that never end up in a package zip and should not invalidate the build cache.
+IGNORED_SOURCE_FOLDERS = {
+    ".git",
+    ".venv",
+    ".pytest_cache",
+    ".mypy_cache",
+    ".ruff_cache",
+    "__pycache__",
+    "output",
+}
+
+DEFAULT_BUILD_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def calculate_sources_hash(sub_folder_path: str, action_server_version: str = as_version) -> str:
+    """
+    Calculates a content hash covering all sources of an action package, including package.yaml.
+
+    Parameters:
+        sub_folder_path (str): The path to the folder containing the package.yaml.
+        action_server_version (str): Version of the action server used for the build, part of the hash
+            so that upgrading the action server invalidates cached zips.
+
+    Returns:
+        str: The hex digest of the package sources.
+    """
+    hash_obj = hashlib.sha256()
+    hash_obj.update(f"action-server:{action_server_version}\n".encode("utf-8"))
+
+    for root, dirs, files in os.walk(sub_folder_path):
+        # Sort in place, so that os.walk visits folders in a stable order.
+        dirs[:] = sorted(d for d in dirs if d not in IGNORED_SOURCE_FOLDERS)
+
+        for file_name in sorted(files):
+            if file_name.endswith((".pyc", ".pyo")):
+                continue
+
+            file_path = os.path.join(root, file_name)
+            relative_path = os.path.relpath(file_path, sub_folder_path).replace(os.sep, "/")
+
+            hash_obj.update(f"{relative_path}\n".encode("utf-8"))
+            with open(file_path, "rb") as file:
+                for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                    hash_obj.update(chunk)
+
+    return hash_obj.hexdigest()
+
+
+def _copy_zips(source_folder: str, target_folder: str) -> list[str]:
+    copied = []
+
+    for file_name in os.listdir(source_folder):
+        if file_name.endswith(".zip"):
+            shutil.copy(os.path.join(source_folder, file_name), os.path.join(target_folder, file_name))
+            copied.append(file_name)
+
+    return copied
 
 
 def build_single_package(
-    sub_folder_path: str, zips_folder: str, action_server_path: str
-) -> None:
+    sub_folder_path: str,
+    zips_folder: str,
+    action_server_path: str,
+    cache_folder: str = None,
+) -> bool:
     """
     Builds a single action package from a specified folder using the provided action server path.
 
+    If a cache folder is given, the zip is looked up by the hash of the package sources first, and
+    the action server is only invoked on a cache miss.
+
     Parameters:
         sub_folder_path (str): The path to the folder containing the package.yaml.
         zips_folder (str): The path to the folder where the zip files will be stored.
         action_server_path (str): The path to the action server executable.
+        cache_folder (str): The path to the folder holding previously built zips, keyed by sources hash.
+
+    Returns:
+        bool: True if the package zip is available in the zips folder.
     """
     package_yaml_path = os.path.join(sub_folder_path, "package.yaml")
-    if os.path.isfile(package_yaml_path):
-        command = f'"{action_server_path}" package build --output-dir {zips_folder} --override'
+    if not os.path.isfile(package_yaml_path):
+        return False
+
+    cached_path = None
+    if cache_folder is not None:
+        cached_path = os.path.join(cache_folder, calculate_sources_hash(sub_folder_path))
+
+        if os.path.isdir(cached_path) and _copy_zips(cached_path, zips_folder):
+            print(f"Cached: {sub_folder_path}")
+            return True
+
+    # Each build gets its own output folder, so that concurrent builds can't pick up each other's zips.
+    with tempfile.TemporaryDirectory() as build_output_folder:
+        command = [
+            action_server_path,
+            "package",
+            "build",
+            "--output-dir",
+            build_output_folder,
+            "--override",
+        ]
         try:
             print(f"Running: {sub_folder_path}")
 
-            subprocess.run(command, shell=True, check=True, cwd=sub_folder_path)
+            subprocess.run(command, check=True, cwd=sub_folder_path)
         except subprocess.CalledProcessError as e:
             log_error(str(e), sub_folder_path)
             print(
                 f"{sub_folder_path} package errored, will not be available to publish"
             )
+            return False
+
+        _copy_zips(build_output_folder, zips_folder)
+
+        if cached_path is not None:
+            # Copy into a temporary sibling first, so that an interrupted run never leaves a partial entry.
+            staging_path = f"{cached_path}.tmp"
+            shutil.rmtree(staging_path, ignore_errors=True)
+            os.makedirs(staging_path)
+            _copy_zips(build_output_folder, staging_path)
+            shutil.rmtree(cached_path, ignore_errors=True)
+            os.rename(staging_path, cached_path)
+
+    return True
 
 
 def build_action_packages(
@@ -35,9 +146,12 @@ def build_action_packages(
     zips_folder: str,
     action_server_path: str,
     manifest: ActionsManifest = None,
+    cache_folder: str = None,
+    max_workers: int = DEFAULT_BUILD_WORKERS,
 ) -> int:
     """
     Iterates over all sub-folders in the input folder and builds action packages where package.yaml is found.
+    Packages are built concurrently, using a bounded pool of workers.
 
     Parameters:
         input_folder (str): The path to the main input folder containing multiple action package folders.
@@ -45,19 +159,24 @@ def build_action_packages(
         action_server_path (str): The path to the action server executable.
         manifest (ActionsManifest): The package manifest. If provided, versions already existing in the manifest
             will be skipped.
+        cache_folder (str): The path to the local build cache. If provided, packages whose sources did not change
+            since the last build are copied from the cache instead of being rebuilt.
+        max_workers (int): Maximum number of packages built at the same time.
 
     Returns:
         built_count: number of built packages.
     """
 
     # Ensure the output directory exists
-    if not os.path.exists(zips_folder):
-        os.makedirs(zips_folder)
+    ensure_folders(zips_folder)
 
-    built_count = 0
+    if cache_folder is not None:
+        ensure_folders(cache_folder)
+
+    packages_to_build: list[str] = []
 
     # Process each sub-folder in the main input folder
-    for sub_folder_name in os.listdir(input_folder):
+    for sub_folder_name in sorted(os.listdir(input_folder)):
         sub_folder_path = os.path.join(input_folder, sub_folder_name)
 
         if os.path.isdir(sub_folder_path):
@@ -94,7 +213,23 @@ def build_action_packages(
                 len(published_versions) == 0
                 or package_version not in published_versions
             ):
-                build_single_package(sub_folder_path, zips_folder, action_server_path)
-                built_count += 1
+                packages_to_build.append(sub_folder_path)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [
+            executor.submit(
+                build_single_package,
+                sub_folder_path,
+                zips_folder,
+                action_server_path,
+                cache_folder,
+            )
+            for sub_folder_path in packages_to_build
+        ]
+
+        for future in as_completed(futures):
+            future.result()
 
-    return built_count
+    # Packages that errored are still counted, in line with the previous behaviour - the error is logged,
+    # and the package is simply missing from the zips folder.
+    return len(packages_to_build)
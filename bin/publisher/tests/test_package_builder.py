@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import pytest
+from package_builder import calculate_sources_hash
+
+
+def _write_package(folder: Path) -> Path:
+    (folder / "actions").mkdir(parents=True)
+    (folder / "package.yaml").write_text("name: Test\nversion: 1.0.0\n")
+    (folder / "actions" / "actions.py").write_text("def action():\n    pass\n")
+    return folder
+
+
+@pytest.fixture
+def package_folder(tmp_path: Path) -> Path:
+    return _write_package(tmp_path / "package")
+
+
+class TestCalculateSourcesHash:
+    """Tests for the build cache key of action package sources."""
+
+    def test_same_sources_in_different_folders(self, tmp_path: Path) -> None:
+        first = _write_package(tmp_path / "first")
+        second = _write_package(tmp_path / "second")
+
+        assert calculate_sources_hash(str(first), "1.0") == calculate_sources_hash(str(second), "1.0")
+
+    def test_changed_content(self, package_folder: Path) -> None:
+        before = calculate_sources_hash(str(package_folder), "1.0")
+        (package_folder / "actions" / "actions.py").write_text("def action():\n    return 1\n")
+
+        assert calculate_sources_hash(str(package_folder), "1.0") != before
+
+    def test_changed_package_yaml(self, package_folder: Path) -> None:
+        before = calculate_sources_hash(str(package_folder), "1.0")
+        (package_folder / "package.yaml").write_text("name: Test\nversion: 1.0.1\n")
+
+        assert calculate_sources_hash(str(package_folder), "1.0") != before
+
+    def test_renamed_file(self, package_folder: Path) -> None:
+        before = calculate_sources_hash(str(package_folder), "1.0")
+        (package_folder / "actions" / "actions.py").rename(package_folder / "actions" / "other.py")
+
+        assert calculate_sources_hash(str(package_folder), "1.0") != before
+
+    def test_moved_content_between_files(self, package_folder: Path) -> None:
+        """File boundaries are part of the hash, not only the concatenated content."""
+        (package_folder / "a.py").write_text("ab")
+        (package_folder / "b.py").write_text("")
+        before = calculate_sources_hash(str(package_folder), "1.0")
+
+        (package_folder / "a.py").write_text("a")
+        (package_folder / "b.py").write_text("b")
+
+        assert calculate_sources_hash(str(package_folder), "1.0") != before
+
+    def test_ignored_folders_and_bytecode(self, package_folder: Path) -> None:
+        before = calculate_sources_hash(str(package_folder), "1.0")
+
+        for folder in ("__pycache__", ".venv", "output"):
+            (package_folder / folder).mkdir()
+            (package_folder / folder / "file.txt").write_text("ignored")
+        (package_folder / "actions" / "actions.pyc").write_bytes(b"\x00")
+
+        assert calculate_sources_hash(str(package_folder), "1.0") == before
+
+    def test_action_server_version(self, package_folder: Path) -> None:
+        assert calculate_sources_hash(str(package_folder), "1.0") != calculate_sources_hash(
+            str(package_folder), "2.0"
+        )
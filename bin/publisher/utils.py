@@ -3,7 +3,6 @@ import json
 import logging
 import os
 import shutil
-import zipfile
 from typing import Any, Union
 
 import requests
@@ -27,6 +26,17 @@ def sha256(filepath: str, hash_type: str = "sha256") -> str:
     return hash_obj.hexdigest()
 
 
+def copy_and_hash(source_path: str, target_path: str, hash_type: str = "sha256") -> str:
+    """Copy a file and calculate its hash in the same pass, returning the hex digest."""
+    hash_obj = hashlib.new(hash_type)
+    with open(source_path, "rb") as source, open(target_path, "wb") as target:
+        for chunk in iter(lambda: source.read(1024 * 1024), b""):
+            hash_obj.update(chunk)
+            target.write(chunk)
+    shutil.copystat(source_path, target_path)
+    return hash_obj.hexdigest()
+
+
 def calculate_file_hash(filepath: str) -> str:
     """Calculate the SHA-256 hash of a file and return the hex digest."""
     return sha256(filepath, "sha256")
@@ -86,32 +96,6 @@ def url_exists(url: str) -> bool:
         return False
 
 
-def package_yaml_from_zip(
-    zip_ref: zipfile.ZipFile, extract_path: str
-) -> dict[str, Any]:
-    """
-    Extracts 'package.yaml' from a zip file, parses it, and returns the package data.
-    It temporarily extracts the file to the provided path, parses it, and deletes the temporary file.
-
-    Parameters:
-        zip_ref (zipfile.ZipFile): Reference to the opened zip file.
-        extract_path (str): Path to extract the temporary file.
-
-    Returns:
-        dict: Parsed data from 'package.yaml', or an empty dictionary if not found.
-    """
-    yaml_file_name = "package.yaml"
-    yaml_path = os.path.join(extract_path, yaml_file_name)
-    if yaml_file_name in zip_ref.namelist():
-        zip_ref.extract(yaml_file_name, extract_path)
-
-        package_data = read_yaml_file(yaml_path)
-        os.remove(yaml_path)  # Clean up the temporary file
-
-        return package_data
-    return {}
-
-
 def download_and_parse_json(url: str) -> Union[dict[str, Any], None]:
     """
     Downloads and parses a JSON file from a specified URL.
@@ -1,5 +1,5 @@
 import json
-import duckdb
+import pandas as pd
 from pathlib import Path
 from typing import Dict, List, Optional, Union
 from contextlib import contextmanager
@@ -11,6 +11,7 @@ from utils.commons.formatting import DatabaseDataCleaner
 from utils.logging.reconcile_logging_module import configure_logging
 from utils.commons.path_utils import get_full_path
 from utils.commons.db_key_generator import DatabaseKeyGenerator
+from utils.commons.duckdb_connection_manager import DuckDBConnectionManager
 
 class InvoiceLoader:
     
@@ -74,7 +75,12 @@ class InvoiceLoader:
         return db_setup
 
     def _load_invoices_from_setup(self, conn, customer: Dict, invoices: List[Dict], discrepancy_config: Dict):
-        """Load invoices with clean data."""
+        """
+        Load invoices with clean data.
+
+        The cleaned invoices are staged in a DataFrame registered with DuckDB and
+        upserted with a single INSERT ... SELECT, instead of one statement per invoice.
+        """
         # Clean customer ID once
         clean_customer_id = self.data_cleaner.clean_string(customer['customer_id'])
         
@@ -82,6 +88,10 @@ class InvoiceLoader:
         sorted_invoices = sorted(invoices, key=lambda x: x['invoice_number'])
         adjustments = discrepancy_config.get('adjustments', {})
         
+        if not sorted_invoices:
+            return
+        
+        staged_rows = []
         for invoice in sorted_invoices:
             # Clean invoice data
             clean_invoice = self.data_cleaner.clean_invoice_data({
@@ -107,68 +117,92 @@ class InvoiceLoader:
             # Rest of the amount processing logic remains the same
             # [Previous amount adjustment logic here...]
             
-            query = """
-            INSERT INTO invoice (
-                invoice_id, invoice_number, customer_id, internal_facility_id,
-                invoice_date, invoice_amount, additional_charges,
-                discounts_applied, amount_paid, facility_type,
-                service_type, usage_amount, usage_unit,
-                co2_supplementation, status
-            ) VALUES (?, ?, ?, ?, ?,
-                CAST(? AS DECIMAL(18, 2)),
-                CAST(? AS DECIMAL(18, 2)),
-                CAST(? AS DECIMAL(18, 2)),
-                CAST(0 AS DECIMAL(18, 2)),  -- Fixed amount_paid as constant
-                ?, ?, ?, ?, ?, ?)
-            ON CONFLICT (customer_id, invoice_number) DO UPDATE SET
-                invoice_date = EXCLUDED.invoice_date,
-                invoice_amount = CAST(EXCLUDED.invoice_amount AS DECIMAL(18, 2)),
-                additional_charges = CAST(EXCLUDED.additional_charges AS DECIMAL(18, 2)),
-                discounts_applied = CAST(EXCLUDED.discounts_applied AS DECIMAL(18, 2)),
-                facility_type = EXCLUDED.facility_type,
-                service_type = EXCLUDED.service_type,
-                usage_amount = EXCLUDED.usage_amount,
-                usage_unit = EXCLUDED.usage_unit,
-                co2_supplementation = EXCLUDED.co2_supplementation,
-                status = EXCLUDED.status
-            """
-            
-            conn.execute(query, [
-                invoice_id,
-                clean_invoice['invoice_number'],
-                clean_invoice['customer_id'],
-                internal_facility_id,
-                invoice['invoice_date'],
-                float(base_amount),
-                float(charges),
-                float(discounts),
-                clean_invoice['facility_type'],
-                clean_invoice['service_type'],
-                clean_invoice.get('usage_amount'),
-                clean_invoice['usage_unit'],
-                clean_invoice.get('co2_supplementation'),
-                clean_invoice['status']
-            ])
+            # Numeric values are staged as strings and cast to DECIMAL in SQL, so they stay exact
+            staged_rows.append({
+                'invoice_id': invoice_id,
+                'invoice_number': clean_invoice['invoice_number'],
+                'customer_id': clean_invoice['customer_id'],
+                'internal_facility_id': internal_facility_id,
+                'invoice_date': str(invoice['invoice_date']),
+                'invoice_amount': str(base_amount),
+                'additional_charges': str(charges),
+                'discounts_applied': str(discounts),
+                'facility_type': clean_invoice['facility_type'],
+                'service_type': clean_invoice['service_type'],
+                'usage_amount': self._to_staged_str(clean_invoice.get('usage_amount')),
+                'usage_unit': clean_invoice['usage_unit'],
+                'co2_supplementation': self._to_staged_str(clean_invoice.get('co2_supplementation')),
+                'status': clean_invoice['status']
+            })
+        
+        self._bulk_upsert_invoices(conn, pd.DataFrame(staged_rows, dtype=object))
+
+    @staticmethod
+    def _to_staged_str(value) -> Optional[str]:
+        return None if value is None else str(value)
+
+    def _bulk_upsert_invoices(self, conn, staged_invoices: pd.DataFrame):
+        """Upsert all staged invoices with one set-based statement."""
+        query = """
+        INSERT INTO invoice (
+            invoice_id, invoice_number, customer_id, internal_facility_id,
+            invoice_date, invoice_amount, additional_charges,
+            discounts_applied, amount_paid, facility_type,
+            service_type, usage_amount, usage_unit,
+            co2_supplementation, status
+        )
+        SELECT
+            invoice_id,
+            invoice_number,
+            customer_id,
+            internal_facility_id,
+            CAST(invoice_date AS DATE),
+            CAST(invoice_amount AS DECIMAL(18, 2)),
+            CAST(additional_charges AS DECIMAL(18, 2)),
+            CAST(discounts_applied AS DECIMAL(18, 2)),
+            CAST(0 AS DECIMAL(18, 2)),  -- Fixed amount_paid as constant
+            facility_type,
+            service_type,
+            CAST(CAST(usage_amount AS VARCHAR) AS DECIMAL(18, 6)),
+            CAST(usage_unit AS VARCHAR),
+            CAST(CAST(co2_supplementation AS VARCHAR) AS DECIMAL(18, 2)),
+            status
+        FROM invoice_stage
+        -- An invoice number listed twice keeps its last row, the same as upserting row by row
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY invoice_number ORDER BY position DESC) = 1
+        ON CONFLICT (customer_id, invoice_number) DO UPDATE SET
+            invoice_date = EXCLUDED.invoice_date,
+            invoice_amount = EXCLUDED.invoice_amount,
+            additional_charges = EXCLUDED.additional_charges,
+            discounts_applied = EXCLUDED.discounts_applied,
+            facility_type = EXCLUDED.facility_type,
+            service_type = EXCLUDED.service_type,
+            usage_amount = EXCLUDED.usage_amount,
+            usage_unit = EXCLUDED.usage_unit,
+            co2_supplementation = EXCLUDED.co2_supplementation,
+            status = EXCLUDED.status
+        """
+        
+        staged_invoices = staged_invoices.assign(position=range(len(staged_invoices)))
+        
+        conn.register('invoice_stage', staged_invoices)
+        try:
+            conn.execute(query)
+        finally:
+            conn.unregister('invoice_stage')
+        
+        self.logger.debug(f"Loaded {len(staged_invoices)} invoices")
 
     # Other methods remain unchanged as they don't handle decimal values
     @contextmanager
     def get_connection(self):
-        conn = None
+        """Yield a cursor of the process-wide shared connection to the ledger database."""
         try:
-            self.logger.debug(f"Establishing database connection to: {self.db_path}")
-            conn = duckdb.connect(self.db_path)
-            self.logger.debug("Database connection established successfully")
-            yield conn
+            with DuckDBConnectionManager.cursor(self.db_path) as conn:
+                yield conn
         except Exception as e:
             self.logger.error(f"Database connection error: {str(e)}", exc_info=True)
             raise
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                    self.logger.debug("Database connection closed successfully")
-                except Exception as e:
-                    self.logger.error(f"Error closing database connection: {str(e)}", exc_info=True)
 
     def initialize_database(self):
             """
@@ -190,15 +224,14 @@ class InvoiceLoader:
                         'customer'                # Referenced by facility and invoice
                     ]
                     
-                    for table in tables_to_drop:
-                        try:
-                            conn.execute(f"DROP TABLE IF EXISTS {table}")
-                            self.logger.debug(f"Dropped table {table} if it existed")
-                        except Exception as drop_error:
-                            self.logger.error(
-                                f"Error dropping table {table}: {str(drop_error)}"
-                            )
-                            raise
+                    try:
+                        conn.execute("".join(f"DROP TABLE IF EXISTS {table};" for table in tables_to_drop))
+                        self.logger.debug(f"Dropped tables {', '.join(tables_to_drop)} if they existed")
+                    except Exception as drop_error:
+                        self.logger.error(
+                            f"Error dropping tables: {str(drop_error)}"
+                        )
+                        raise
                     
                     ddl_path = get_full_path(
                         str(self.get_db_dir() / FolderConstants.DDL / 
@@ -209,16 +242,8 @@ class InvoiceLoader:
                     with open(ddl_path) as f:
                         ddl_content = f.read()
                     
-                    statements = [stmt.strip() for stmt in ddl_content.split(';') 
-                                if stmt.strip()]
-                    
-                    for statement in statements:
-                        if statement:
-                            self.logger.debug(
-                                f"Executing DDL statement: {statement[:100]}..."
-                            )
-                            conn.execute(statement)
-                            self.logger.debug("Statement executed successfully")
+                    # DuckDB runs the whole script at once, statements don't need to be split
+                    conn.execute(ddl_content)
                     
                     self.logger.debug(f"Database initialized successfully at {self.db_path}")
                     
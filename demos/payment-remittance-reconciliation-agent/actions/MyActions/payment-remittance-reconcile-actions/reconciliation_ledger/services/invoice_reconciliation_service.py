@@ -3,13 +3,16 @@ from typing import Dict, List, Any
 import logging
 from datetime import datetime
 
+import pandas as pd
+
 from reconciliation_ledger.reconciliation_constants import DocumentStatus
 from context.reconciliation_agent_context_manager import ReconciliationAgentContextManager
 from reconciliation_ledger.db.invoice_loader import InvoiceLoader
+from reconciliation_ledger.services.reconciliation_analysis_engine import ReconciliationAnalysisEngine
 from utils.commons.decimal_utils import DecimalHandler
 from utils.commons.formatting import format_currency
 from models.reconciliation_models import (
-    DiscrepancySummary, FacilityAmountSummary, InvoiceDiscrepancyDetail, ProcessingMetrics, ReconciliationPhase,
+    DiscrepancySummary, ProcessingMetrics, ReconciliationPhase,
     ReconciliationResult, RemittanceFields
 )
 
@@ -86,7 +89,6 @@ class InvoiceReconciliationLedgerService:
                     )
                     
                     # Process allocations
-                    allocation_results = []
                     facility_totals = {}
                     facility_metrics = {
                             "invoice_counts": {},
@@ -94,12 +96,20 @@ class InvoiceReconciliationLedgerService:
                             "service_types": set()
                         }
                     
+                    parsed_allocations = []
                     for invoice in invoices:
                         # Parse invoice amounts
                         amount_paid = self._parse_monetary_value(invoice['Amount Paid'])  # Net amount
                         invoice_amount = self._parse_monetary_value(invoice['Invoice Amount'])  # Gross amount
                         discounts = self._parse_monetary_value(invoice.get('Discounts Applied', 0))
                         charges = self._parse_monetary_value(invoice.get('Additional Charges', 0))
+                        parsed_allocations.append({
+                            'invoice_number': invoice['Invoice Number'],
+                            'amount_applied': amount_paid,
+                            'invoice_amount': invoice_amount,
+                            'discounts_applied': discounts,
+                            'additional_charges': charges
+                        })
                         
                         # Track facility metrics
                         facility_type = invoice['Facility Type']
@@ -115,24 +125,17 @@ class InvoiceReconciliationLedgerService:
                         if invoice.get('Service Type'):
                             facility_metrics["service_types"].add(invoice['Service Type'])
                         
-                        # Create allocation
-                        allocation = self._create_allocation_record(
-                            conn, customer_id, payment_id, {
-                                **invoice,
-                                'Amount Paid': float(amount_paid),
-                                'Invoice Amount': float(invoice_amount),
-                                'Discounts Applied': float(discounts),
-                                'Additional Charges': float(charges)
-                            }
-                        )
-                        allocation_results.append(allocation)
-                        
                         # Track facility totals (using net amounts)
                         facility_type = invoice['Facility Type']
                         if facility_type not in facility_totals:
                             facility_totals[facility_type] = Decimal('0')
                         facility_totals[facility_type] += amount_paid
 
+                    # Create all allocations in one set-based statement
+                    allocation_results = self._create_allocation_records(
+                        conn, customer_id, payment_id, parsed_allocations
+                    )
+
                     # Calculate percentages and create facility distribution
                     facility_distribution = {}
                     for facility, amount in facility_metrics["amount_totals"].items():
@@ -203,8 +206,8 @@ class InvoiceReconciliationLedgerService:
                 ar_discounts = payment['total_discounts']
                 total_ar_net = DecimalHandler.round_decimal(ar_gross - ar_discounts)
                 
-                # Get invoice data
-                invoice_data = self._get_invoice_data(conn, payment['payment_id'])
+                # Invoice level analysis runs as SQL aggregates over the ledger
+                analysis_engine = ReconciliationAnalysisEngine(conn)
                 
                 
                 # Payment Matching Phase
@@ -234,7 +237,7 @@ class InvoiceReconciliationLedgerService:
                     })
                 
                     # First get base processing metrics
-                    processing_metrics = self._calculate_processing_metrics(invoice_data)
+                    processing_metrics = analysis_engine.get_processing_metrics(payment['payment_id'])
                     
                     # Calculate total difference
                     total_difference = DecimalHandler.round_decimal(customer_payment - total_ar_net)
@@ -266,7 +269,7 @@ class InvoiceReconciliationLedgerService:
                         "Beginning facility-level reconciliation analysis"
                     )
                     # Calculate facility summaries
-                    facility_summaries = self._calculate_facility_summaries(invoice_data, threshold)
+                    facility_summaries = analysis_engine.get_facility_summaries(payment['payment_id'], threshold)
                 
                     facility_metrics = {
                         "total_facilities": len(facility_summaries),
@@ -303,58 +306,10 @@ class InvoiceReconciliationLedgerService:
                         "Beginning invoice-level reconciliation analysis"
                     )
                     # Check for discrepancies and update match status
-                    all_matched = True  # Start with True
-                    discrepancy_details = []
-                    
-                    invoice_metrics = {
-                        "total_invoices": len(invoice_data),
-                        "invoices_analyzed": 0,
-                        "invoices_with_discrepancies": 0,
-                        "discrepancy_summary": {
-                            "by_facility": {},
-                            "by_service": {}
-                        }
-                    }
-                    
-                    for invoice in invoice_data:
-                        remit_amount = invoice['allocated_amount']
-                        ar_gross = invoice['ar_amount']
-                        discounts = invoice.get('discounts', Decimal('0'))
-                        
-                        # Calculate net AR amount
-                        ar_net = DecimalHandler.round_decimal(ar_gross - discounts)
-                        difference = DecimalHandler.round_decimal(remit_amount - ar_net)
-                        
-                        invoice_metrics["invoices_analyzed"] += 1
-                        
-                        if abs(difference) > threshold:
-                            all_matched = False  # Set to False if any discrepancy found
-                            
-                            # Collect Various Metrics for the invoices with discrpencies
-                            invoice_metrics["invoices_with_discrepancies"] += 1
-                            
-                            # Track discrepancies by facility and service type
-                            facility = invoice['facility_type']
-                            service = invoice['service_type']
-                            
-                            if facility not in invoice_metrics["discrepancy_summary"]["by_facility"]:
-                                invoice_metrics["discrepancy_summary"]["by_facility"][facility] = 0
-                            invoice_metrics["discrepancy_summary"]["by_facility"][facility] += 1
-                            
-                            if service not in invoice_metrics["discrepancy_summary"]["by_service"]:
-                                invoice_metrics["discrepancy_summary"]["by_service"][service] = 0
-                            invoice_metrics["discrepancy_summary"]["by_service"][service] += 1
-                        
-                            
-                            discrepancy_details.append(InvoiceDiscrepancyDetail(
-                                invoice_number=invoice['invoice_number'],
-                                facility_id=invoice['facility_id'],
-                                facility_type=invoice['facility_type'],
-                                service_type=invoice['service_type'],
-                                remittance_amount=remit_amount,
-                                ar_amount=ar_net,
-                                difference=difference
-                            ))
+                    discrepancy_details, invoice_metrics = analysis_engine.get_invoice_discrepancies(
+                        payment['payment_id'], threshold, processing_metrics['total_invoices']
+                    )
+                    all_matched = not discrepancy_details
                             
                     self.context_manager.update_metrics({
                         "invoice_analysis": invoice_metrics
@@ -431,87 +386,6 @@ class InvoiceReconciliationLedgerService:
             raise
 
 
-    def _calculate_facility_summaries(
-        self, 
-        invoice_data: List[Dict],
-        threshold: Decimal
-    ) -> List[FacilityAmountSummary]:
-        """Calculate facility summaries using net amounts."""
-        facility_totals = {}
-        
-        # First pass: aggregate amounts by facility
-        for invoice in invoice_data:
-            ftype = invoice['facility_type']
-            if ftype not in facility_totals:
-                facility_totals[ftype] = {
-                    'remit_total': Decimal('0'),
-                    'ar_gross': Decimal('0'),
-                    'discounts': Decimal('0'),
-                    'services': set(),
-                    'count': 0,
-                    'has_discrepancy': False  # Track discrepancies at facility level
-                }
-            
-            ft = facility_totals[ftype]
-            ft['remit_total'] += invoice['allocated_amount']
-            ft['ar_gross'] += invoice['ar_amount']
-            ft['discounts'] += invoice.get('discounts', Decimal('0'))
-            ft['services'].add(invoice['service_type'])
-            ft['count'] += 1
-
-        # Second pass: create summaries
-        summaries = []
-        for ftype, totals in facility_totals.items():
-            net_ar = DecimalHandler.round_decimal(
-                totals['ar_gross'] - totals['discounts']
-            )
-            remit_total = DecimalHandler.round_decimal(totals['remit_total'])
-            
-            difference = DecimalHandler.round_decimal(remit_total - net_ar)
-            has_discrepancy = abs(difference) > threshold
-            
-            summaries.append(FacilityAmountSummary(
-                facility_type=ftype,
-                remittance_amount=remit_total,
-                ar_system_amount=net_ar,
-                difference=difference,
-                service_types=sorted(totals['services']),
-                invoice_count=totals['count'],
-                has_discrepancy=has_discrepancy
-            ))
-
-        return sorted(summaries, key=lambda x: abs(x.difference), reverse=True)
-    
-    
-    def _calculate_processing_metrics(self, invoice_data: List[Dict]) -> Dict[str, Any]:
-        """Calculate initial processing metrics."""
-        if not invoice_data:
-            return {
-                "total_invoices": 0,
-                "facility_types": [],
-                "facility_type_count": 0,
-                "service_types": [],
-                "service_type_count": 0,
-                "all_matched": False  # Default to False if no invoices
-            }
-            
-        # Get unique facility types
-        facility_types = sorted(set(inv['facility_type'] for inv in invoice_data))
-        
-        # Get unique service types
-        service_types = sorted(set(inv['service_type'] for inv in invoice_data if inv['service_type']))
-        
-        return {
-            "total_invoices": len(invoice_data),
-            "facility_types": facility_types,
-            "facility_type_count": len(facility_types),
-            "service_types": service_types,
-            "service_type_count": len(service_types),
-            "all_matched": True  # Initial value, will be updated based on discrepancy checks
-        }
-
-
-
     def _get_payment_info(self, conn, payment_reference: str) -> Dict[str, Any]:
         """Get payment information with proper decimal handling."""
         query = """
@@ -550,42 +424,6 @@ class InvoiceReconciliationLedgerService:
             "remittance_notes": result[10]
         }
 
-    def _get_invoice_data(self, conn, payment_id: str) -> List[Dict]:
-        """Get invoice data with proper decimal handling."""
-        query = """
-            WITH payment_allocations AS (
-                SELECT 
-                    i.invoice_number,
-                    i.invoice_id,
-                    f.facility_id,
-                    i.facility_type,
-                    i.service_type,
-                    CAST(pa.amount_applied AS DECIMAL(18, 2)) as allocated_amount,
-                    CAST(i.invoice_amount AS DECIMAL(18, 2)) as ar_amount,
-                    CAST(COALESCE(i.discounts_applied, 0) AS DECIMAL(18, 2)) as discounts
-                FROM payment_allocation pa
-                JOIN invoice i ON pa.invoice_id = i.invoice_id
-                JOIN facility f ON i.internal_facility_id = f.internal_facility_id
-                WHERE pa.payment_id = ?
-            )
-            SELECT *
-            FROM payment_allocations
-            ORDER BY facility_type, invoice_number
-        """
-        
-        results = conn.execute(query, [payment_id]).fetchall()
-        
-        return [{
-            "invoice_number": row[0],
-            "invoice_id": row[1],
-            "facility_id": row[2],
-            "facility_type": row[3],
-            "service_type": row[4],
-            "allocated_amount": DecimalHandler.from_str(str(row[5])),  # Net amount
-            "ar_amount": DecimalHandler.from_str(str(row[6])),         # Gross AR amount
-            "discounts": DecimalHandler.from_str(str(row[7]))          # Discounts
-        } for row in results]
-
     def _get_remittance_fields(self, payment: Dict) -> RemittanceFields:
         """Create RemittanceFields from payment data."""
         try:
@@ -659,73 +497,99 @@ class InvoiceReconciliationLedgerService:
         
         return payment_id
 
-    def _create_allocation_record(
+    def _create_allocation_records(
         self,
         conn,
         customer_id: str,
         payment_id: str,
-        invoice: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Create allocation record with proper decimal handling."""
-        # Get invoice_id
-        query = """
-        SELECT invoice_id 
-        FROM invoice 
-        WHERE customer_id = ? AND invoice_number = ?
+        allocations: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
         """
-        
-        result = conn.execute(query, [customer_id, invoice['Invoice Number']]).fetchone()
-        if not result:
-            raise ValueError(f"Invoice {invoice['Invoice Number']} not found for customer {customer_id}")
-            
-        invoice_id = result[0]
-        
-        # Create allocation with proper decimal handling
-        query = """
-        INSERT INTO payment_allocation (
-            allocation_id, payment_id, invoice_id,
-            amount_applied, invoice_amount, discounts_applied,
-            additional_charges
-        ) VALUES (?, ?, ?, 
-            CAST(? AS DECIMAL(18, 2)), 
-            CAST(? AS DECIMAL(18, 2)), 
-            CAST(? AS DECIMAL(18, 2)), 
-            CAST(? AS DECIMAL(18, 2)))
-        ON CONFLICT (allocation_id) DO UPDATE SET
-            amount_applied = CAST(EXCLUDED.amount_applied AS DECIMAL(18, 2)),
-            invoice_amount = CAST(EXCLUDED.invoice_amount AS DECIMAL(18, 2)),
-            discounts_applied = CAST(EXCLUDED.discounts_applied AS DECIMAL(18, 2)),
-            additional_charges = CAST(EXCLUDED.additional_charges AS DECIMAL(18, 2))
+        Create allocation records for all invoices of a payment with set-based statements.
+
+        Allocations are staged in a DataFrame registered with DuckDB, so invoice ids are
+        resolved and the upsert is done for the whole payment at once, instead of two
+        queries per invoice. Amounts are staged as strings and cast to DECIMAL in SQL.
         """
-        
-        allocation_id = f"ALLOC-{payment_id}-{invoice_id}"
-        
-        # Parse amounts ensuring proper decimal handling
-        amount_applied = DecimalHandler.from_str(str(invoice['Amount Paid']))  # Net amount
-        invoice_amount = DecimalHandler.from_str(str(invoice['Invoice Amount']))  # Gross amount
-        discounts = DecimalHandler.from_str(str(invoice.get('Discounts Applied', 0)))
-        charges = DecimalHandler.from_str(str(invoice.get('Additional Charges', 0)))
-        
-        conn.execute(query, [
-            allocation_id,
-            payment_id,
-            invoice_id,
-            float(amount_applied),
-            float(invoice_amount),
-            float(discounts),
-            float(charges)
+        if not allocations:
+            return []
+
+        staged_allocations = pd.DataFrame([
+            {
+                'position': position,
+                'invoice_number': str(allocation['invoice_number']),
+                'amount_applied': str(allocation['amount_applied']),
+                'invoice_amount': str(allocation['invoice_amount']),
+                'discounts_applied': str(allocation['discounts_applied']),
+                'additional_charges': str(allocation['additional_charges'])
+            }
+            for position, allocation in enumerate(allocations)
         ])
-        
-        return {
-            "allocation_id": allocation_id,
-            "invoice_id": invoice_id,
-            "invoice_number": invoice['Invoice Number'],
-            "amount": float(amount_applied),
-            "invoice_amount": float(invoice_amount),
-            "discounts": float(discounts),
-            "charges": float(charges)
-        }
-        
+
+        conn.register('allocation_stage', staged_allocations)
+        try:
+            # Resolve all invoice ids at once
+            query = """
+            SELECT s.invoice_number, i.invoice_id
+            FROM allocation_stage s
+            LEFT JOIN invoice i
+                ON i.customer_id = ? AND i.invoice_number = s.invoice_number
+            ORDER BY s.position
+            """
+
+            invoice_ids = {}
+            for invoice_number, invoice_id in conn.execute(query, [customer_id]).fetchall():
+                if invoice_id is None:
+                    raise ValueError(f"Invoice {invoice_number} not found for customer {customer_id}")
+                invoice_ids[invoice_number] = invoice_id
+
+            # Create allocations with proper decimal handling. An invoice listed twice
+            # keeps its last line, the same as upserting the lines one by one.
+            query = """
+            INSERT INTO payment_allocation (
+                allocation_id, payment_id, invoice_id,
+                amount_applied, invoice_amount, discounts_applied,
+                additional_charges
+            )
+            SELECT
+                'ALLOC-' || ? || '-' || i.invoice_id,
+                ?,
+                i.invoice_id,
+                CAST(s.amount_applied AS DECIMAL(18, 2)),
+                CAST(s.invoice_amount AS DECIMAL(18, 2)),
+                CAST(s.discounts_applied AS DECIMAL(18, 2)),
+                CAST(s.additional_charges AS DECIMAL(18, 2))
+            FROM allocation_stage s
+            JOIN invoice i
+                ON i.customer_id = ? AND i.invoice_number = s.invoice_number
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY s.invoice_number ORDER BY s.position DESC) = 1
+            ON CONFLICT (allocation_id) DO UPDATE SET
+                amount_applied = EXCLUDED.amount_applied,
+                invoice_amount = EXCLUDED.invoice_amount,
+                discounts_applied = EXCLUDED.discounts_applied,
+                additional_charges = EXCLUDED.additional_charges
+            """
+
+            conn.execute(query, [payment_id, payment_id, customer_id])
+        finally:
+            conn.unregister('allocation_stage')
+
+        results = []
+        for allocation in allocations:
+            invoice_number = str(allocation['invoice_number'])
+            invoice_id = invoice_ids[invoice_number]
+            results.append({
+                "allocation_id": f"ALLOC-{payment_id}-{invoice_id}",
+                "invoice_id": invoice_id,
+                "invoice_number": allocation['invoice_number'],
+                "amount": float(allocation['amount_applied']),
+                "invoice_amount": float(allocation['invoice_amount']),
+                "discounts": float(allocation['discounts_applied']),
+                "charges": float(allocation['additional_charges'])
+            })
+
+        return results
+
     def _parse_monetary_value(self, value: Any) -> Decimal:
         """Parse monetary values with consistent decimal handling."""
         if isinstance(value, str):
@@ -0,0 +1,195 @@
+from decimal import Decimal
+from typing import Any, Dict, List, Tuple
+import logging
+
+from models.reconciliation_models import FacilityAmountSummary, InvoiceDiscrepancyDetail
+
+
+# Net amounts of every invoice allocated to a payment, DECIMAL end to end
+ALLOCATION_LINES_CTE = """
+    WITH allocation_lines AS (
+        SELECT
+            i.invoice_number,
+            f.facility_id,
+            i.facility_type,
+            i.service_type,
+            CAST(pa.amount_applied AS DECIMAL(18, 2)) AS allocated_amount,
+            CAST(i.invoice_amount AS DECIMAL(18, 2)) AS ar_amount,
+            CAST(COALESCE(i.discounts_applied, 0) AS DECIMAL(18, 2)) AS discounts,
+            CAST(i.invoice_amount AS DECIMAL(18, 2))
+                - CAST(COALESCE(i.discounts_applied, 0) AS DECIMAL(18, 2)) AS ar_net,
+            CAST(pa.amount_applied AS DECIMAL(18, 2))
+                - (CAST(i.invoice_amount AS DECIMAL(18, 2))
+                   - CAST(COALESCE(i.discounts_applied, 0) AS DECIMAL(18, 2))) AS difference,
+            ROW_NUMBER() OVER (ORDER BY i.facility_type, i.invoice_number) AS line_number
+        FROM payment_allocation pa
+        JOIN invoice i ON pa.invoice_id = i.invoice_id
+        JOIN facility f ON i.internal_facility_id = f.internal_facility_id
+        WHERE pa.payment_id = ?
+    )
+"""
+
+# Threshold is compared as DECIMAL as well, so there is no float rounding in the checks
+THRESHOLD_PARAM = "CAST(? AS DECIMAL(18, 6))"
+
+
+class ReconciliationAnalysisEngine:
+    """
+    Computes the reconciliation analysis of a payment as DuckDB aggregates
+    over the payment_allocation and invoice tables.
+    """
+
+    def __init__(self, conn):
+        self.logger = logging.getLogger(__name__)
+        self.conn = conn
+
+    def get_processing_metrics(self, payment_id: str) -> Dict[str, Any]:
+        """Calculate initial processing metrics."""
+        query = ALLOCATION_LINES_CTE + """
+            SELECT
+                COUNT(*),
+                LIST(DISTINCT facility_type ORDER BY facility_type),
+                LIST(DISTINCT service_type ORDER BY service_type)
+                    FILTER (WHERE service_type IS NOT NULL AND service_type <> '')
+            FROM allocation_lines
+        """
+
+        total_invoices, facility_types, service_types = self.conn.execute(query, [payment_id]).fetchone()
+
+        if not total_invoices:
+            return {
+                "total_invoices": 0,
+                "facility_types": [],
+                "facility_type_count": 0,
+                "service_types": [],
+                "service_type_count": 0,
+                "all_matched": False  # Default to False if no invoices
+            }
+
+        facility_types = facility_types or []
+        service_types = service_types or []
+
+        return {
+            "total_invoices": total_invoices,
+            "facility_types": facility_types,
+            "facility_type_count": len(facility_types),
+            "service_types": service_types,
+            "service_type_count": len(service_types),
+            "all_matched": True  # Initial value, will be updated based on discrepancy checks
+        }
+
+    def get_facility_summaries(self, payment_id: str, threshold: Decimal) -> List[FacilityAmountSummary]:
+        """Calculate facility summaries using net amounts, largest differences first."""
+        query = ALLOCATION_LINES_CTE + f"""
+            , facility_totals AS (
+                SELECT
+                    facility_type,
+                    CAST(SUM(allocated_amount) AS DECIMAL(18, 2)) AS remit_total,
+                    CAST(SUM(ar_amount) - SUM(discounts) AS DECIMAL(18, 2)) AS net_ar,
+                    LIST(DISTINCT service_type ORDER BY service_type) AS service_types,
+                    COUNT(*) AS invoice_count
+                FROM allocation_lines
+                GROUP BY facility_type
+            )
+            SELECT
+                facility_type,
+                remit_total,
+                net_ar,
+                remit_total - net_ar AS difference,
+                service_types,
+                invoice_count,
+                ABS(remit_total - net_ar) > {THRESHOLD_PARAM} AS has_discrepancy
+            FROM facility_totals
+            ORDER BY ABS(difference) DESC, facility_type
+        """
+
+        rows = self.conn.execute(query, [payment_id, str(threshold)]).fetchall()
+
+        return [
+            FacilityAmountSummary(
+                facility_type=row[0],
+                remittance_amount=row[1],
+                ar_system_amount=row[2],
+                difference=row[3],
+                service_types=row[4],
+                invoice_count=row[5],
+                has_discrepancy=row[6]
+            )
+            for row in rows
+        ]
+
+    def get_invoice_discrepancies(
+        self,
+        payment_id: str,
+        threshold: Decimal,
+        total_invoices: int
+    ) -> Tuple[List[InvoiceDiscrepancyDetail], Dict[str, Any]]:
+        """
+        Find invoices whose net AR amount differs from the remitted amount by more than the threshold.
+        total_invoices is the invoice count of the payment, from get_processing_metrics.
+
+        Returns:
+            The discrepancy details, ordered by facility type and invoice number,
+            and the invoice analysis metrics.
+        """
+        query = ALLOCATION_LINES_CTE + f"""
+            SELECT
+                invoice_number,
+                facility_id,
+                facility_type,
+                service_type,
+                allocated_amount,
+                ar_net,
+                difference,
+                line_number
+            FROM allocation_lines
+            WHERE ABS(difference) > {THRESHOLD_PARAM}
+            ORDER BY line_number
+        """
+
+        rows = self.conn.execute(query, [payment_id, str(threshold)]).fetchall()
+
+        discrepancy_details = [
+            InvoiceDiscrepancyDetail(
+                invoice_number=row[0],
+                facility_id=row[1],
+                facility_type=row[2],
+                service_type=row[3],
+                remittance_amount=row[4],
+                ar_amount=row[5],
+                difference=row[6]
+            )
+            for row in rows
+        ]
+
+        # Discrepancy buckets, keyed in order of first appearance
+        bucket_query = ALLOCATION_LINES_CTE + f"""
+            , discrepancies AS (
+                SELECT * FROM allocation_lines WHERE ABS(difference) > {THRESHOLD_PARAM}
+            )
+            SELECT 'facility' AS bucket, facility_type AS bucket_key, COUNT(*), MIN(line_number) AS first_line
+            FROM discrepancies
+            GROUP BY facility_type
+            UNION ALL
+            SELECT 'service', service_type, COUNT(*), MIN(line_number)
+            FROM discrepancies
+            GROUP BY service_type
+            ORDER BY bucket, first_line
+        """
+
+        by_facility = {}
+        by_service = {}
+        for bucket, key, count, _ in self.conn.execute(bucket_query, [payment_id, str(threshold)]).fetchall():
+            (by_facility if bucket == 'facility' else by_service)[key] = count
+
+        invoice_metrics = {
+            "total_invoices": total_invoices,
+            "invoices_analyzed": total_invoices,
+            "invoices_with_discrepancies": len(discrepancy_details),
+            "discrepancy_summary": {
+                "by_facility": by_facility,
+                "by_service": by_service
+            }
+        }
+
+        return discrepancy_details, invoice_metrics
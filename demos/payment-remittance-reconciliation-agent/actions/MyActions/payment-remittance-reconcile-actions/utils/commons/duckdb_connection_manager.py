@@ -0,0 +1,112 @@
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import duckdb
+
+
+class DuckDBConnectionManager:
+    """
+    Process-level manager of long-lived DuckDB connections, one per database file.
+
+    Callers get cursors of the shared connection instead of connecting on every use,
+    so the database file is opened and its catalog loaded once for a run of actions.
+
+    The connection is closed after being idle for IDLE_TIMEOUT_SECONDS, so an idle
+    process doesn't keep the file locked for other processes, and when the process exits.
+    close() releases it right away, e.g. before another process needs the file.
+
+    Processes which only read, like analysis runs, can set READ_ONLY so their
+    connections are opened in read-only mode and several of them can read the
+    database at the same time.
+    """
+
+    IDLE_TIMEOUT_SECONDS = 5.0
+    READ_ONLY = False
+
+    _logger = logging.getLogger(__name__)
+    _lock = threading.Lock()
+    _connections: Dict[str, duckdb.DuckDBPyConnection] = {}
+    _active_cursors: Dict[str, int] = {}
+    _idle_timers: Dict[str, threading.Timer] = {}
+
+    @classmethod
+    @contextmanager
+    def cursor(cls, db_path: str):
+        """Context manager yielding a cursor of the shared connection to the database."""
+        connection = cls._acquire(db_path)
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            yield cursor
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Exception as e:
+                    cls._logger.error(f"Error closing DuckDB cursor: {str(e)}")
+            cls._release(db_path)
+
+    @classmethod
+    def _acquire(cls, db_path: str) -> duckdb.DuckDBPyConnection:
+        with cls._lock:
+            timer = cls._idle_timers.pop(db_path, None)
+            if timer:
+                timer.cancel()
+
+            connection = cls._connections.get(db_path)
+            if connection is None:
+                cls._logger.debug(f"Opening shared DuckDB connection to: {db_path} (read_only={cls.READ_ONLY})")
+                connection = duckdb.connect(db_path, read_only=cls.READ_ONLY)
+                cls._connections[db_path] = connection
+
+            cls._active_cursors[db_path] = cls._active_cursors.get(db_path, 0) + 1
+            return connection
+
+    @classmethod
+    def _release(cls, db_path: str):
+        with cls._lock:
+            cls._active_cursors[db_path] -= 1
+            if cls._active_cursors[db_path] or db_path not in cls._connections:
+                return
+
+            timer = threading.Timer(cls.IDLE_TIMEOUT_SECONDS, cls._close_if_idle, args=(db_path,))
+            timer.daemon = True
+            cls._idle_timers[db_path] = timer
+            timer.start()
+
+    @classmethod
+    def _close_if_idle(cls, db_path: str):
+        with cls._lock:
+            if cls._active_cursors.get(db_path, 0):
+                return
+            cls._idle_timers.pop(db_path, None)
+            cls._close_connection(db_path)
+
+    @classmethod
+    def _close_connection(cls, db_path: str):
+        connection = cls._connections.pop(db_path, None)
+        if connection is None:
+            return
+
+        try:
+            connection.close()
+            cls._logger.debug(f"Closed shared DuckDB connection to: {db_path}")
+        except Exception as e:
+            cls._logger.error(f"Error closing DuckDB connection: {str(e)}")
+
+    @classmethod
+    def close(cls, db_path: Optional[str] = None):
+        """Close the connection to the given database, or all connections if no path is given."""
+        with cls._lock:
+            paths = [db_path] if db_path else list(cls._connections)
+            for path in paths:
+                timer = cls._idle_timers.pop(path, None)
+                if timer:
+                    timer.cancel()
+                cls._close_connection(path)
+
+
+atexit.register(DuckDBConnectionManager.close)
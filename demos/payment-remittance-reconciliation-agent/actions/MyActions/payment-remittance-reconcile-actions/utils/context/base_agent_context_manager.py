@@ -9,6 +9,7 @@ from datetime import datetime
 import functools
 import time
 
+from utils.commons.duckdb_connection_manager import DuckDBConnectionManager
 from utils.logging.ultimate_serializer import serialize_any_object_safely
 
 class BaseAgentContextManager(ABC):
@@ -78,24 +79,16 @@ class BaseAgentContextManager(ABC):
 
     @contextmanager
     def duckdb_connection(self):
-        """Context manager for database connections."""
-        connection = None
+        """Context manager for database connections, backed by the process-wide shared connection."""
         try:
-            connection = duckdb.connect(self.db_path)
-            yield connection
+            with DuckDBConnectionManager.cursor(self.db_path) as connection:
+                yield connection
         except duckdb.IOException as e:
             self.logger.error(f"DuckDB connection error: {str(e)}")
             raise
         except Exception as e:
             self.logger.error(f"An unexpected error occurred: {str(e)}")
             raise
-        finally:
-            if connection:
-                try:
-                    connection.close()
-                    self.logger.debug("Database connection closed successfully.")
-                except Exception as e:
-                    self.logger.error(f"Error closing DuckDB connection: {str(e)}")
 
     @abstractmethod
     def _create_tables(self, conn):
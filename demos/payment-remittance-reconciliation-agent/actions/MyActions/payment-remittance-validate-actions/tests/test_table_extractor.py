@@ -0,0 +1,67 @@
+from utils.extraction.table_extractor import TableBuffer, make_unique_headers
+
+
+class TestMakeUniqueHeaders:
+    """Tests for renaming repeated and reserved table headers."""
+
+    def test_unique_headers_unchanged(self) -> None:
+        assert make_unique_headers(["Invoice Number", "Amount Due"]) == ["Invoice Number", "Amount Due"]
+
+    def test_repeated_headers(self) -> None:
+        assert make_unique_headers(["Amount", "Amount", "Amount"]) == ["Amount", "Amount.1", "Amount.2"]
+
+    def test_reserved_headers(self) -> None:
+        assert make_unique_headers(["Page", "Table", "Notes"]) == ["Page.1", "Table.1", "Notes"]
+
+    def test_suffix_already_used(self) -> None:
+        assert make_unique_headers(["Amount", "Amount.1", "Amount"]) == ["Amount", "Amount.1", "Amount.2"]
+
+
+class TestTableBuffer:
+    """Tests for building one DataFrame from all sections of a table type."""
+
+    def test_empty(self) -> None:
+        assert TableBuffer().to_dataframe().empty
+
+    def test_sections_with_same_headers(self) -> None:
+        buffer = TableBuffer()
+        buffer.add_section(["Invoice", "Amount"], [["INV-1", "10"], ["INV-2", "20"]], "1", 1)
+        buffer.add_section(["Invoice", "Amount"], [["INV-3", "30"]], "2", 1)
+
+        df = buffer.to_dataframe()
+
+        assert list(df.columns) == ["Invoice", "Amount", "Page", "Table"]
+        assert df["Invoice"].tolist() == ["INV-1", "INV-2", "INV-3"]
+        assert df["Page"].tolist() == ["1", "1", "2"]
+        assert buffer.section_count == 2
+
+    def test_sections_with_different_headers(self) -> None:
+        """Columns missing from a section are empty for its rows."""
+        buffer = TableBuffer()
+        buffer.add_section(["Invoice", "Amount"], [["INV-1", "10"]], "1", 1)
+        buffer.add_section(["Invoice", "Discount"], [["INV-2", "5"]], "2", 2)
+
+        df = buffer.to_dataframe()
+
+        assert list(df.columns) == ["Invoice", "Amount", "Discount", "Page", "Table"]
+        assert df.fillna("").values.tolist() == [
+            ["INV-1", "10", "", "1", 1],
+            ["INV-2", "", "5", "2", 2],
+        ]
+
+    def test_short_rows(self) -> None:
+        buffer = TableBuffer()
+        buffer.add_section(["Invoice", "Amount"], [["INV-1"]], "1", 1)
+
+        df = buffer.to_dataframe()
+
+        assert df["Invoice"].tolist() == ["INV-1"]
+        assert df["Amount"].isna().all()
+
+    def test_duplicate_and_reserved_headers(self) -> None:
+        buffer = TableBuffer()
+        buffer.add_section(["Amount", "Amount", "Page"], [["10", "20", "p"]], "3", 4)
+
+        row = buffer.to_dataframe().iloc[0].to_dict()
+
+        assert row == {"Amount": "10", "Amount.1": "20", "Page.1": "p", "Page": "3", "Table": 4}
@@ -1,6 +1,7 @@
 import json
 import re
 import pandas as pd
+from pandas.tseries.api import guess_datetime_format
 from typing import List, Dict, Any, Tuple, Optional
 
 # Import from sema4ai DI client models
@@ -27,6 +28,39 @@ class FieldTypes:
     USAGE_FIELDS = ['Usage (kWh/Gallons)']
     PERCENTAGE_FIELDS = ['Discount Rate']
     
+def _string_mask(values: pd.Series) -> pd.Series:
+    return values.map(lambda value: isinstance(value, str))
+
+
+def _clean_string_values(values: pd.Series, clean) -> pd.Series:
+    """Apply a vectorized string cleanup to the string values of a column, keeping other values as they are."""
+    is_string = _string_mask(values)
+    if not is_string.any():
+        return values
+    cleaned = values.astype(object).copy()
+    cleaned[is_string] = clean(values[is_string].astype(str)).str.strip()
+    return cleaned
+
+
+def _to_dates(values: pd.Series) -> pd.Series:
+    """
+    Parse a column to dates. The format is guessed once from the first string value and used
+    for the whole column, values in other formats are then parsed one by one.
+    """
+    first_string = next((value for value in values if isinstance(value, str) and value.strip()), None)
+    date_format = guess_datetime_format(first_string.strip()) if first_string else None
+
+    if date_format:
+        parsed = pd.to_datetime(values, format=date_format, errors='coerce')
+        unparsed = parsed.isna() & values.notna()
+        if unparsed.any():
+            parsed[unparsed] = pd.to_datetime(values[unparsed], format='mixed', errors='coerce')
+    else:
+        parsed = pd.to_datetime(values, format='mixed', errors='coerce')
+
+    return parsed.dt.date
+
+
 class DocumentIntelligenceUtility:
     """
     A utility class for working with DocumentType and DocumentFormat mappings and data processing.
@@ -334,33 +368,7 @@ class DocumentIntelligenceUtility:
             original_values = df[format_field].copy()
             self._logger.debug(f"Field Conversion Start, Converting field: '{format_field}' (mapped to '{field_name}')")
             
-            def convert_value(value):
-                try:
-                    if field_name in FieldTypes.MONETARY_FIELDS:
-                        if isinstance(value, str):
-                            value = re.sub(r'[\$,]', '', value)
-                        return float(value)
-                    elif field_name in FieldTypes.DATE_FIELDS:
-                        return pd.to_datetime(value, errors='coerce').date()
-                    elif field_name in FieldTypes.USAGE_FIELDS:
-                        if isinstance(value, str):
-                            value_match = re.search(r'(\d+(?:,\d+)?)', value)
-                            unit_match = re.search(r'(kWh|Gallons)', value)
-                            if value_match and unit_match:
-                                numeric_value = float(value_match.group(1).replace(',', ''))
-                                unit = unit_match.group(1)
-                                return f"{numeric_value} {unit}"
-                        return value
-                    elif field_name in FieldTypes.PERCENTAGE_FIELDS:
-                        if isinstance(value, str):
-                            value = value.rstrip('%')
-                        return float(value) / 100
-                    else:
-                        return value
-                except Exception:
-                    return pd.NA
-
-            df[format_field] = df[format_field].apply(convert_value)
+            df[format_field] = self._convert_column(df[format_field], field_name)
 
             # Log conversions and errors, including page numbers
             changes = (original_values != df[format_field]) & (~original_values.isna() | ~df[format_field].isna())
@@ -409,6 +417,35 @@ class DocumentIntelligenceUtility:
         
         return df
             
+    @staticmethod
+    def _convert_column(values: pd.Series, field_name: str) -> pd.Series:
+        """
+        Convert a whole column based on the field type, using column-level pandas operations.
+        Values that can't be converted become NA, the same as in convert_single_field.
+        """
+        if field_name in FieldTypes.MONETARY_FIELDS:
+            cleaned = _clean_string_values(values, lambda strings: strings.str.replace(r'[\$,]', '', regex=True))
+            return pd.to_numeric(cleaned, errors='coerce')
+        elif field_name in FieldTypes.DATE_FIELDS:
+            return _to_dates(values)
+        elif field_name in FieldTypes.USAGE_FIELDS:
+            is_string = _string_mask(values)
+            if not is_string.any():
+                return values
+            strings = values[is_string].astype(str)
+            numbers = strings.str.extract(r'(\d+(?:,\d+)?)', expand=False)
+            units = strings.str.extract(r'(kWh|Gallons)', expand=False)
+            matched = numbers.notna() & units.notna()
+            converted = values.astype(object).copy()
+            converted.loc[matched.index[matched]] = (
+                numbers[matched].str.replace(',', '').astype(float).astype(str) + ' ' + units[matched]
+            )
+            return converted
+        elif field_name in FieldTypes.PERCENTAGE_FIELDS:
+            cleaned = _clean_string_values(values, lambda strings: strings.str.rstrip('%'))
+            return pd.to_numeric(cleaned, errors='coerce') / 100
+        return values
+
     def convert_single_field(self, value: Any, field_name: str, validation_results: ValidationResults) -> Any:
         try:
             original_value = value
@@ -8,6 +8,72 @@ from context.validate_agent_context_manager import ValidationAgentContextManager
 
 # Define the regex pattern for extracting table sections
 TABLE_REGEX_PATTERN = r'<!--SOT-->(.*?)<!--EOT-->'
+TABLE_SECTION_RE = re.compile(TABLE_REGEX_PATTERN, re.DOTALL)
+
+
+# Columns added to every table, headers with these names are renamed like duplicate headers
+RESERVED_COLUMNS = ('Page', 'Table')
+
+
+def make_unique_headers(headers: List[str]) -> List[str]:
+    """Rename repeated headers, and headers named like the added columns, with a '.1', '.2', ... suffix."""
+    seen = set(RESERVED_COLUMNS)
+    unique_headers = []
+    for header in headers:
+        unique_header = header
+        suffix = 0
+        while unique_header in seen:
+            suffix += 1
+            unique_header = f"{header}.{suffix}"
+        seen.add(unique_header)
+        unique_headers.append(unique_header)
+    return unique_headers
+
+
+class TableBuffer:
+    """
+    Column buffers of one logical table, filled while the pages are scanned.
+
+    Rows of all table sections of the same type are appended to the same buffers, so the
+    DataFrame is built once per table type instead of once per section and then concatenated.
+    """
+    def __init__(self):
+        self.columns: Dict[str, List[Any]] = {}
+        self.row_count = 0
+        self.section_count = 0
+
+    def add_section(self, headers: List[str], rows: List[List[str]], page_num: str, table_num: int):
+        headers = make_unique_headers(headers)
+
+        # Columns first seen in this section are empty for earlier rows, the same as pd.concat
+        for header in headers + list(RESERVED_COLUMNS):
+            if header not in self.columns:
+                self.columns[header] = [None] * self.row_count
+
+        missing_columns = [column for column in self.columns if column not in headers and column not in RESERVED_COLUMNS]
+
+        for row in rows:
+            for header, cell in zip(headers, row):
+                self.columns[header].append(cell)
+            for header in headers[len(row):]:
+                self.columns[header].append(None)
+            for column in missing_columns:
+                self.columns[column].append(None)
+
+        self.columns['Page'].extend([page_num] * len(rows))
+        self.columns['Table'].extend([table_num] * len(rows))
+        self.row_count += len(rows)
+        self.section_count += 1
+
+    def to_dataframe(self) -> pd.DataFrame:
+        if not self.row_count:
+            return pd.DataFrame()
+
+        # Page and Table go last, as in the sections
+        data = {column: values for column, values in self.columns.items() if column not in RESERVED_COLUMNS}
+        data['Page'] = self.columns['Page']
+        data['Table'] = self.columns['Table']
+        return pd.DataFrame(data)
 
 
 class TableStrategy(ABC):
@@ -16,10 +82,12 @@ class TableStrategy(ABC):
         self.metrics = {}  # Base metrics dictionary, can be extended in subclasses
 
     @abstractmethod
-    def process_table(self, table_content: str, page_num: str, table_num: int) -> Optional[pd.DataFrame]:
+    def process_table(self, df: pd.DataFrame, table_count: int) -> pd.DataFrame:
+        """Type and measure the logical table, built from all sections of this type."""
         pass
 
-    def _process_table_section(self, table_section: str, page_num: str, table_num: int) -> Optional[pd.DataFrame]:
+    def parse_table_section(self, table_section: str, page_num: str, table_num: int) -> Optional[Tuple[List[str], List[List[str]]]]:
+        """Split a markdown table section into its headers and data rows."""
         lines = table_section.strip().split('\n')
         if len(lines) < 3:
             self.insight_context_manager.add_warning(f"Invalid table structure in Table {table_num} on page {page_num}")
@@ -31,7 +99,8 @@ class TableStrategy(ABC):
         data = []
         for line in lines[2:]:
             row = [cell.strip() for cell in line.split('|') if cell.strip()]
-            if row:
+            # Header rows repeated after a page break are not data
+            if row and row != headers:
                 data.append(row)
 
         if not headers or not data:
@@ -41,12 +110,8 @@ class TableStrategy(ABC):
         if len(headers) != len(data[0]):
             self.insight_context_manager.add_warning(f"Mismatch in column count for table {table_num} on page {page_num}. Headers: {len(headers)}, Data: {len(data[0])}")
 
-        df = pd.DataFrame(data, columns=headers)
-        df['Page'] = page_num
-        df['Table'] = table_num
-
-        # self.insight_context_manager.add_event("Table Processed", f"Processed table {table_num} from page {page_num} with {len(df)} rows and {len(df.columns)} columns")
-        return df
+        # Cells beyond the headers have no column to go to
+        return headers, [row[:len(headers)] for row in data]
 
 class InvoiceDetailsStrategy(TableStrategy):
     def __init__(self, agent_insight_context_manager: ValidationAgentContextManager):
@@ -65,32 +130,30 @@ class InvoiceDetailsStrategy(TableStrategy):
             'min_payment_sent': float('inf')
         }
 
-    def process_table(self, table_content: str, page_num: str, table_num: int) -> Optional[pd.DataFrame]:
-        df = self._process_table_section(table_content, page_num, table_num)
-        if df is not None:
-            self.metrics['total_rows_processed'] += len(df)
-            
-            for col in ['Amount Due', 'Payment Sent']:
-                if col in df.columns:
-                    df[col] = df[col].replace('[\$,]', '', regex=True).astype(float)
-                    self.metrics[f'total_{col.lower().replace(" ", "_")}'] = df[col].sum()
-                    valid_values = df[col].dropna()
-                    self.metrics['valid_rows_processed'] += len(valid_values)
-                    self.metrics[f'null_{col.lower().replace(" ", "_")}_count'] = df[col].isna().sum()
-                    if not valid_values.empty:
-                        self.metrics[f'max_{col.lower().replace(" ", "_")}'] = valid_values.max()
-                        self.metrics[f'min_{col.lower().replace(" ", "_")}'] = valid_values.min()
-
-            if 'Amount Due' in df.columns and 'Payment Sent' in df.columns:
-                self.metrics['discrepancy_count'] = (df['Amount Due'] != df['Payment Sent']).sum()
-
-            self._log_metrics(page_num, table_num)
+    def process_table(self, df: pd.DataFrame, table_count: int) -> pd.DataFrame:
+        self.metrics['total_rows_processed'] += len(df)
+        
+        for col in ['Amount Due', 'Payment Sent']:
+            if col in df.columns:
+                df[col] = df[col].replace('[\$,]', '', regex=True).astype(float)
+                self.metrics[f'total_{col.lower().replace(" ", "_")}'] = df[col].sum()
+                valid_values = df[col].dropna()
+                self.metrics['valid_rows_processed'] += len(valid_values)
+                self.metrics[f'null_{col.lower().replace(" ", "_")}_count'] = df[col].isna().sum()
+                if not valid_values.empty:
+                    self.metrics[f'max_{col.lower().replace(" ", "_")}'] = valid_values.max()
+                    self.metrics[f'min_{col.lower().replace(" ", "_")}'] = valid_values.min()
+
+        if 'Amount Due' in df.columns and 'Payment Sent' in df.columns:
+            self.metrics['discrepancy_count'] = (df['Amount Due'] != df['Payment Sent']).sum()
+
+        self._log_metrics(table_count)
 
         return df
 
-    def _log_metrics(self, page_num: str, table_num: int):
+    def _log_metrics(self, table_count: int):
         event_description = (
-            f"Invoice Details Processing Metrics for Page {page_num}, Table {table_num}:\n"
+            f"Invoice Details Processing Metrics for {table_count} tables:\n"
             f"- Total rows processed: {self.metrics['total_rows_processed']}\n"
             f"- Valid rows processed: {self.metrics['valid_rows_processed']}\n"
             f"- Total Amount Due: ${self.metrics['total_amount_due']:.2f}\n"
@@ -130,25 +193,23 @@ class SummaryTableStrategy(TableStrategy):
             'facility_types': set()
         }
         
-    def process_table(self, table_content: str, page_num: str, table_num: int) -> Optional[pd.DataFrame]:
-        df = self._process_table_section(table_content, page_num, table_num)
-        if df is not None:
-            self.metrics['total_rows_processed'] += len(df)
-            
-            if 'Subtotal Invoice Amount' in df.columns:
-                df['Subtotal Invoice Amount'] = df['Subtotal Invoice Amount'].replace('[\$,]', '', regex=True).astype(float)
-                self.metrics['total_subtotal_amount'] += df['Subtotal Invoice Amount'].sum()
-            
-            if 'Facility Type' in df.columns:
-                self.metrics['facility_types'].update(df['Facility Type'].unique())
-            
-            self._log_metrics(page_num, table_num)
+    def process_table(self, df: pd.DataFrame, table_count: int) -> pd.DataFrame:
+        self.metrics['total_rows_processed'] += len(df)
+        
+        if 'Subtotal Invoice Amount' in df.columns:
+            df['Subtotal Invoice Amount'] = df['Subtotal Invoice Amount'].replace('[\$,]', '', regex=True).astype(float)
+            self.metrics['total_subtotal_amount'] += df['Subtotal Invoice Amount'].sum()
+        
+        if 'Facility Type' in df.columns:
+            self.metrics['facility_types'].update(df['Facility Type'].dropna().unique())
+        
+        self._log_metrics(table_count)
         
         return df
 
-    def _log_metrics(self, page_num: str, table_num: int):
+    def _log_metrics(self, table_count: int):
         event_description = (
-            f"Summary Table Processing Metrics for Page {page_num}, Table {table_num}:\n"
+            f"Summary Table Processing Metrics for {table_count} tables:\n"
             f"- Total rows processed: {self.metrics['total_rows_processed']}\n"
             f"- Total Subtotal Invoice Amount: ${self.metrics['total_subtotal_amount']:.2f}\n"
             f"- Facility Types: {', '.join(self.metrics['facility_types'])}"
@@ -161,10 +222,9 @@ class SummaryTableStrategy(TableStrategy):
 
         self.insight_context_manager.add_event(
             "Summary Table Processed",
-            f"Processed summary table {table_num} from page {page_num}",
+            f"Processed {table_count} summary tables",
             {
-                "page_num": page_num,
-                "table_num": table_num,
+                "table_count": table_count,
                 "rows": self.metrics['total_rows_processed'],
                 "total_subtotal_amount": self.metrics['total_subtotal_amount'],
                 "facility_types": list(self.metrics['facility_types'])
@@ -196,9 +256,9 @@ class TableExtractor:
             {"document_name": self.document.document_name, "page_count": len(raw_content_pages)}
         )
         
-        all_tables: Dict[str, List[pd.DataFrame]] = {
-            'invoice_details': [],
-            'summary': []
+        buffers: Dict[str, TableBuffer] = {
+            'invoice_details': TableBuffer(),
+            'summary': TableBuffer()
         }
         metrics = {
             'total_raw_tables': 0,
@@ -208,16 +268,11 @@ class TableExtractor:
         }
         pages_data = []
 
+        # Single pass over all pages: sections are parsed straight into the column buffers
         for page_num, page in enumerate(raw_content_pages, 1):
-            page_tables = self._extract_tables_from_page(page.text, str(page_num))
-            
-            page_raw_rows = sum(len(df) for tables in page_tables.values() for df in tables)
-            page_raw_tables = sum(len(tables) for tables in page_tables.values())
+            page_tables = self._scan_tables_from_page(page.text, str(page_num), buffers)
             
-            all_tables['invoice_details'].extend(page_tables['invoice_details'])
-            all_tables['summary'].extend(page_tables['summary'])
-            
-            metrics['total_raw_rows'] += page_raw_rows
+            page_raw_tables = sum(page_tables.values())
             metrics['total_raw_tables'] += page_raw_tables
 
             self.agent_insight_context_manager.update_tables_per_page(page_num, page_raw_tables)
@@ -227,6 +282,7 @@ class TableExtractor:
                 'tables': page_tables
             })
 
+        metrics['total_raw_rows'] = sum(buffer.row_count for buffer in buffers.values())
         self.agent_insight_context_manager.update_table_extraction_metrics(metrics)
 
         result = {
@@ -237,8 +293,12 @@ class TableExtractor:
         }
 
         for table_type in ['invoice_details', 'summary']:
-            if all_tables[table_type]:
-                result[table_type] = pd.concat(all_tables[table_type], ignore_index=True)
+            buffer = buffers[table_type]
+            if buffer.row_count:
+                # Each logical table is built and typed once
+                result[table_type] = self.table_strategies[table_type].process_table(
+                    buffer.to_dataframe(), buffer.section_count
+                )
                 extracted_rows = len(result[table_type])
                 extracted_tables = result[table_type]['Table'].nunique()
 
@@ -255,43 +315,34 @@ class TableExtractor:
                 self._check_for_mismatches(table_type, metrics['total_raw_rows'], extracted_rows, 
                                            metrics['total_raw_tables'], extracted_tables)
 
-        self._process_summary_tables(all_tables['summary'], result)
+        self._process_summary_tables(result['summary'], buffers['summary'].section_count, result)
 
         self._log_extraction_results(result['metrics'])
 
         return result
     
     
-    @ValidationAgentContextManager.track_method_execution(method_name="extract_tables_from_page")
-    def _extract_tables_from_page(self, page_text: str, page_num: str) -> Dict[str, List[pd.DataFrame]]:
-        # self.agent_insight_context_manager.add_event(
-        #     "Page Processing Start", 
-        #     f"Starting processing for page {page_num}",
-        #     {"page_number": page_num}
-        # )
-        
-        table_sections = re.findall(r'<!--SOT-->(.*?)<!--EOT-->', page_text, re.DOTALL)
-        self.agent_insight_context_manager.add_event(
-            "Table Sections Found", 
-            f"Found {len(table_sections)} table sections on page {page_num}",
-            {"page_number": page_num, "table_sections_count": len(table_sections)}
-        )
-
-        page_tables: Dict[str, List[pd.DataFrame]] = {
-            'invoice_details': [],
-            'summary': []
+    def _scan_tables_from_page(self, page_text: str, page_num: str, buffers: Dict[str, TableBuffer]) -> Dict[str, int]:
+        """Parse the table sections of a page into the buffers, returning the number of tables per type."""
+        page_tables = {
+            'invoice_details': 0,
+            'summary': 0
         }
-
-        for i, table_section in enumerate(table_sections, 1):
+        
+        section_count = 0
+        for section_count, match in enumerate(TABLE_SECTION_RE.finditer(page_text), 1):
+            table_section = match.group(1)
             table_type = self._determine_table_type(table_section)
-            df = self.table_strategies[table_type].process_table(table_section, page_num, i)
-            if df is not None:
-                page_tables[table_type].append(df)
+            parsed = self.table_strategies[table_type].parse_table_section(table_section, page_num, section_count)
+            if parsed is not None:
+                headers, rows = parsed
+                buffers[table_type].add_section(headers, rows, page_num, section_count)
+                page_tables[table_type] += 1
 
         self.agent_insight_context_manager.add_event(
             "Page Processing Complete", 
-            f"Processed {sum(len(tables) for tables in page_tables.values())} tables from page {page_num}",
-            {"page_number": page_num, "processed_tables_count": sum(len(tables) for tables in page_tables.values())}
+            f"Found {section_count} table sections and processed {sum(page_tables.values())} tables from page {page_num}",
+            {"page_number": page_num, "table_sections_count": section_count, "processed_tables_count": sum(page_tables.values())}
         )
         return page_tables
 
@@ -315,11 +366,8 @@ class TableExtractor:
         #         {"raw_tables": total_raw_tables, "extracted_tables": extracted_tables}
         #     )
 
-    def _process_summary_tables(self, summary_tables: List[pd.DataFrame], result: Dict[str, Any]):
-        if summary_tables:
-            combined_summary = pd.concat(summary_tables, ignore_index=True)
-            result['summary'] = combined_summary
-            
+    def _process_summary_tables(self, combined_summary: pd.DataFrame, summary_table_count: int, result: Dict[str, Any]):
+        if not combined_summary.empty:
             summary_metrics = {
                 "total_rows": len(combined_summary),
                 "total_subtotal": combined_summary['Subtotal Invoice Amount'].sum() if 'Subtotal Invoice Amount' in combined_summary.columns else 0,
@@ -328,7 +376,7 @@ class TableExtractor:
             
             self.agent_insight_context_manager.add_event(
                 "Combined Summary Table",
-                f"Combined {len(summary_tables)} summary tables",
+                f"Combined {summary_table_count} summary tables",
                 summary_metrics
             )
             
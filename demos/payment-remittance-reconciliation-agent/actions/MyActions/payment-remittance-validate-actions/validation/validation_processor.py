@@ -65,6 +65,9 @@ class ValidationProcessor(DocumentProcessorBase):
         
         self.di_utility : DocumentIntelligenceUtility = DocumentIntelligenceUtility(self.source_document.document_type, self.source_document.document_format, self.agent_insight_context_manager)
         self.table_extractor = TableExtractor(self.source_document, self.agent_insight_context_manager)
+        
+        # Facility name mapping from the custom config, loaded once per validation run
+        self._facility_name_mapping = None
 
 
     @ValidationAgentContextManager.track_method_execution(method_name="extract_and_structure_content")
@@ -439,7 +442,7 @@ class ValidationProcessor(DocumentProcessorBase):
 
     
     def _compute_facility_type(self, df: pd.DataFrame) -> pd.DataFrame:
-        df['Facility Type'] = df['Invoice Number'].apply(self.get_facility_type)
+        df['Facility Type'] = self._get_facility_types(df['Invoice Number'])
         return df
 
     def _compute_total_invoice_line_items(self, df: pd.DataFrame) -> int:
@@ -476,8 +479,8 @@ class ValidationProcessor(DocumentProcessorBase):
 
     def _compute_total_amount_paid(self, df: pd.DataFrame) -> float:
         # Log all values and compute the sum in one go using apply
-        self.logger.debug("Computing total amount paid")
-        total_amount_paid = df['Amount Paid'].apply(lambda x: self.logger.debug(f"Adding: {x}") or x).sum()
+        self.logger.debug(f"Computing total amount paid over {len(df)} rows")
+        total_amount_paid = df['Amount Paid'].sum()
         self.logger.debug(f"Total amount paid: {total_amount_paid}")
         return total_amount_paid
 
@@ -557,7 +560,7 @@ class ValidationProcessor(DocumentProcessorBase):
     def _add_facility_type_and_process_co2(self, df: pd.DataFrame) -> pd.DataFrame:
         """Add Facility Type column and process CO2 Supplementation data."""
         if 'Facility Type' not in df.columns:
-            df['Facility Type'] = df['Invoice Number'].apply(self.get_facility_type)
+            df['Facility Type'] = self._get_facility_types(df['Invoice Number'])
             
 
         
@@ -572,6 +575,40 @@ class ValidationProcessor(DocumentProcessorBase):
         
         return df
     
+    def _get_facility_name_mapping(self) -> Dict[str, str]:
+        """Parse the facility name mapping of the custom config on first use."""
+        if self._facility_name_mapping is None:
+            facility_name_mapping_str = self.di_utility.get_custom_config_value(CONFIG_FACILITY_NAME_MAPPING_KEY, "{}")
+            
+            # Replace single quotes with double quotes to make it valid JSON
+            facility_name_mapping_str = facility_name_mapping_str.replace("'", '"')
+            
+            # Convert the string to a dictionary
+            self._facility_name_mapping = json.loads(facility_name_mapping_str)
+        
+        return self._facility_name_mapping
+
+    def _get_facility_types(self, invoice_references: pd.Series) -> pd.Series:
+        """
+        Map a column of invoice references to facility types, see get_facility_type.
+        Unknown facility types are logged once per distinct abbreviation.
+        """
+        parts = invoice_references.astype(str).str.split('-')
+        keys = 'INV-' + parts.str[1].fillna('')
+        facility_types = keys.map(self._get_facility_name_mapping()).fillna('Unknown')
+        
+        has_facility_part = (parts.str.len() >= 3) & invoice_references.notna()
+        facility_types = facility_types.where(has_facility_part, 'Unknown')
+        
+        for unknown_key in keys[has_facility_part & (facility_types == 'Unknown')].unique():
+            # Log an event if the facility type is unknown
+            self.agent_insight_context_manager.add_event(
+                "Unknown Facility Type", 
+                f"Encountered unknown facility type: {unknown_key}"
+            )
+        
+        return facility_types
+
     def get_facility_type(self, invoice_reference):
             """
             Extracts the facility type from the invoice reference.
@@ -585,16 +622,9 @@ class ValidationProcessor(DocumentProcessorBase):
             parts = invoice_reference.split('-')
             if len(parts) >= 3:
                 facility_type_abbr = parts[1]
-                facility_name_mapping_str = self.di_utility.get_custom_config_value(CONFIG_FACILITY_NAME_MAPPING_KEY, "{}")
-                
-                # Replace single quotes with double quotes to make it valid JSON
-                facility_name_mapping_str = facility_name_mapping_str.replace("'", '"')
-                
-                # Convert the string to a dictionary
-                facility_name_mapping = json.loads(facility_name_mapping_str)
                 
                 # Get the facility type from the mapping
-                facility_type = facility_name_mapping.get(f'INV-{facility_type_abbr}', 'Unknown')
+                facility_type = self._get_facility_name_mapping().get(f'INV-{facility_type_abbr}', 'Unknown')
                 
                 if facility_type == 'Unknown':
                     # Log an event if the facility type is unknown